@@ -1,22 +1,43 @@
-import numpy as np
-
 from comfystream import tensor_cache
+from comfystream.audio_queue import window_samples
+from comfystream.audio_ring_buffer import AudioRingBuffer
+
+# Headroom of the ring buffer beyond one window, in seconds of audio
+RING_HEADROOM_SECONDS = 1.0
+
+class AudioBufferState:
+    """Buffering state of a single session, kept on its channels.
+
+    The node instance is shared by all sessions and their concurrent runs.
+    """
+
+    def __init__(self):
+        self.sample_rate = None
+        self.window_samples = None
+        self.hop_samples = None
+        self.ring = None
 
 class LoadAudioTensor:
+    """Loads windows of buffer_size ms of audio from the session's input queue.
+
+    With a hop_size smaller than buffer_size consecutive windows overlap, giving the
+    model context across chunks. Such models should output hop_size ms of audio per
+    window so output keeps pace with input.
+    """
+
     CATEGORY = "audio_utils"
     RETURN_TYPES = ("WAVEFORM", "INT")
     FUNCTION = "execute"
     
-    def __init__(self):
-        self.audio_buffer = np.empty(0, dtype=np.int16)
-        self.buffer_samples = None
-        self.sample_rate = None
-    
     @classmethod
     def INPUT_TYPES(s):
         return {
             "required": {
                 "buffer_size": ("FLOAT", {"default": 500.0}),
+            },
+            "optional": {
+                "hop_size": ("FLOAT", {"default": 0.0}),
+                "session_id": ("STRING", {"default": tensor_cache.DEFAULT_SESSION_ID}),
             }
         }
     
@@ -24,29 +45,38 @@ class LoadAudioTensor:
     def IS_CHANGED():
         return float("nan")
     
-    def execute(self, buffer_size):
-        if self.sample_rate is None or self.buffer_samples is None:
-            frame = tensor_cache.audio_inputs.get(block=True)
-            self.sample_rate = frame.sample_rate
-            self.buffer_samples = int(self.sample_rate * buffer_size / 1000)
-            self.leftover = frame.side_data.input
+    def execute(self, buffer_size, hop_size=0.0, session_id=tensor_cache.DEFAULT_SESSION_ID):
+        channels = tensor_cache.get_session(session_id)
+        # Runs of the session in flight at once take consecutive windows
+        with channels.audio_lock:
+            if channels.audio_buffer is None:
+                # Removed with the channels when the session ends
+                channels.audio_buffer = AudioBufferState()
+            return self._take_window(channels.audio_inputs, channels.audio_buffer, buffer_size, hop_size)
+
+    def _take_window(self, audio_inputs, state, buffer_size, hop_size):
+        if state.ring is None:
+            frame = audio_inputs.get(block=True)
+            state.sample_rate = frame.sample_rate
+            state.window_samples, state.hop_samples = window_samples(
+                state.sample_rate, buffer_size, hop_size
+            )
+            state.ring = AudioRingBuffer(
+                state.window_samples + int(state.sample_rate * RING_HEADROOM_SECONDS)
+            )
+            state.ring.write(frame.side_data.input)
         
-        if self.leftover.shape[0] < self.buffer_samples:
-            chunks = [self.leftover] if self.leftover.size > 0 else []
-            total_samples = self.leftover.shape[0]
-            
-            while total_samples < self.buffer_samples:
-                frame = tensor_cache.audio_inputs.get(block=True)
-                if frame.sample_rate != self.sample_rate:
-                    raise ValueError("Sample rate mismatch")
-                chunks.append(frame.side_data.input)
-                total_samples += frame.side_data.input.shape[0]
-            
-            merged_audio = np.concatenate(chunks, dtype=np.int16)
-            buffered_audio = merged_audio[:self.buffer_samples]
-            self.leftover = merged_audio[self.buffer_samples:]
-        else:
-            buffered_audio = self.leftover[:self.buffer_samples]
-            self.leftover = self.leftover[self.buffer_samples:]
+        while len(state.ring) < state.window_samples:
+            frame = audio_inputs.get(block=True)
+            if frame.sample_rate != state.sample_rate:
+                raise ValueError("Sample rate mismatch")
+            state.ring.write(frame.side_data.input)
+
+        # Copied out of the ring, concurrent runs of the session write their windows
+        # into it while the nodes of this run still read the window
+        buffered_audio = state.ring.peek(state.window_samples).copy()
+        state.ring.consume(state.hop_samples)
+        # Lets the next run start once the queue holds the rest of its window
+        audio_inputs.window_taken(len(state.ring))
                 
-        return buffered_audio, self.sample_rate
+        return buffered_audio, state.sample_rate
@@ -1,4 +1,8 @@
-from comfystream import tensor_cache
+import time
+
+import torch
+
+from comfystream import tensor_cache, tracing
 
 
 class LoadTensor:
@@ -8,13 +12,30 @@ class LoadTensor:
 
     @classmethod
     def INPUT_TYPES(s):
-        return {}
+        return {
+            "optional": {
+                "session_id": ("STRING", {"default": tensor_cache.DEFAULT_SESSION_ID}),
+            }
+        }
 
     @classmethod
     def IS_CHANGED():
         return float("nan")
 
-    def execute(self):
-        frame = tensor_cache.image_inputs.get(block=True)
-        frame.side_data.skipped = False
-        return (frame.side_data.input,)
+    def execute(self, session_id: str = tensor_cache.DEFAULT_SESSION_ID):
+        channels = tensor_cache.get_session(session_id)
+        with channels.take_lock:
+            # Gathers a single frame unless batching is enabled for the session
+            frames = channels.image_inputs.get_batch(key=lambda frame: frame.side_data.input.shape)
+            ticket = channels.reorder.next_ticket()
+        run = tensor_cache.runs
+        run.channels, run.ticket, run.taken_at = channels, ticket, time.perf_counter()
+        # SaveTensor tags each output with the sequence id of its input frame
+        run.frames = []
+        for frame in frames:
+            frame.side_data.skipped = False
+            tracing.mark(frame, "queue_wait")
+            run.frames.append((getattr(frame.side_data, "seq", None), tracing.get_trace(frame)))
+        if len(frames) == 1:
+            return (frames[0].side_data.input,)
+        return (torch.cat([frame.side_data.input for frame in frames]),)
@@ -1,6 +1,11 @@
+import time
+
 import torch
 
-from comfystream import tensor_cache
+from comfystream import tensor_cache, tracing
+
+# Longest time a chained stage waits for the next stage to take its previous output
+STAGE_PUT_TIMEOUT = 1.0
 
 
 class SaveTensor:
@@ -14,6 +19,9 @@ class SaveTensor:
         return {
             "required": {
                 "images": ("IMAGE",),
+            },
+            "optional": {
+                "session_id": ("STRING", {"default": tensor_cache.DEFAULT_SESSION_ID}),
             }
         }
 
@@ -21,6 +29,30 @@ class SaveTensor:
     def IS_CHANGED(s):
         return float("nan")
 
-    def execute(self, images: torch.Tensor):
-        tensor_cache.image_outputs.put_nowait(images)
+    def execute(self, images: torch.Tensor, session_id: str = tensor_cache.DEFAULT_SESSION_ID):
+        # Channels, ticket and frames LoadTensor took on this worker thread for the run
+        run = tensor_cache.runs
+        source = getattr(run, "channels", None)
+        frames = getattr(run, "frames", [])
+        run.channels, run.frames = None, []
+
+        # Split batches back into one output per input frame, in order
+        outputs = []
+        for idx in range(images.shape[0]):
+            seq, trace = frames[idx] if idx < len(frames) else (None, None)
+            if trace is not None:
+                trace.mark("inference")
+            outputs.append((seq, trace, images[idx:idx + 1]))
+        if source is not None:
+            source.run_times.append(time.perf_counter() - run.taken_at)
+            outputs = source.reorder.push(run.ticket, outputs)
+
+        channels = tensor_cache.get_session(session_id)
+        for seq, trace, image in outputs:
+            if channels.chained:
+                # Waiting for the next stage bounds the queue between the stages
+                frame = tensor_cache.ChainedFrame(image, seq, trace)
+                channels.image_inputs.put(frame, protected=True, timeout=STAGE_PUT_TIMEOUT)
+            else:
+                channels.image_outputs.put_nowait((seq, image))
         return images
@@ -0,0 +1,88 @@
+"""Benchmark the latency of handing outputs from a worker thread to the event loop.
+
+Compares the thread-safe OutputQueue used by the tensor_cache with calling
+``asyncio.Queue.put_nowait`` from the worker thread, at typical stream frame rates.
+A background task wakes the loop periodically to stand in for the RTP/RTCP timers of
+a live server; without it the unsafe variant can stall indefinitely.
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+from typing import Callable, List
+
+import click
+
+from comfystream.output_queue import OutputQueue
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def measure(put: Callable[[float], None], get, fps: int, frames: int) -> List[float]:
+    """Produce timestamps from a worker thread at the given rate and return the
+    handoff latencies in milliseconds."""
+    interval = 1.0 / fps
+
+    def produce():
+        next_time = time.perf_counter()
+        for _ in range(frames):
+            next_time += interval
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+            put(time.perf_counter())
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    latencies = []
+    for _ in range(frames):
+        sent_at = await get()
+        latencies.append((time.perf_counter() - sent_at) * 1000)
+    producer.join()
+    return latencies
+
+
+async def tick(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+
+
+async def run(fps_values: List[int], frames: int, loop_tick_ms: float):
+    loop = asyncio.get_running_loop()
+    ticker = asyncio.create_task(tick(loop_tick_ms / 1000))
+    for fps in fps_values:
+        output_queue = OutputQueue()
+        asyncio_queue = asyncio.Queue()
+        modes = {
+            "OutputQueue": (output_queue.put_nowait, output_queue.get),
+            "asyncio.Queue (unsafe)": (asyncio_queue.put_nowait, asyncio_queue.get),
+            "asyncio.Queue (call_soon_threadsafe)": (
+                lambda item: loop.call_soon_threadsafe(asyncio_queue.put_nowait, item),
+                asyncio_queue.get,
+            ),
+        }
+        for name, (put, get) in modes.items():
+            latencies = await measure(put, get, fps, frames)
+            click.echo(
+                f"{fps:>3} fps  {name:<38} "
+                f"p50={statistics.median(latencies):7.3f}ms "
+                f"p99={percentile(latencies, 99):7.3f}ms "
+                f"max={max(latencies):7.3f}ms"
+            )
+    ticker.cancel()
+
+
+@click.command()
+@click.option("--fps", "fps_values", type=int, multiple=True, default=[30, 60], help="Frame rates to benchmark")
+@click.option("--frames", type=int, default=300, help="Number of frames per run")
+@click.option("--loop-tick-ms", type=float, default=20.0, help="Interval of the background loop wakeups")
+def main(fps_values, frames, loop_tick_ms):
+    """Benchmark output handoff latency from a worker thread to the event loop."""
+    asyncio.run(run(list(fps_values), frames, loop_tick_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark video throughput of a prompt against the number of runs in flight.
+
+Runs the prompt on synthetic frames at each ``--depth`` and prints the output frame
+rate and the latency from queueing a frame to receiving its output. All depths share
+one embedded ComfyUI client with enough workers for the largest depth, so models are
+loaded once.
+"""
+
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from typing import List
+
+import av
+import click
+import numpy as np
+
+from comfystream.pipeline import Pipeline
+
+
+async def measure(pipeline: Pipeline, input_fps: float, duration: float, size: int):
+    """Feed frames at input_fps for duration seconds and return the output frame rate
+    and the latencies in milliseconds."""
+    frame_rgb = np.random.randint(0, 255, (size, size, 3), dtype=np.uint8)
+    sent_at = {}
+    stop = asyncio.Event()
+
+    async def produce():
+        pts = 0
+        next_time = time.perf_counter()
+        while not stop.is_set():
+            frame = av.VideoFrame.from_ndarray(frame_rgb, format="rgb24")
+            frame.pts = pts
+            frame.time_base = av.time_base
+            sent_at[pts] = time.perf_counter()
+            await pipeline.put_video_frame(frame)
+            pts += 1
+            next_time += 1.0 / input_fps
+            await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+
+    producer = asyncio.create_task(produce())
+    latencies = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        output = await pipeline.get_processed_video_frame()
+        latencies.append((time.perf_counter() - sent_at.pop(output.pts)) * 1000)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await producer
+    return len(latencies) / elapsed, latencies
+
+
+async def run(workspace: str, prompt_path: str, depths: List[int], input_fps: float,
+              duration: float, size: int):
+    with open(prompt_path) as f:
+        prompt = json.load(f)
+
+    # Owns the shared client, like the app pipeline of the server
+    owner = Pipeline(
+        width=size,
+        height=size,
+        cwd=workspace,
+        disable_cuda_malloc=True,
+        gpu_only=True,
+        preview_method="none",
+        max_workers=max(depths),
+    )
+    for depth in depths:
+        pipeline = Pipeline(
+            width=size,
+            height=size,
+            session_id=str(uuid.uuid4()),
+            comfy_client=owner.client.comfy_client,
+            prompt_depth=depth,
+        )
+        await pipeline.set_prompts(prompt)
+        await pipeline.warm_video()
+
+        fps, latencies = await measure(pipeline, input_fps, duration, size)
+        reorder = pipeline.get_reorder_stats()
+        click.echo(
+            f"depth={depth}  {fps:6.2f} fps  "
+            f"latency p50={statistics.median(latencies):7.1f}ms max={max(latencies):7.1f}ms  "
+            f"reordered={reorder['reordered_runs']} skipped={reorder['skipped_tickets']}"
+        )
+        await pipeline.cleanup()
+
+    await owner.cleanup()
+
+
+@click.command()
+@click.option("--workspace", required=True, help="ComfyUI workspace directory")
+@click.option("--prompt", "prompt_path", required=True, help="Path to an API format prompt JSON using LoadTensor and SaveTensor")
+@click.option("--depth", "depths", type=int, multiple=True, default=[1, 2, 3], help="In-flight depths to benchmark")
+@click.option("--input-fps", type=float, default=60.0, help="Rate at which frames are queued")
+@click.option("--duration", type=float, default=10.0, help="Seconds measured per depth")
+@click.option("--size", type=int, default=512, help="Width and height of the frames")
+def main(workspace, prompt_path, depths, input_fps, duration, size):
+    """Benchmark prompt throughput against the in-flight depth."""
+    asyncio.run(run(workspace, prompt_path, list(depths), input_fps, duration, size))
+
+
+if __name__ == "__main__":
+    main()
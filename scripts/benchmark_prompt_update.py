@@ -0,0 +1,66 @@
+"""Benchmark the cost of a prompt update against the size of the prompt.
+
+Builds chains of nodes of increasing length, changes one literal input and times a
+full conversion of the prompt against the diff, in-place update and copy of the
+changed nodes done by ``ComfyStreamClient.update_prompts``.
+"""
+
+import copy
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+import click
+
+from comfystream.prompt_update import apply_input_changes, copy_changed_nodes, diff_prompt_inputs
+from comfystream.utils import convert_prompt
+
+
+def make_prompt(nodes: int) -> Dict[str, Any]:
+    """Return a prompt of a LoadTensor, nodes - 2 scaling nodes and a SaveTensor."""
+    prompt = {"0": {"class_type": "LoadTensor", "inputs": {}}}
+    for idx in range(1, nodes - 1):
+        prompt[str(idx)] = {
+            "class_type": "ImageScaleBy",
+            "inputs": {"image": [str(idx - 1), 0], "upscale_method": "nearest-exact", "scale_by": 1.0},
+        }
+    prompt[str(nodes - 1)] = {"class_type": "SaveTensor", "inputs": {"images": [str(nodes - 2), 0]}}
+    return prompt
+
+
+def time_ms(fn: Callable[[], Any], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+@click.command()
+@click.option("--nodes", "sizes", type=int, multiple=True, default=[10, 100, 1000], help="Prompt sizes to benchmark")
+@click.option("--repeat", type=int, default=50, help="Updates timed per size")
+def main(sizes, repeat):
+    """Benchmark full prompt conversion against incremental updates."""
+    for nodes in sizes:
+        old = make_prompt(nodes)
+        converted = convert_prompt(old, "benchmark")
+        new = copy.deepcopy(old)
+        new[str(nodes // 2)]["inputs"]["scale_by"] = 2.0
+
+        def incremental():
+            changes = diff_prompt_inputs(old, new)
+            apply_input_changes(converted, new, changes)
+            # update_prompts keeps its own copy of the prompt to diff the next update
+            copy_changed_nodes(old, new, changes)
+
+        full = time_ms(lambda: convert_prompt(new, "benchmark"), repeat)
+        diffed = time_ms(incremental, repeat)
+        click.echo(
+            f"nodes={nodes:5d}  full p50={statistics.median(full):8.3f}ms  "
+            f"incremental p50={statistics.median(diffed):8.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
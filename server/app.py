@@ -4,6 +4,7 @@ import json
 import logging
 import os
 import sys
+import uuid
 import torch
 
 # Initialize CUDA before any other imports to prevent core dump.
@@ -20,7 +21,12 @@ from aiortc import (
 )
 from aiortc.codecs import h264
 from aiortc.rtcrtpsender import RTCRtpSender
+from comfystream.client_pool import POOL_STRATEGIES, ROUND_ROBIN
+from comfystream.idle_unloader import IdleUnloader
+from comfystream.output_pacer import PACING_MODES, PACING_NONE, OutputPacer
 from comfystream.pipeline import Pipeline
+from comfystream.tracing import tracer
+from comfystream.warmup_cache import WarmupCache
 from twilio.rest import Client
 from comfystream.server.utils import patch_loop_datagram, add_prefix_to_app_routes, FPSMeter
 from comfystream.server.metrics import MetricsManager, StreamStatsManager
@@ -34,6 +40,9 @@ logging.getLogger("aiortc.rtcrtpreceiver").setLevel(logging.WARNING)
 MAX_BITRATE = 2000000
 MIN_BITRATE = 2000000
 
+# Seconds between updates of the node timing metrics, sorting the samples is not free
+NODE_TIMING_METRICS_INTERVAL = 1.0
+
 
 class VideoStreamTrack(MediaStreamTrack):
     """video stream track that processes video frames using a pipeline.
@@ -59,7 +68,16 @@ class VideoStreamTrack(MediaStreamTrack):
         self.fps_meter = FPSMeter(
             metrics_manager=app["metrics_manager"], track_id=track.id
         )
+        self.pacer = None
+        if app["output_pacing"] != PACING_NONE:
+            self.pacer = OutputPacer(
+                self.pipeline.get_processed_video_frame,
+                fps=app["output_fps"],
+                mode=app["output_pacing"],
+                convert=self.pipeline.run_frame_conversion,
+            )
         self.running = True
+        self.node_timing_updated_at = 0.0
         self.collect_task = asyncio.create_task(self.collect_frames())
         
         # Add cleanup when track ends
@@ -76,6 +94,7 @@ class VideoStreamTrack(MediaStreamTrack):
             while self.running:
                 try:
                     frame = await self.track.recv()
+                    tracer.start(frame, self.pipeline.session_id)
                     await self.pipeline.put_video_frame(frame)
                 except asyncio.CancelledError:
                     logger.info("Frame collection cancelled")
@@ -95,16 +114,51 @@ class VideoStreamTrack(MediaStreamTrack):
         except Exception as e:
             logger.error(f"Unexpected error in frame collection: {str(e)}")
         finally:
+            if self.pacer is not None:
+                await self.pacer.stop()
             await self.pipeline.cleanup()
+            app["metrics_manager"].remove_stream_metrics(self.track.id)
 
     async def recv(self):
         """Receive a processed video frame from the pipeline, increment the frame
         count for FPS calculation and return the processed frame to the client.
+
+        With output pacing enabled frames are returned at the output frame rate,
+        repeating or blending the last outputs when inference is slower.
         """
-        processed_frame = await self.pipeline.get_processed_video_frame()
+        if self.pacer is not None:
+            processed_frame = await self.pacer.next_frame()
+            app["metrics_manager"].update_output_jitter_metrics(
+                self.pacer.output_jitter * 1000.0, self.track.id
+            )
+        else:
+            processed_frame = await self.pipeline.get_processed_video_frame()
 
         # Increment the frame count to calculate FPS.
         await self.fps_meter.increment_frame_count()
+        app["metrics_manager"].update_loop_time_saved_metrics(
+            self.pipeline.get_offload_stats()["loop_time_saved"], self.track.id
+        )
+        app["metrics_manager"].update_latency_metrics(
+            self.pipeline.get_latency_stats(), self.track.id
+        )
+        app["metrics_manager"].update_audio_input_metrics(
+            self.pipeline.get_audio_input_stats(), self.track.id
+        )
+        app["metrics_manager"].update_prompt_update_metrics(
+            self.pipeline.get_prompt_update_stats(), self.track.id
+        )
+        now = time.monotonic()
+        if app["node_timing"] and now - self.node_timing_updated_at >= NODE_TIMING_METRICS_INTERVAL:
+            self.node_timing_updated_at = now
+            app["metrics_manager"].update_node_timing_metrics(
+                self.pipeline.get_node_timings(), self.track.id
+            )
+
+        trace = getattr(processed_frame.side_data, "trace", None)
+        if trace is not None:
+            trace.mark("recv")
+            tracer.finish(trace)
 
         return processed_frame
 
@@ -198,13 +252,57 @@ def get_ice_servers():
     return ice_servers
 
 
+def create_session_pipeline(app: web.Application) -> Pipeline:
+    """Create a pipeline for a new stream session.
+
+    The pipeline shares the embedded ComfyUI client of the app pipeline, so models stay
+    loaded across streams, but gets its own session queues so concurrent streams do not
+    receive each other's frames. With --worker-process every worker of the stream runs
+    its own ComfyUI client in a child process instead, loading the models itself.
+    """
+    if app["worker_process"]:
+        client_kwargs = dict(
+            cwd=app["workspace"],
+            disable_cuda_malloc=True,
+            gpu_only=True,
+            preview_method="none",
+        )
+    else:
+        client_kwargs = dict(
+            comfy_client=app["pipeline"].client.comfy_client,
+            warmup_cache=app["warmup_cache"],
+        )
+    return Pipeline(
+        width=512,
+        height=512,
+        session_id=str(uuid.uuid4()),
+        eviction_policy=app["eviction_policy"],
+        audio_overflow_policy=app["audio_overflow_policy"],
+        audio_max_queued_bytes=app["audio_max_queued_bytes"],
+        batch_size=app["batch_size"],
+        resize_mode=app["resize_mode"],
+        frame_executor_workers=app["frame_executor_workers"],
+        batch_window_ms=app["batch_window_ms"],
+        prompt_depth=app["prompt_depth"],
+        worker_process=app["worker_process"],
+        workers=app["workers"],
+        worker_strategy=app["worker_strategy"],
+        reorder_window=app["reorder_window"],
+        latency_target_ms=app["latency_target_ms"],
+        node_timing=app["node_timing"],
+        comfyui_inference_log_level=app.get("comfui_inference_log_level", None),
+        **client_kwargs,
+    )
+
+
 async def offer(request):
-    pipeline = request.app["pipeline"]
+    pipeline = create_session_pipeline(request.app)
     pcs = request.app["pcs"]
 
     params = await request.json()
 
-    await pipeline.set_prompts(params["prompts"])
+    # Chained prompts run as stages, each feeding the next
+    await pipeline.set_prompts(params["prompts"], chain=params.get("chain_prompts", False))
 
     offer_params = params["offer"]
     offer = RTCSessionDescription(sdp=offer_params["sdp"], type=offer_params["type"])
@@ -218,6 +316,7 @@ async def offer(request):
         pc = RTCPeerConnection()
 
     pcs.add(pc)
+    request.app["idle_unloader"].session_started(pipeline.session_id)
 
     tracks = {"video": None, "audio": None}
     
@@ -313,15 +412,20 @@ async def offer(request):
             logger.info(f"{track.kind} track ended")
             request.app["video_tracks"].pop(track.id, None)
 
+    async def end_session():
+        await pc.close()
+        pcs.discard(pc)
+        # Releases only the session's queues and tasks, the shared client stays warm
+        await pipeline.cleanup()
+        request.app["idle_unloader"].session_ended(pipeline.session_id)
+
     @pc.on("connectionstatechange")
     async def on_connectionstatechange():
         logger.info(f"Connection state is: {pc.connectionState}")
         if pc.connectionState == "failed":
-            await pc.close()
-            pcs.discard(pc)
+            await end_session()
         elif pc.connectionState == "closed":
-            await pc.close()
-            pcs.discard(pc)
+            await end_session()
 
     await pc.setRemoteDescription(offer)
 
@@ -359,6 +463,15 @@ async def set_prompt(request):
     return web.Response(content_type="application/json", text="OK")
 
 
+async def debug_trace(_):
+    """Download the buffered per-frame traces as Chrome trace-event JSON."""
+    return web.Response(
+        content_type="application/json",
+        text=json.dumps(tracer.to_chrome_trace()),
+        headers={"Content-Disposition": 'attachment; filename="comfystream-trace.json"'},
+    )
+
+
 def health(_):
     return web.Response(content_type="application/json", text="OK")
 
@@ -374,8 +487,17 @@ async def on_startup(app: web.Application):
         disable_cuda_malloc=True, 
         gpu_only=True, 
         preview_method='none',
+        max_workers=app["max_workers"],
+        prompt_depth=app["prompt_depth"],
         comfyui_inference_log_level=app.get("comfui_inference_log_level", None),
     )
+    # Warm prompt and resolution combinations of the shared embedded client
+    app["warmup_cache"] = WarmupCache()
+    # Models stay loaded between sessions until the client was idle for a while
+    app["idle_unloader"] = IdleUnloader(
+        idle_timeout=app["client_idle_timeout"],
+        on_unload=app["warmup_cache"].invalidate,
+    )
     app["pcs"] = set()
     app["video_tracks"] = {}
 
@@ -385,6 +507,8 @@ async def on_shutdown(app: web.Application):
     coros = [pc.close() for pc in pcs]
     await asyncio.gather(*coros)
     pcs.clear()
+    await app["idle_unloader"].close()
+    await app["pipeline"].cleanup()
 
 
 if __name__ == "__main__":
@@ -397,6 +521,134 @@ if __name__ == "__main__":
     parser.add_argument(
         "--workspace", default=None, required=True, help="Set Comfy workspace"
     )
+    parser.add_argument(
+        "--max-workers",
+        default=1,
+        type=int,
+        help="Number of ComfyUI worker threads, each concurrent stream needs "
+        "--prompt-depth workers",
+    )
+    parser.add_argument(
+        "--eviction-policy",
+        default="latest",
+        help="Policy for dropping input frames when inference falls behind: latest, "
+        "skip_nth[:N], keyframe[:CAPACITY] or deadline[:MAX_AGE_MS]",
+    )
+    parser.add_argument(
+        "--audio-overflow-policy",
+        default="drop_oldest",
+        choices=["drop_oldest", "time_stretch", "backpressure"],
+        help="How to shed queued audio when the audio prompt falls behind",
+    )
+    parser.add_argument(
+        "--audio-max-queued-bytes",
+        default=4 * 1024 * 1024,
+        type=int,
+        help="Per-stream memory budget for queued audio input",
+    )
+    parser.add_argument(
+        "--batch-size",
+        default=1,
+        type=int,
+        help="Maximum number of video frames processed per prompt execution",
+    )
+    parser.add_argument(
+        "--batch-window-ms",
+        default=0.0,
+        type=float,
+        help="How long to wait for more frames to fill a batch",
+    )
+    parser.add_argument(
+        "--prompt-depth",
+        default=1,
+        type=int,
+        help="Runs of a prompt in flight at once, overlapping the CPU work of one "
+        "frame with the compute of the next",
+    )
+    parser.add_argument(
+        "--worker-process",
+        default=False,
+        action="store_true",
+        help="Run the ComfyUI executor of every stream in a child process, each "
+        "loading the models itself, so nodes holding the GIL do not delay the server",
+    )
+    parser.add_argument(
+        "--workers",
+        default=1,
+        type=int,
+        help="Child processes per stream each running its own copy of the prompt, "
+        "frames are spread across them, requires --worker-process",
+    )
+    parser.add_argument(
+        "--worker-strategy",
+        default=ROUND_ROBIN,
+        choices=POOL_STRATEGIES,
+        help="How frames are assigned to the --workers clients of a stream",
+    )
+    parser.add_argument(
+        "--reorder-window",
+        default=None,
+        type=int,
+        help="Outputs of the --workers clients held while waiting for a missing frame "
+        "before skipping it, defaults to the frames in flight",
+    )
+    parser.add_argument(
+        "--resize-mode",
+        default="none",
+        choices=["none", "stretch", "crop", "letterbox"],
+        help="Map incoming frames to the pipeline resolution before inference",
+    )
+    parser.add_argument(
+        "--frame-executor-workers",
+        default=0,
+        type=int,
+        help="Threads converting video frames off the event loop, 0 to convert on the loop",
+    )
+    parser.add_argument(
+        "--latency-target-ms",
+        default=None,
+        type=float,
+        help="Skip video frames before inference to keep latency under this target.",
+    )
+    parser.add_argument(
+        "--output-pacing",
+        default="repeat",
+        choices=PACING_MODES,
+        help="Emit output frames at --output-fps, repeating or blending the last "
+        "outputs when inference is slower, or none to emit outputs as they complete.",
+    )
+    parser.add_argument(
+        "--output-fps",
+        default=30.0,
+        type=float,
+        help="Frame rate of the paced video output.",
+    )
+    parser.add_argument(
+        "--node-timing",
+        default=False,
+        action="store_true",
+        help="Time every node of the running prompts, reported by get_nodes, "
+        "/streams/stats and /metrics.",
+    )
+    parser.add_argument(
+        "--client-idle-timeout",
+        default=300.0,
+        type=float,
+        help="Seconds without sessions before the models are unloaded from the GPU, "
+        "0 to keep them loaded.",
+    )
+    parser.add_argument(
+        "--trace",
+        default=False,
+        action="store_true",
+        help="Trace the lifecycle of every frame, downloadable from /debug/trace.",
+    )
+    parser.add_argument(
+        "--trace-capacity",
+        default=2048,
+        type=int,
+        help="Number of frame traces kept for /debug/trace.",
+    )
     parser.add_argument(
         "--log-level",
         default="INFO",
@@ -428,6 +680,8 @@ if __name__ == "__main__":
         help="Set the logging level for ComfyUI inference",
     )
     args = parser.parse_args()
+    if args.workers > 1 and not args.worker_process:
+        parser.error("--workers requires --worker-process")
 
     logging.basicConfig(
         level=args.log_level.upper(),
@@ -438,6 +692,24 @@ if __name__ == "__main__":
     app = web.Application()
     app["media_ports"] = args.media_ports.split(",") if args.media_ports else None
     app["workspace"] = args.workspace
+    app["max_workers"] = args.max_workers
+    app["eviction_policy"] = args.eviction_policy
+    app["audio_overflow_policy"] = args.audio_overflow_policy
+    app["audio_max_queued_bytes"] = args.audio_max_queued_bytes
+    app["batch_size"] = args.batch_size
+    app["batch_window_ms"] = args.batch_window_ms
+    app["prompt_depth"] = args.prompt_depth
+    app["worker_process"] = args.worker_process
+    app["workers"] = args.workers
+    app["worker_strategy"] = args.worker_strategy
+    app["reorder_window"] = args.reorder_window
+    app["resize_mode"] = args.resize_mode
+    app["frame_executor_workers"] = args.frame_executor_workers
+    app["latency_target_ms"] = args.latency_target_ms
+    app["output_pacing"] = args.output_pacing
+    app["output_fps"] = args.output_fps
+    app["client_idle_timeout"] = args.client_idle_timeout
+    app["node_timing"] = args.node_timing
 
     app.on_startup.append(on_startup)
     app.on_shutdown.append(on_shutdown)
@@ -468,6 +740,15 @@ if __name__ == "__main__":
         )
         app.router.add_get("/metrics", app["metrics_manager"].metrics_handler)
 
+    # Add per-frame trace endpoint.
+    if args.trace:
+        tracer.enable(capacity=args.trace_capacity)
+        logger.info(
+            f"Frame tracing enabled - Chrome traces available at: "
+            f"http://{args.host}:{args.port}/debug/trace"
+        )
+        app.router.add_get("/debug/trace", debug_trace)
+
     # Add hosted platform route prefix.
     # NOTE: This ensures that the local and hosted experiences have consistent routes.
     add_prefix_to_app_routes(app, "/live")
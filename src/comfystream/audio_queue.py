@@ -0,0 +1,396 @@
+"""Bounded audio input queue with a per-stream memory budget."""
+
+import asyncio
+import threading
+from collections import deque
+from queue import Empty
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+from comfystream.eviction import QueueClosed
+
+DROP_OLDEST = "drop_oldest"
+TIME_STRETCH = "time_stretch"
+BACKPRESSURE = "backpressure"
+AUDIO_OVERFLOW_POLICIES = (DROP_OLDEST, TIME_STRETCH, BACKPRESSURE)
+
+DEFAULT_MAX_DURATION_MS = 1000.0
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+
+# Never compress the backlog to less than this fraction of its length in one go
+MIN_STRETCH_RATIO = 0.5
+
+# Length of the frames overlap-added by the time stretch, in seconds
+STRETCH_FRAME_SECONDS = 0.02
+
+
+def window_samples(sample_rate: int, buffer_size: float, hop_size: float = 0.0) -> Tuple[int, int]:
+    """Return the window and hop in samples of LoadAudioTensor's sizes in ms.
+
+    A hop of 0 or of at least the window makes the windows consecutive.
+    """
+    window = int(sample_rate * buffer_size / 1000)
+    if 0 < hop_size < buffer_size:
+        return window, int(sample_rate * hop_size / 1000)
+    return window, window
+
+
+def time_stretch(samples: np.ndarray, target: int, frame_length: int) -> np.ndarray:
+    """Shorten audio to ``target`` samples without changing its pitch.
+
+    Waveform similarity overlap-add: Hann windowed frames are read at a wider hop than
+    they are overlap-added at, so the waveform inside every frame, and with it the
+    pitch, is kept and only the time between frames shrinks. Each frame is shifted by
+    up to a quarter frame to line up with the one before, which avoids the phase
+    jumps a plain overlap-add makes in tonal audio.
+
+    Args:
+        samples: The samples to shorten.
+        target: Number of samples to return, at most ``len(samples)``.
+        frame_length: Length of the overlap-added frames in samples.
+
+    Returns:
+        The shortened samples, with the dtype of ``samples``.
+    """
+    frame_length = max(4, frame_length - frame_length % 2)
+    if samples.shape[0] < 2 * frame_length or target < frame_length:
+        # Too short to overlap-add, keep the newest samples
+        return samples[-target:] if target else samples[:0]
+
+    source = samples.astype(np.float32)
+    last_start = source.shape[0] - frame_length
+    synthesis_hop = frame_length // 2
+    analysis_hop = synthesis_hop * last_start / max(target - frame_length, 1)
+    tolerance = frame_length // 4
+    window = np.hanning(frame_length + 1)[:-1].astype(np.float32)
+    output = np.zeros(target + frame_length, dtype=np.float32)
+    weights = np.zeros(target + frame_length, dtype=np.float32)
+    start = 0
+    for idx in range(-(-(target - frame_length) // synthesis_hop) + 1):
+        if idx:
+            # Continue from where the previous frame would have gone on
+            continuation = min(start + synthesis_hop, last_start)
+            template = source[continuation:continuation + synthesis_hop]
+            expected = min(round(idx * analysis_hop), last_start)
+            low = max(expected - tolerance, 0)
+            high = min(expected + tolerance, last_start)
+            similarity = np.correlate(source[low:high + synthesis_hop], template, mode="valid")
+            start = low + int(np.argmax(similarity))
+        position = idx * synthesis_hop
+        output[position:position + frame_length] += source[start:start + frame_length] * window
+        weights[position:position + frame_length] += window
+    output = output[:target] / np.maximum(weights[:target], 1e-3)
+    if np.issubdtype(samples.dtype, np.integer):
+        info = np.iinfo(samples.dtype)
+        output = np.clip(np.round(output), info.min, info.max)
+    return output.astype(samples.dtype)
+
+
+class AudioQueue:
+    """Thread-safe audio frame queue bounded by queued duration and bytes.
+
+    When the queue goes over budget the overflow policy decides what happens:
+
+    - ``drop_oldest`` drops the oldest queued frames.
+    - ``time_stretch`` shortens the queued backlog without changing its pitch so the
+      prompt catches up without dropping whole frames.
+    - ``backpressure`` lets the producer wait for space via ``wait_for_space`` and
+      only drops frames if the wait times out.
+
+    The byte budget is always enforced, so memory stays bounded whatever the policy.
+
+    Prompt runs reserve the samples of their next window before they start, so a run
+    never blocks a worker thread waiting for audio, and ``on_put`` is called whenever
+    more audio may be available to wake parked runs. Shedding load never touches the
+    samples promised to reserved runs.
+    """
+
+    def __init__(
+        self,
+        policy: str = DROP_OLDEST,
+        max_duration_ms: float = DEFAULT_MAX_DURATION_MS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self._frames: Deque[Any] = deque()
+        self._samples = 0
+        self._bytes = 0
+        self._sample_rate: Optional[int] = None
+        self._not_empty = threading.Condition()
+        self.dropped_frames = 0
+        self.dropped_samples = 0
+        self.stretched_samples = 0
+        self._closed = False
+        # Runs that reserved their next window and have not taken it yet, the window
+        # and hop in samples, and the samples LoadAudioTensor holds beyond the queue
+        self._reserved = 0
+        self._window: Optional[Tuple[int, int]] = None
+        self._buffered = 0
+        # Called without the lock after a frame was queued or a window was taken
+        self.on_put: Optional[Callable[[], None]] = None
+        # Set by a producer waiting in wait_for_space, called after frames were removed
+        self._on_space: Optional[Callable[[], None]] = None
+        self.configure(policy, max_duration_ms, max_bytes)
+
+    def configure(
+        self,
+        policy: str = DROP_OLDEST,
+        max_duration_ms: float = DEFAULT_MAX_DURATION_MS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        """Set the overflow policy and the budget of the queue."""
+        if policy not in AUDIO_OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown audio overflow policy {policy}, expected one of {AUDIO_OVERFLOW_POLICIES}"
+            )
+        with self._not_empty:
+            self.policy = policy
+            self.max_duration_ms = max_duration_ms
+            self.max_bytes = max_bytes
+
+    def _max_samples(self) -> Optional[int]:
+        if self._sample_rate is None:
+            return None
+        return int(self._sample_rate * self.max_duration_ms / 1000)
+
+    def _is_over_budget(self, samples: int = 0, nbytes: int = 0) -> bool:
+        max_samples = self._max_samples()
+        return self._bytes + nbytes > self.max_bytes or (
+            max_samples is not None and self._samples + samples > max_samples
+        )
+
+    def _reserved_samples(self) -> int:
+        """Queued samples the reserved runs will take."""
+        if not self._reserved:
+            return 0
+        window, hop = self._window
+        return max(0, window + (self._reserved - 1) * hop - self._buffered)
+
+    def _can_drop_oldest(self) -> bool:
+        return (
+            len(self._frames) > 1
+            and self._samples - self._frames[0].side_data.input.shape[0] >= self._reserved_samples()
+        )
+
+    def _drop_oldest(self):
+        frame = self._frames.popleft()
+        self._samples -= frame.side_data.input.shape[0]
+        self._bytes -= frame.side_data.input.nbytes
+        self.dropped_frames += 1
+        self.dropped_samples += frame.side_data.input.shape[0]
+
+    def _stretch_backlog(self):
+        """Time stretch the whole backlog into a single frame that fits the budget."""
+        inputs = [frame.side_data.input for frame in self._frames]
+        backlog = np.concatenate(inputs)
+        target = max(
+            int(backlog.shape[0] * MIN_STRETCH_RATIO),
+            min(self._max_samples() or backlog.shape[0], self.max_bytes // backlog.itemsize),
+            self._reserved_samples(),
+        )
+        if target >= backlog.shape[0]:
+            return
+
+        stretched = time_stretch(
+            backlog, target, int(self._sample_rate * STRETCH_FRAME_SECONDS)
+        )
+
+        # Keep the newest frame object so its metadata (sample rate) is preserved
+        frame = self._frames[-1]
+        frame.side_data.input = stretched
+        self._frames.clear()
+        self._frames.append(frame)
+        self.stretched_samples += backlog.shape[0] - target
+        self._samples = stretched.shape[0]
+        self._bytes = stretched.nbytes
+
+    def put(self, frame: Any):
+        """Queue an audio frame and shed load if the queue is over budget.
+
+        Args:
+            frame: The audio frame, with its int16 samples in ``side_data.input``.
+        """
+        with self._not_empty:
+            if self._closed:
+                return
+            self._sample_rate = frame.sample_rate
+            self._frames.append(frame)
+            self._samples += frame.side_data.input.shape[0]
+            self._bytes += frame.side_data.input.nbytes
+
+            if self.policy == TIME_STRETCH and self._is_over_budget() and len(self._frames) > 1:
+                self._stretch_backlog()
+            while self._is_over_budget() and self._can_drop_oldest():
+                self._drop_oldest()
+            self._not_empty.notify()
+        on_put = self.on_put
+        if on_put is not None:
+            on_put()
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        """Remove and return the oldest queued frame.
+
+        Raises:
+            queue.Empty: If no frame is available and block is False or the timeout
+                elapsed.
+            QueueClosed: If the queue was closed.
+        """
+        with self._not_empty:
+            if not self._not_empty.wait_for(
+                lambda: self._frames or self._closed, timeout if block else 0
+            ):
+                raise Empty
+            if self._closed:
+                raise QueueClosed
+            frame = self._frames.popleft()
+            self._samples -= frame.side_data.input.shape[0]
+            self._bytes -= frame.side_data.input.nbytes
+        self._notify_space()
+        return frame
+
+    def try_reserve(self, buffer_size: float, hop_size: float = 0.0) -> bool:
+        """Reserve the samples of the next window of a run about to start.
+
+        Args:
+            buffer_size: Window of the run's LoadAudioTensor in ms.
+            hop_size: Hop of the run's LoadAudioTensor in ms.
+
+        Returns:
+            Whether enough audio for a window that no other run reserved is queued.
+        """
+        with self._not_empty:
+            if self._sample_rate is None:
+                return False
+            self._window = window_samples(self._sample_rate, buffer_size, hop_size)
+            self._reserved += 1
+            # A window over the budget never fits in the queue, the run then waits
+            # in LoadAudioTensor for the rest of it
+            budget = min(self._max_samples(), self.max_bytes // np.dtype(np.int16).itemsize)
+            if self._samples >= min(self._reserved_samples(), budget):
+                return True
+            self._reserved -= 1
+            return False
+
+    def window_taken(self, buffered: int):
+        """Record that a run took its window.
+
+        Args:
+            buffered: Samples LoadAudioTensor still buffers for the next windows.
+        """
+        with self._not_empty:
+            if self._reserved:
+                self._reserved -= 1
+            self._buffered = buffered
+        on_put = self.on_put
+        if on_put is not None:
+            on_put()
+
+    def clear(self) -> int:
+        """Drop all queued frames without blocking.
+
+        Returns:
+            The number of frames dropped.
+        """
+        with self._not_empty:
+            count = len(self._frames)
+            self._frames.clear()
+            self._samples = 0
+            self._bytes = 0
+            self._reserved = 0
+        self._notify_space()
+        return count
+
+    def close(self):
+        """Wake up and fail blocked consumers and stop accepting frames."""
+        with self._not_empty:
+            self._closed = True
+            self._not_empty.notify_all()
+        self._notify_space()
+
+    def reopen(self):
+        """Accept frames again after ``close``."""
+        with self._not_empty:
+            self._closed = False
+
+    def has_space(self, frame: Any = None) -> bool:
+        """Return whether the frame can be queued without going over the budget.
+
+        Args:
+            frame: The audio frame to queue, None to check the queued audio only.
+        """
+        samples = nbytes = 0
+        if frame is not None:
+            samples, nbytes = frame.side_data.input.shape[0], frame.side_data.input.nbytes
+        with self._not_empty:
+            return not self._is_over_budget(samples, nbytes)
+
+    def _notify_space(self):
+        on_space = self._on_space
+        if on_space is not None:
+            on_space()
+
+    async def wait_for_space(self, timeout: float, frame: Any = None) -> bool:
+        """Wait until a frame fits in the budget, used to apply backpressure.
+
+        The producer is woken by the consumer removing frames, it does not poll. Only
+        one producer may wait at a time.
+
+        Args:
+            timeout: Maximum time to wait in seconds.
+            frame: The audio frame to queue, None to wait for the queued audio to be
+                under budget.
+
+        Returns:
+            Whether the queue has space, False if the timeout elapsed or the queue was
+            closed.
+        """
+        loop = asyncio.get_running_loop()
+        space = asyncio.Event()
+
+        def on_space():
+            try:
+                loop.call_soon_threadsafe(space.set)
+            except RuntimeError:
+                # The loop was closed while a worker thread was still reading
+                pass
+
+        deadline = loop.time() + timeout
+        self._on_space = on_space
+        try:
+            while True:
+                # Cleared before the check, so frames removed in between set it again
+                space.clear()
+                if self.has_space(frame):
+                    return True
+                remaining = deadline - loop.time()
+                if self._closed or remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(space.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return self.has_space(frame)
+        finally:
+            self._on_space = None
+
+    def empty(self) -> bool:
+        with self._not_empty:
+            return not self._frames
+
+    def qsize(self) -> int:
+        with self._not_empty:
+            return len(self._frames)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the policy, the queued amount and the shed load counters."""
+        with self._not_empty:
+            return {
+                "policy": self.policy,
+                "queued_frames": len(self._frames),
+                "queued_bytes": self._bytes,
+                "queued_ms": (
+                    self._samples * 1000 / self._sample_rate if self._sample_rate else 0.0
+                ),
+                "dropped_frames": self.dropped_frames,
+                "dropped_samples": self.dropped_samples,
+                "stretched_samples": self.stretched_samples,
+            }
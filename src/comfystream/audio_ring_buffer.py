@@ -0,0 +1,83 @@
+"""Fixed-capacity int16 ring buffer with zero-copy reads."""
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Preallocated ring of int16 samples.
+
+    Every sample is stored twice, at ``i`` and ``i + capacity``, so any run of up to
+    ``capacity`` samples starting inside the ring is contiguous in memory and ``peek``
+    can return a view instead of concatenating the wrapped parts. Writes cost twice
+    the copies in exchange for copy-free reads.
+
+    Reading a window and consuming less than the window (hop < window) yields
+    overlapping windows for models that need context across chunks.
+
+    A view returned by ``peek`` stays valid until the samples it covers have been
+    consumed and overwritten by later writes, i.e. for at least
+    ``capacity - len(self)`` more written samples.
+    """
+
+    def __init__(self, capacity: int, dtype=np.int16):
+        """Initialize the ring buffer.
+
+        Args:
+            capacity: Maximum number of buffered samples.
+            dtype: Sample type.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._buffer = np.zeros(2 * capacity, dtype=dtype)
+        self._head = 0
+        self._size = 0
+        self.dropped_samples = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, samples: np.ndarray):
+        """Append samples, dropping the oldest buffered samples if the ring is full."""
+        count = samples.shape[0]
+        if count > self.capacity:
+            self.dropped_samples += count - self.capacity
+            samples = samples[-self.capacity:]
+            count = self.capacity
+
+        overflow = self._size + count - self.capacity
+        if overflow > 0:
+            self.consume(overflow)
+            self.dropped_samples += overflow
+
+        tail = (self._head + self._size) % self.capacity
+        first = min(count, self.capacity - tail)
+        self._buffer[tail:tail + first] = samples[:first]
+        self._buffer[tail + self.capacity:tail + self.capacity + first] = samples[:first]
+        rest = count - first
+        if rest:
+            self._buffer[:rest] = samples[first:]
+            self._buffer[self.capacity:self.capacity + rest] = samples[first:]
+        self._size += count
+
+    def peek(self, count: int) -> np.ndarray:
+        """Return a zero-copy view of the oldest count samples without consuming them."""
+        if count > self._size:
+            raise ValueError(f"Cannot read {count} samples, only {self._size} are buffered")
+        return self._buffer[self._head:self._head + count]
+
+    def consume(self, count: int):
+        """Discard the oldest count samples."""
+        count = min(count, self._size)
+        self._head = (self._head + count) % self.capacity
+        self._size -= count
+
+    def read(self, count: int) -> np.ndarray:
+        """Return a view of the oldest count samples and consume them."""
+        view = self.peek(count)
+        self.consume(count)
+        return view
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
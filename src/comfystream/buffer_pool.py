@@ -0,0 +1,101 @@
+"""Reusable, resolution-keyed buffers for video pre- and postprocessing."""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+
+class InputBufferPool:
+    """Pool of float32 HxWx3 buffers that preprocessed frames are written into.
+
+    A buffer is held by its frame until the frame's output has been matched (or the
+    frame was dropped) and is then released back to the pool. Buffers of other shapes
+    are discarded when the resolution changes.
+    """
+
+    def __init__(self, max_free_buffers: int = 8):
+        self._max_free_buffers = max_free_buffers
+        self._shape = None
+        self._free: List[np.ndarray] = []
+        self._in_use: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.allocations = 0
+
+    def acquire(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Get a float32 buffer of the given shape, allocating one if none is free."""
+        with self._lock:
+            if shape != self._shape:
+                self._shape = shape
+                self._free.clear()
+            if self._free:
+                buffer = self._free.pop()
+            else:
+                buffer = np.empty(shape, dtype=np.float32)
+                self.allocations += 1
+            self._in_use[buffer.ctypes.data] = buffer
+            return buffer
+
+    def release(self, data_ptr: Optional[int]):
+        """Return the buffer starting at data_ptr to the pool, unknown pointers are ignored."""
+        if data_ptr is None:
+            return
+        with self._lock:
+            buffer = self._in_use.pop(data_ptr, None)
+            if (
+                buffer is not None
+                and buffer.shape == self._shape
+                and len(self._free) < self._max_free_buffers
+            ):
+                self._free.append(buffer)
+
+    def clear(self):
+        with self._lock:
+            self._shape = None
+            self._free.clear()
+            self._in_use.clear()
+
+
+class OutputBuffers:
+    """Scratch tensors for converting a float output image to uint8 on the host.
+
+    The buffers are rebuilt when the shape, dtype or device of the output changes and
+    reused otherwise. The host buffer is pinned when the output lives on the GPU.
+    """
+
+    def __init__(self):
+        self._key = None
+        self.allocations = 0
+
+    def get(self, output: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Return the scaled, quantized and host buffers for an output tensor."""
+        key = (tuple(output.shape), output.dtype, output.device)
+        if key != self._key:
+            self._key = key
+            self._scaled = torch.empty_like(output)
+            self._quantized = torch.empty(output.shape, dtype=torch.uint8, device=output.device)
+            if output.device.type == "cpu":
+                self._host = self._quantized
+            else:
+                self._host = torch.empty(
+                    output.shape, dtype=torch.uint8, pin_memory=torch.cuda.is_available()
+                )
+            self.allocations += 1
+        return self._scaled, self._quantized, self._host
+
+    def to_uint8(self, output: torch.Tensor) -> np.ndarray:
+        """Convert a [0, 1] float image to a uint8 host array, in place in the buffers.
+
+        The returned array is only valid until the next call.
+        """
+        if output.dtype == torch.uint8 and output.device.type == "cpu":
+            # Already quantized, e.g. by an inference worker process
+            return output.numpy()
+        scaled, quantized, host = self.get(output)
+        torch.mul(output, 255.0, out=scaled)
+        scaled.clamp_(0, 255)
+        quantized.copy_(scaled)
+        if host is not quantized:
+            host.copy_(quantized)
+        return host.numpy()
@@ -1,8 +1,20 @@
 import asyncio
-from typing import List
+import copy
+from typing import Any, Dict, List, Optional, Tuple, Union
 import logging
 
 from comfystream import tensor_cache
+from comfystream.audio_queue import (
+    BACKPRESSURE,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MAX_DURATION_MS,
+    DROP_OLDEST,
+)
+from comfystream.eviction import EvictionPolicy, create_eviction_policy
+from comfystream.input_gate import InputGate
+from comfystream.node_index import describe_node, node_index
+from comfystream.node_timing import NodeTimings, install as install_node_timing, tag_prompt
+from comfystream.prompt_update import apply_input_changes, copy_changed_nodes, diff_prompt_inputs
 from comfystream.utils import convert_prompt
 
 from comfy.api.components.schema.prompt import PromptDictInput
@@ -11,37 +23,321 @@ from comfy.client.embedded_comfy_client import EmbeddedComfyClient
 
 logger = logging.getLogger(__name__)
 
+# Longest time put_audio_input waits for space under the backpressure policy
+AUDIO_BACKPRESSURE_TIMEOUT = 0.1
+
+# Runs held by the reorder buffer per in-flight run before a missing run is skipped
+REORDER_WINDOW_PER_RUN = 2
+
+
+def _audio_window(node: Dict[str, Any]) -> Tuple[float, float]:
+    """Return the buffer and hop size in ms of a LoadAudioTensor node."""
+    inputs = node.get("inputs", {})
+    buffer_size = inputs.get("buffer_size", 500.0)
+    hop_size = inputs.get("hop_size", 0.0)
+    if not isinstance(buffer_size, (int, float)):
+        buffer_size = 500.0
+    if not isinstance(hop_size, (int, float)):
+        hop_size = 0.0
+    return float(buffer_size), float(hop_size)
+
 
 class ComfyStreamClient:
-    def __init__(self, max_workers: int = 1, **kwargs):
-        config = Configuration(**kwargs)
-        self.comfy_client = EmbeddedComfyClient(config, max_workers=max_workers)
+    def __init__(
+        self,
+        max_workers: int = 1,
+        session_id: Optional[str] = None,
+        comfy_client: Optional[EmbeddedComfyClient] = None,
+        eviction_policy: Union[str, EvictionPolicy, None] = None,
+        audio_overflow_policy: str = DROP_OLDEST,
+        audio_max_queued_ms: float = DEFAULT_MAX_DURATION_MS,
+        audio_max_queued_bytes: int = DEFAULT_MAX_BYTES,
+        batch_size: int = 1,
+        batch_window_ms: float = 0.0,
+        max_runs_ahead: Optional[int] = None,
+        prompt_depth: int = 1,
+        node_timing: bool = False,
+        **kwargs,
+    ):
+        if prompt_depth < 1:
+            raise ValueError("prompt_depth must be at least 1")
+        # Runs of a prompt executing at once, each needs a worker of the ComfyUI client
+        self.prompt_depth = prompt_depth
+        # Sharing an EmbeddedComfyClient lets several sessions use the same warmed process
+        self._owns_comfy_client = comfy_client is None
+        if comfy_client is None:
+            config = Configuration(**kwargs)
+            comfy_client = EmbeddedComfyClient(
+                config, max_workers=max(max_workers, prompt_depth)
+            )
+        self.comfy_client = comfy_client
+        self.session_id = session_id or tensor_cache.DEFAULT_SESSION_ID
+        self.eviction_policy = create_eviction_policy(eviction_policy)
+        self.audio_queue_config = (audio_overflow_policy, audio_max_queued_ms, audio_max_queued_bytes)
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        # LoadTensor gathers up to batch_size frames arriving within the batch window
+        self.batch_size = batch_size
+        self.batch_window_ms = batch_window_ms
+        # Wall and CPU time of every node, for finding the expensive nodes of a prompt
+        self.node_timing = node_timing and install_node_timing()
+        self._configure_channels()
+        # Without input frames to wait for, runs in flight and unconsumed video outputs
+        # are bounded together. A run frees its slot once it finished, so a run whose
+        # output was dropped or never produced does not hold it
+        self.max_runs_ahead = max_runs_ahead
+        self._runs_ahead = 0
+        self._run_slot_freed = asyncio.Event() if max_runs_ahead else None
+        # Queued before every run when runs are not driven by input frames
+        self.run_input = None
         self.running_prompts = {} # To be used for cancelling tasks
         self.current_prompts = []
+        # The prompts as received, updates are diffed against them
+        self._raw_prompts = []
+        # Incremented by every update so a slower, older update is not swapped in
+        self._update_version = 0
+        self.update_stats = {"incremental": 0, "full": 0, "superseded": 0}
+        # Gate of the input queue each prompt reads, shared by prompts reading the same queue
+        self._input_gates: Dict[Tuple[str, str], InputGate] = {}
+        self._prompt_gates: List[Optional[InputGate]] = []
+        # Whether each prompt feeds the next one instead of all reading the input
+        self.chain_prompts = False
         self.cleanup_lock = asyncio.Lock()
 
-    async def set_prompts(self, prompts: List[PromptDictInput]):
-        self.current_prompts = [convert_prompt(prompt) for prompt in prompts]
+    @property
+    def channels(self) -> tensor_cache.SessionChannels:
+        return tensor_cache.get_session(self.session_id)
+
+    def _configure_channels(self):
+        channels = self.channels
+        # The channels of the default session outlive the cleanup that closed them
+        channels.image_inputs.reopen()
+        channels.audio_inputs.reopen()
+        channels.image_inputs.policy = self.eviction_policy
+        channels.image_inputs.batch_size = self.batch_size
+        channels.image_inputs.batch_window = self.batch_window_ms / 1000.0
+        channels.audio_inputs.configure(*self.audio_queue_config)
+        channels.reorder.window = REORDER_WINDOW_PER_RUN * self.prompt_depth
+        if self.node_timing and channels.node_timings is None:
+            channels.node_timings = NodeTimings()
+
+    def _stage_session_ids(self) -> List[str]:
+        """Sessions whose image inputs the prompts read, one per stage when chained.
+
+        The first stage reads the inputs of the client's session and every later
+        stage reads from a link session that the previous stage writes to.
+        """
+        if not self.chain_prompts:
+            return [self.session_id]
+        return [self._stage_session_id(idx) for idx in range(len(self.current_prompts))]
+
+    def _stage_session_id(self, idx: int) -> str:
+        return self.session_id if idx == 0 else f"{self.session_id}:stage{idx}"
+
+    def _prompt_session_id(self, idx: int) -> str:
+        """Session whose image inputs the prompt at idx reads."""
+        return self._stage_session_id(idx) if self.chain_prompts else self.session_id
+
+    def _configure_stage_links(self):
+        for session_id in self._stage_session_ids()[1:]:
+            link = tensor_cache.get_session(session_id)
+            link.chained = True
+            link.image_inputs.batch_size = self.batch_size
+            link.reorder.window = REORDER_WINDOW_PER_RUN * self.prompt_depth
+            if self.node_timing and link.node_timings is None:
+                link.node_timings = NodeTimings()
+
+    def _convert_prompts(self, prompts: List[PromptDictInput]) -> List[PromptDictInput]:
+        return [
+            self._convert_prompt(idx, prompt, len(prompts))
+            for idx, prompt in enumerate(prompts)
+        ]
+
+    def _convert_prompt(self, idx: int, prompt: PromptDictInput, count: int) -> PromptDictInput:
+        # Runs that are not driven by input frames may generate from nothing
+        require_input = self.max_runs_ahead is None
+        if not self.chain_prompts:
+            converted = convert_prompt(prompt, self.session_id, require_input=require_input)
+        else:
+            # The last stage writes to the outputs of the client's session
+            output_session_id = (
+                self._stage_session_id(idx + 1) if idx + 1 < count else self.session_id
+            )
+            converted = convert_prompt(
+                prompt,
+                self.session_id,
+                input_session_id=self._stage_session_id(idx),
+                output_session_id=output_session_id,
+                require_input=require_input,
+            )
+        if self.node_timing:
+            tag_prompt(converted, idx)
+        return converted
+
+    def _configure_gates(self):
+        """Gate every prompt on the input queue its LoadTensor or LoadAudioTensor reads.
+
+        Prompts without an input node, such as generative prompts, are not gated.
+        """
+        gates = {}
+        self._prompt_gates = []
+        for idx, prompt in enumerate(self.current_prompts):
+            nodes = {node.get("class_type"): node for node in prompt.values()}
+            audio_window = None
+            if "LoadTensor" in nodes:
+                key = (self._prompt_session_id(idx), "video")
+            elif "LoadAudioTensor" in nodes:
+                key = (self.session_id, "audio")
+                audio_window = _audio_window(nodes["LoadAudioTensor"])
+            else:
+                self._prompt_gates.append(None)
+                continue
+            gate = gates.get(key) or self._input_gates.get(key)
+            if gate is None:
+                channels = tensor_cache.get_session(key[0])
+                gate = InputGate(channels.image_inputs if key[1] == "video" else channels.audio_inputs)
+            if audio_window is not None:
+                gate.audio_window = audio_window
+            gates[key] = gate
+            self._prompt_gates.append(gate)
+        self._input_gates = gates
+
+    def _retain_node_timings(self):
+        """Forget the timings of nodes that were removed from the prompts."""
+        if not self.node_timing:
+            return
+        node_keys = {}
+        for idx, prompt in enumerate(self.current_prompts):
+            node_keys.setdefault(self._prompt_session_id(idx), set()).update(
+                (idx, node_id) for node_id in prompt
+            )
+        for session_id, keys in node_keys.items():
+            channels = tensor_cache.find_session(session_id)
+            if channels is not None and channels.node_timings is not None:
+                channels.node_timings.retain(keys)
+
+    def _prepare_update(
+        self,
+        raw_prompts: List[PromptDictInput],
+        converted_prompts: List[PromptDictInput],
+        prompts: List[PromptDictInput],
+    ) -> Tuple[List[PromptDictInput], List[PromptDictInput], int]:
+        """Build the converted prompts of an update from the running ones.
+
+        Prompts whose graph is unchanged only get their changed inputs copied, others
+        are converted again. Runs on a worker thread.
+
+        Returns:
+            A copy of the new prompts, their converted prompts and how many of them
+            were converted again.
+        """
+        raws = []
+        updated = []
+        converted_again = 0
+        for idx, prompt in enumerate(prompts):
+            changes = diff_prompt_inputs(raw_prompts[idx], prompt)
+            if changes == {}:
+                raws.append(raw_prompts[idx])
+                updated.append(converted_prompts[idx])
+                continue
+            if changes is not None:
+                converted = apply_input_changes(converted_prompts[idx], prompt, changes)
+                if converted is not None:
+                    raws.append(copy_changed_nodes(raw_prompts[idx], prompt, changes))
+                    updated.append(converted)
+                    continue
+            # Not shared with the caller, who may modify and resend the same dicts
+            raws.append(copy.deepcopy(prompt))
+            updated.append(self._convert_prompt(idx, prompt, len(prompts)))
+            converted_again += 1
+        return raws, updated, converted_again
+
+    async def set_prompts(self, prompts: List[PromptDictInput], chain: bool = False):
+        """Start running the prompts.
+
+        Args:
+            prompts: The prompts to run.
+            chain: Run the prompts as stages where prompt i feeds prompt i + 1. Every
+                stage runs concurrently on its own workers with a bounded queue
+                between stages, so the slowest stage limits the throughput. The
+                ComfyUI client needs a worker per stage and in-flight run.
+        """
+        # The session channels are recreated if a previous cleanup removed them
+        self._configure_channels()
+        self.chain_prompts = chain
+        self.current_prompts = self._convert_prompts(prompts)
+        self._raw_prompts = copy.deepcopy(list(prompts))
+        self._configure_stage_links()
+        # The gates of a previous run read queues a cleanup has closed
+        self._input_gates = {}
+        self._configure_gates()
+        self._retain_node_timings()
         for idx in range(len(self.current_prompts)):
-            task = asyncio.create_task(self.run_prompt(idx))
-            self.running_prompts[idx] = task
+            # Several runs in flight overlap the CPU work of one frame with the
+            # compute of another, the reorder buffer keeps outputs in input order
+            for slot in range(self.prompt_depth):
+                task = asyncio.create_task(self.run_prompt(idx))
+                self.running_prompts[(idx, slot)] = task
 
     async def update_prompts(self, prompts: List[PromptDictInput]):
+        """Replace the running prompts without restarting their runs.
+
+        The new prompts are diffed against the running ones and converted on a worker
+        thread. They are swapped in with a single assignment, so runs in flight finish
+        with the prompts they started with and every later run uses the new ones. An
+        update finishing after a newer one is discarded.
+        """
         # TODO: currently under the assumption that only already running prompts are updated
         if len(prompts) != len(self.current_prompts):
             raise ValueError(
                 "Number of updated prompts must match the number of currently running prompts."
             )
-        self.current_prompts = [convert_prompt(prompt) for prompt in prompts]
+        self._update_version += 1
+        version = self._update_version
+        loop = asyncio.get_running_loop()
+        prompts, converted, converted_again = await loop.run_in_executor(
+            None, self._prepare_update, self._raw_prompts, self.current_prompts, prompts
+        )
+        if version != self._update_version:
+            self.update_stats["superseded"] += 1
+            return
+        self._raw_prompts = prompts
+        self.current_prompts = converted
+        self._configure_gates()
+        self._retain_node_timings()
+        self.update_stats["full"] += converted_again
+        self.update_stats["incremental"] += len(prompts) - converted_again
+
+    async def _acquire_run_slot(self):
+        outputs = self.channels.image_outputs
+        while self._runs_ahead + outputs.qsize() >= self.max_runs_ahead:
+            self._run_slot_freed.clear()
+            await self._run_slot_freed.wait()
+        self._runs_ahead += 1
+
+    def _release_run_slot(self):
+        self._runs_ahead -= 1
+        self._run_slot_freed.set()
 
     async def run_prompt(self, prompt_index: int):
         while True:
+            if self._run_slot_freed is not None:
+                await self._acquire_run_slot()
+                if self.run_input is not None:
+                    self.put_video_input(self.run_input, protected=True)
             try:
+                # Parks without holding a worker thread until a frame is queued for the run
+                gate = self._prompt_gates[prompt_index]
+                if gate is not None:
+                    await gate.wait()
                 await self.comfy_client.queue_prompt(self.current_prompts[prompt_index])
             except Exception as e:
                 await self.cleanup()
                 logger.error(f"Error running prompt: {str(e)}")
                 raise
+            finally:
+                if self._run_slot_freed is not None:
+                    self._release_run_slot()
 
     async def cleanup(self):
         async with self.cleanup_lock:
@@ -54,43 +350,138 @@ class ComfyStreamClient:
                     pass
             self.running_prompts.clear()
 
-            if self.comfy_client.is_running:
+            for session_id in self._stage_session_ids():
+                # Fails the runs whose LoadTensor or LoadAudioTensor still blocks a
+                # worker thread, before the executor waits for its workers to stop
+                channels = tensor_cache.find_session(session_id)
+                if channels is None:
+                    # Removed by an earlier cleanup, not recreated
+                    continue
+                channels.image_inputs.close()
+                channels.audio_inputs.close()
+
+            if self._owns_comfy_client and self.comfy_client.is_running:
                 try:
                     await self.comfy_client.__aexit__()
                 except Exception as e:
                     logger.error(f"Error during ComfyClient cleanup: {e}")
 
-
             await self.cleanup_queues()
-            logger.info("Client cleanup complete")
+            for session_id in self._stage_session_ids()[1:]:
+                tensor_cache.remove_session(session_id)
+            tensor_cache.remove_session(self.session_id)
+            logger.info(f"Client cleanup complete for session {self.session_id}")
 
         
     async def cleanup_queues(self):
-        while not tensor_cache.image_inputs.empty():
-            tensor_cache.image_inputs.get()
+        channels = tensor_cache.find_session(self.session_id)
+        if channels is None:
+            return
+
+        # Frames expired under the deadline policy count as queued but are never returned
+        channels.image_inputs.clear()
+        channels.audio_inputs.clear()
 
-        while not tensor_cache.audio_inputs.empty():
-            tensor_cache.audio_inputs.get()
+        while not channels.image_outputs.empty():
+            await channels.image_outputs.get()
 
-        while not tensor_cache.image_outputs.empty():
-            await tensor_cache.image_outputs.get()
+        while not channels.audio_outputs.empty():
+            await channels.audio_outputs.get()
 
-        while not tensor_cache.audio_outputs.empty():
-            await tensor_cache.audio_outputs.get()
+    def put_video_input(self, frame, protected: bool = False):
+        """Queue a video frame, the eviction policy decides which frames are dropped.
 
-    def put_video_input(self, frame):
-        if tensor_cache.image_inputs.full():
-            tensor_cache.image_inputs.get(block=True)
-        tensor_cache.image_inputs.put(frame)
+        Args:
+            frame: The frame to queue.
+            protected: Exempt the frame from being dropped on admission or expiry,
+                used for frames whose output is awaited such as warmup frames.
+        """
+        self.channels.image_inputs.put(frame, protected=protected)
     
-    def put_audio_input(self, frame):
-        tensor_cache.audio_inputs.put(frame)
+    async def put_audio_input(self, frame):
+        """Queue an audio frame within the audio budget of the session.
+
+        Under the backpressure policy this waits for the prompt to drain the queue
+        before queueing, which in turn slows down reading from the source track.
+        """
+        audio_inputs = self.channels.audio_inputs
+        if audio_inputs.policy == BACKPRESSURE:
+            await audio_inputs.wait_for_space(AUDIO_BACKPRESSURE_TIMEOUT, frame)
+        audio_inputs.put(frame)
 
     async def get_video_output(self):
-        return await tensor_cache.image_outputs.get()
+        _, output = await self.get_indexed_video_output()
+        return output
+
+    async def get_indexed_video_output(self) -> Tuple[Optional[int], Any]:
+        """Get the next video output with the sequence id of its input frame.
+
+        The sequence id is None for frames that were queued without one, such as
+        warmup frames.
+        """
+        output = await self.channels.image_outputs.get()
+        if self._run_slot_freed is not None:
+            # Each consumed output lets one more run start
+            self._run_slot_freed.set()
+        return output
     
     async def get_audio_output(self):
-        return await tensor_cache.audio_outputs.get()
+        return await self.channels.audio_outputs.get()
+
+    def get_video_input_stats(self) -> Dict[str, Any]:
+        """Get the eviction policy and kept/dropped counters of the video input queue."""
+        return self.channels.image_inputs.stats()
+
+    def get_audio_input_stats(self) -> Dict[str, Any]:
+        """Get the budget usage and shed load counters of the audio input queue."""
+        return self.channels.audio_inputs.stats()
+
+    def get_stage_stats(self) -> List[Dict[str, Any]]:
+        """Get the queued frames and run latency of every stage.
+
+        Without chaining all prompts read the same inputs and form a single stage.
+        """
+        stats = []
+        for idx, session_id in enumerate(self._stage_session_ids()):
+            channels = tensor_cache.get_session(session_id)
+            run_times = sorted(channels.run_times)
+            gate = self._input_gates.get((session_id, "video"))
+            stats.append({
+                "stage": idx,
+                "queued_frames": channels.image_inputs.qsize(),
+                "parked_runs": gate.parked if gate is not None else 0,
+                "runs": len(run_times),
+                "latency_ms": sum(run_times) / len(run_times) * 1000 if run_times else None,
+                "p95_latency_ms": (
+                    run_times[int(len(run_times) * 0.95)] * 1000 if run_times else None
+                ),
+            })
+        return stats
+
+    def get_node_timings(self) -> Dict[int, Dict[str, Dict[str, Any]]]:
+        """Get the rolling wall and CPU time percentiles of every node, per prompt.
+
+        Empty unless the client was created with node timing enabled.
+        """
+        if not self.node_timing:
+            return {}
+        timings = {}
+        for idx, prompt in enumerate(self.current_prompts):
+            channels = tensor_cache.find_session(self._prompt_session_id(idx))
+            if channels is None or channels.node_timings is None:
+                continue
+            node_stats = channels.node_timings.stats().get(idx, {})
+            timings[idx] = {
+                node_id: node_stats[node_id]
+                for node_id, node in prompt.items()
+                if node_id in node_stats
+                and node_stats[node_id]["class_type"] == node.get("class_type")
+            }
+        return timings
+
+    def get_reorder_stats(self) -> Dict[str, Any]:
+        """Get the in-flight depth and the counters of the output reorder buffer."""
+        return {"prompt_depth": self.prompt_depth, **self.channels.reorder.stats()}
 
     async def get_available_nodes(self):
         """Get metadata and available nodes info in a single pass"""
@@ -99,118 +490,27 @@ class ComfyStreamClient:
             return {}
 
         try:
-            from comfy.nodes.package import import_all_nodes_in_workspace
-            nodes = import_all_nodes_in_workspace()
+            # Loaded from disk or built off the event loop, then O(nodes in prompt)
+            class_types = {
+                node.get('class_type')
+                for prompt in self.current_prompts
+                for node in prompt.values()
+            }
+            await node_index.ensure_async(class_types)
+            node_timings = self.get_node_timings()
 
             all_prompts_nodes_info = {}
-            
             for prompt_index, prompt in enumerate(self.current_prompts):
-                # Get set of class types we need metadata for, excluding LoadTensor and SaveTensor
-                needed_class_types = {
-                    node.get('class_type') 
-                    for node in prompt.values()
-                }
-                remaining_nodes = {
-                    node_id 
-                    for node_id, node in prompt.items() 
-                }
                 nodes_info = {}
-
-                # Only process nodes until we've found all the ones we need
-                for class_type, node_class in nodes.NODE_CLASS_MAPPINGS.items():
-                    if not remaining_nodes:  # Exit early if we've found all needed nodes
-                        break
-
-                    if class_type not in needed_class_types:
-                        continue
-
-                    # Get metadata for this node type (same as original get_node_metadata)
-                    input_data = node_class.INPUT_TYPES() if hasattr(node_class, 'INPUT_TYPES') else {}
-                    input_info = {}
-
-                    # Process required inputs
-                    if 'required' in input_data:
-                        for name, value in input_data['required'].items():
-                            if isinstance(value, tuple):
-                                if len(value) == 1 and isinstance(value[0], list):
-                                    # Handle combo box case where value is ([option1, option2, ...],)
-                                    input_info[name] = {
-                                        'type': 'combo',
-                                        'value': value[0],  # The list of options becomes the value
-                                    }
-                                elif len(value) == 2:
-                                    input_type, config = value
-                                    input_info[name] = {
-                                        'type': input_type,
-                                        'required': True,
-                                        'min': config.get('min', None),
-                                        'max': config.get('max', None),
-                                        'widget': config.get('widget', None)
-                                    }
-                                elif len(value) == 1:
-                                    # Handle simple type case like ('IMAGE',)
-                                    input_info[name] = {
-                                        'type': value[0]
-                                    }
-                            else:
-                                logger.error(f"Unexpected structure for required input {name}: {value}")
-
-                    # Process optional inputs with same logic
-                    if 'optional' in input_data:
-                        for name, value in input_data['optional'].items():
-                            if isinstance(value, tuple):
-                                if len(value) == 1 and isinstance(value[0], list):
-                                    # Handle combo box case where value is ([option1, option2, ...],)
-                                    input_info[name] = {
-                                        'type': 'combo',
-                                        'value': value[0],  # The list of options becomes the value
-                                    }
-                                elif len(value) == 2:
-                                    input_type, config = value
-                                    input_info[name] = {
-                                        'type': input_type,
-                                        'required': False,
-                                        'min': config.get('min', None),
-                                        'max': config.get('max', None),
-                                        'widget': config.get('widget', None)
-                                    }
-                                elif len(value) == 1:
-                                    # Handle simple type case like ('IMAGE',)
-                                    input_info[name] = {
-                                        'type': value[0]
-                                    }
-                            else:
-                                logger.error(f"Unexpected structure for optional input {name}: {value}")
-
-                    # Now process any nodes in our prompt that use this class_type
-                    for node_id in list(remaining_nodes):
-                        node = prompt[node_id]
-                        if node.get('class_type') != class_type:
-                            continue
-
-                        node_info = {
-                            'class_type': class_type,
-                            'inputs': {}
-                        }
-
-                        if 'inputs' in node:
-                            for input_name, input_value in node['inputs'].items():
-                                input_metadata = input_info.get(input_name, {})
-                                node_info['inputs'][input_name] = {
-                                    'value': input_value,
-                                    'type': input_metadata.get('type', 'unknown'),
-                                    'min': input_metadata.get('min', None),
-                                    'max': input_metadata.get('max', None),
-                                    'widget': input_metadata.get('widget', None)
-                                }
-                                # For combo type inputs, include the list of options
-                                if input_metadata.get('type') == 'combo':
-                                    node_info['inputs'][input_name]['value'] = input_metadata.get('value', [])
-
-                        nodes_info[node_id] = node_info
-                        remaining_nodes.remove(node_id)
-
-                    all_prompts_nodes_info[prompt_index] = nodes_info
+                timings = node_timings.get(prompt_index, {})
+                for node_id, node in prompt.items():
+                    class_type = node.get('class_type')
+                    input_info = node_index.get(class_type)
+                    if input_info is not None:
+                        nodes_info[node_id] = describe_node(class_type, node, input_info)
+                        if node_id in timings:
+                            nodes_info[node_id]['timing'] = timings[node_id]
+                all_prompts_nodes_info[prompt_index] = nodes_info
 
             return all_prompts_nodes_info
 
@@ -0,0 +1,196 @@
+"""Data-parallel pool of clients, each running its own copy of the prompts."""
+
+import asyncio
+import itertools
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from comfystream.reorder_buffer import ReorderBuffer
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = "round_robin"
+LEAST_LOADED = "least_loaded"
+POOL_STRATEGIES = (ROUND_ROBIN, LEAST_LOADED)
+
+# Outputs held per frame in flight before a missing output is skipped
+REORDER_WINDOW_PER_FRAME = 2
+
+
+class ClientPool:
+    """Fans video frames out to several clients and reassembles their outputs in order.
+
+    Every client runs its own copy of the prompts on its own executor, e.g. a
+    ProcessComfyStreamClient per core for light models bound by the GIL. A frame goes
+    to one client, round-robin or to the client with the fewest frames in flight, and
+    the outputs of all clients are released in sequence id order. A client may drop
+    a frame, so once more than ``reorder_window`` outputs are held the missing ones
+    are skipped and arrive as late, if at all, and are dropped.
+
+    Frames without a sequence id, such as warmup frames, are sent to every client so
+    that all of them are warmed, and one output is returned once all clients answered.
+    Audio is processed by the first client only.
+
+    Exposes the ComfyStreamClient interface used by Pipeline.
+    """
+
+    def __init__(
+        self,
+        clients: List[Any],
+        strategy: str = ROUND_ROBIN,
+        reorder_window: Optional[int] = None,
+        session_id: Optional[str] = None,
+    ):
+        """Initialize the pool.
+
+        Args:
+            clients: The clients to fan frames out to, at least one.
+            strategy: ``round_robin`` or ``least_loaded``.
+            reorder_window: Outputs held while waiting for a missing one, defaults to
+                twice the frames the clients have in flight.
+            session_id: Id reported for the pool, defaults to the first client's.
+        """
+        if not clients:
+            raise ValueError("A client pool needs at least one client")
+        if strategy not in POOL_STRATEGIES:
+            raise ValueError(f"Unknown pool strategy {strategy}, expected one of {POOL_STRATEGIES}")
+        self.clients = clients
+        self.strategy = strategy
+        self.session_id = session_id or clients[0].session_id
+        self.batch_size = clients[0].batch_size
+        # Frames of all clients in flight at once
+        self.prompt_depth = clients[0].prompt_depth * len(clients)
+        self.chain_prompts = False
+        if reorder_window is None:
+            reorder_window = REORDER_WINDOW_PER_FRAME * self.batch_size * self.prompt_depth
+        self.reorder = ReorderBuffer(window=reorder_window)
+        self._next_client = itertools.cycle(range(len(clients)))
+        # Sequence ids sent to each client and not answered yet, oldest first
+        self._in_flight: List[Deque[int]] = [deque() for _ in clients]
+        self._broadcast_outputs = 0
+        self._outputs: asyncio.Queue = asyncio.Queue()
+        self._collectors: List[asyncio.Task] = []
+        self.dispatched = [0] * len(clients)
+
+    @property
+    def run_input(self):
+        return self.clients[0].run_input
+
+    @run_input.setter
+    def run_input(self, frame):
+        if frame is not None:
+            raise ValueError("Generative mode is not supported by a client pool")
+
+    def _pick_client(self) -> int:
+        if self.strategy == LEAST_LOADED:
+            # Ties go round-robin so idle clients share the load
+            start = next(self._next_client)
+            order = [(start + offset) % len(self.clients) for offset in range(len(self.clients))]
+            return min(order, key=lambda idx: len(self._in_flight[idx]))
+        return next(self._next_client)
+
+    def put_video_input(self, frame, protected: bool = False):
+        seq = getattr(frame.side_data, "seq", None)
+        if seq is None:
+            for client in self.clients:
+                client.put_video_input(frame, protected=protected)
+            return
+        idx = self._pick_client()
+        self._in_flight[idx].append(seq)
+        self.dispatched[idx] += 1
+        self.clients[idx].put_video_input(frame, protected=protected)
+
+    def _on_output(self, idx: int, seq: Optional[int], output: Any):
+        if seq is None:
+            self._broadcast_outputs += 1
+            if self._broadcast_outputs % len(self.clients) == 0:
+                self._outputs.put_nowait((None, output))
+            return
+        # A client answers in order, older frames still in flight were dropped by it
+        in_flight = self._in_flight[idx]
+        ready = []
+        while in_flight and in_flight[0] < seq:
+            ready.extend(self.reorder.skip(in_flight.popleft()))
+        if in_flight and in_flight[0] == seq:
+            in_flight.popleft()
+        ready.extend(self.reorder.push(seq, [(seq, output)]))
+        for item in ready:
+            self._outputs.put_nowait(item)
+
+    async def _collect(self, idx: int):
+        client = self.clients[idx]
+        while True:
+            seq, output = await client.get_indexed_video_output()
+            self._on_output(idx, seq, output)
+
+    async def set_prompts(self, prompts: List[Dict[Any, Any]], chain: bool = False):
+        """Start running a copy of the prompts on every client."""
+        self.chain_prompts = chain
+        await asyncio.gather(*(client.set_prompts(prompts, chain=chain) for client in self.clients))
+        if not self._collectors:
+            self._collectors = [
+                asyncio.create_task(self._collect(idx)) for idx in range(len(self.clients))
+            ]
+
+    async def update_prompts(self, prompts: List[Dict[Any, Any]]):
+        await asyncio.gather(*(client.update_prompts(prompts) for client in self.clients))
+
+    async def put_audio_input(self, frame):
+        await self.clients[0].put_audio_input(frame)
+
+    async def get_audio_output(self):
+        return await self.clients[0].get_audio_output()
+
+    async def get_video_output(self):
+        _, output = await self.get_indexed_video_output()
+        return output
+
+    async def get_indexed_video_output(self) -> Tuple[Optional[int], Any]:
+        """Get the next video output in sequence id order."""
+        return await self._outputs.get()
+
+    async def get_available_nodes(self):
+        return await self.clients[0].get_available_nodes()
+
+    def get_video_input_stats(self) -> Dict[str, Any]:
+        return {"workers": [client.get_video_input_stats() for client in self.clients]}
+
+    def get_audio_input_stats(self) -> Dict[str, Any]:
+        return self.clients[0].get_audio_input_stats()
+
+    def get_stage_stats(self) -> List[Dict[str, Any]]:
+        return [
+            {**stage, "worker": idx}
+            for idx, client in enumerate(self.clients)
+            for stage in client.get_stage_stats()
+        ]
+
+    def get_reorder_stats(self) -> Dict[str, Any]:
+        """Get the pool's reorder counters and the frames sent to each client."""
+        return {
+            "prompt_depth": self.prompt_depth,
+            "strategy": self.strategy,
+            "dispatched_frames": list(self.dispatched),
+            "in_flight_frames": [len(in_flight) for in_flight in self._in_flight],
+            **self.reorder.stats(),
+        }
+
+    def get_node_timings(self) -> Dict[int, Dict[str, Dict[str, Any]]]:
+        # Every client runs the same prompts, the first one is representative
+        return self.clients[0].get_node_timings()
+
+    @property
+    def update_stats(self) -> Dict[str, int]:
+        return self.clients[0].update_stats
+
+    async def cleanup(self):
+        for task in self._collectors:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._collectors = []
+        for client in self.clients:
+            await client.cleanup()
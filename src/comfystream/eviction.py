@@ -0,0 +1,368 @@
+"""Frame eviction policies for the bounded image input queue."""
+
+import time
+import threading
+from collections import deque
+from queue import Empty
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Type, Union
+
+
+class QueueClosed(Exception):
+    """Raised to a consumer blocked on a queue that was closed."""
+
+
+class QueuedFrame(NamedTuple):
+    frame: Any
+    enqueued_at: float
+    protected: bool
+
+
+class EvictionPolicy:
+    """Decides which frames are admitted to and evicted from a FrameQueue.
+
+    The default behaviour is latest-wins: every frame is admitted and the oldest
+    queued frame is evicted when the queue is full.
+    """
+
+    name = "latest"
+
+    def __init__(self, capacity: int = 1):
+        """Initialize the policy.
+
+        Args:
+            capacity: Maximum number of frames waiting for inference.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+
+    def admit(self, frame: Any) -> bool:
+        """Return whether an incoming frame should be queued at all."""
+        return True
+
+    def evict(self, frames: Deque[QueuedFrame]) -> int:
+        """Return the index of the queued frame to drop to make room for a new one."""
+        return 0
+
+    def is_expired(self, queued: QueuedFrame, now: float) -> bool:
+        """Return whether a queued frame is too old to be worth processing."""
+        return False
+
+
+class LatestWinsPolicy(EvictionPolicy):
+    """Always process the most recent frame, dropping anything older."""
+
+    name = "latest"
+
+
+class SkipEveryNthPolicy(EvictionPolicy):
+    """Drop every nth incoming frame before it is queued to lower the inference rate."""
+
+    name = "skip_nth"
+
+    def __init__(self, n: int = 2, capacity: int = 1):
+        super().__init__(capacity)
+        if n < 2:
+            raise ValueError("n must be at least 2")
+        self.n = n
+        self._count = 0
+
+    def admit(self, frame: Any) -> bool:
+        self._count += 1
+        return self._count % self.n != 0
+
+
+class KeyframePolicy(EvictionPolicy):
+    """Prefer evicting non-keyframes so the latest keyframe survives a full queue."""
+
+    name = "keyframe"
+
+    def __init__(self, capacity: int = 2):
+        super().__init__(capacity)
+
+    def evict(self, frames: Deque[QueuedFrame]) -> int:
+        for idx, queued in enumerate(frames):
+            if not getattr(queued.frame, "key_frame", False):
+                return idx
+        return 0
+
+
+class DeadlinePolicy(EvictionPolicy):
+    """Drop frames that waited longer than a deadline before reaching inference."""
+
+    name = "deadline"
+
+    def __init__(self, max_age_ms: float = 100.0, capacity: int = 2):
+        super().__init__(capacity)
+        self.max_age = max_age_ms / 1000.0
+
+    def is_expired(self, queued: QueuedFrame, now: float) -> bool:
+        return now - queued.enqueued_at > self.max_age
+
+
+EVICTION_POLICIES: Dict[str, Type[EvictionPolicy]] = {
+    LatestWinsPolicy.name: LatestWinsPolicy,
+    SkipEveryNthPolicy.name: SkipEveryNthPolicy,
+    KeyframePolicy.name: KeyframePolicy,
+    DeadlinePolicy.name: DeadlinePolicy,
+}
+
+
+def create_eviction_policy(spec: Union[str, EvictionPolicy, None]) -> EvictionPolicy:
+    """Create an eviction policy from a spec string.
+
+    The spec is the policy name optionally followed by a numeric argument, e.g.
+    ``latest``, ``skip_nth:3``, ``keyframe`` or ``deadline:80``.
+
+    Args:
+        spec: The spec string, an existing policy or None for the default policy.
+
+    Returns:
+        The eviction policy.
+    """
+    if spec is None:
+        return LatestWinsPolicy()
+    if isinstance(spec, EvictionPolicy):
+        return spec
+
+    name, _, arg = spec.partition(":")
+    policy_cls = EVICTION_POLICIES.get(name)
+    if policy_cls is None:
+        raise ValueError(
+            f"Unknown eviction policy {name}, expected one of {list(EVICTION_POLICIES)}"
+        )
+    if not arg:
+        return policy_cls()
+    if policy_cls is SkipEveryNthPolicy:
+        return SkipEveryNthPolicy(n=int(arg))
+    if policy_cls is DeadlinePolicy:
+        return DeadlinePolicy(max_age_ms=float(arg))
+    return policy_cls(capacity=int(arg))
+
+
+class FrameQueue:
+    """Bounded, thread-safe frame queue whose eviction is delegated to a policy.
+
+    Exposes the subset of the ``queue.Queue`` interface used by the client and the
+    tensor nodes, and counts the frames that were kept and dropped.
+
+    When batching is enabled the queue holds at least ``batch_size`` frames so that a
+    batch can be gathered without the policy evicting its members.
+
+    Prompt runs reserve a queued frame before they start, so a run never blocks a
+    worker thread waiting for input, and ``on_put`` is called after every queued frame
+    to wake parked runs. Reservations hold the oldest frames, which neither expire nor
+    join the batch of another run. Closing the queue releases consumers that block
+    anyway.
+    """
+
+    def __init__(self, policy: Optional[EvictionPolicy] = None):
+        self._policy = policy or LatestWinsPolicy()
+        self._frames: Deque[QueuedFrame] = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self.batch_size = 1
+        self.batch_window = 0.0
+        self.kept = 0
+        self.dropped = 0
+        # Frames promised to runs that have not taken them yet
+        self._reserved = 0
+        self._closed = False
+        # Called without the lock after a frame was queued, from the producer's thread
+        self.on_put: Optional[Callable[[], None]] = None
+
+    @property
+    def capacity(self) -> int:
+        return max(self._policy.capacity, self.batch_size)
+
+    @property
+    def policy(self) -> EvictionPolicy:
+        return self._policy
+
+    @policy.setter
+    def policy(self, policy: EvictionPolicy):
+        with self._not_empty:
+            self._policy = policy
+
+    def put(self, frame: Any, protected: bool = False, timeout: Optional[float] = None) -> bool:
+        """Queue a frame, evicting according to the policy.
+
+        Args:
+            frame: The frame to queue.
+            protected: Bypass admission and expiry and be evicted only when every
+                queued frame is protected, used for warmup frames whose outputs
+                are awaited and for the outputs of chained stages.
+            timeout: Wait up to this many seconds for the consumer to make space
+                before evicting, which slows down the producer instead of dropping.
+
+        Returns:
+            Whether the frame was queued.
+        """
+        with self._not_empty:
+            if self._closed:
+                return False
+            if not protected and not self._policy.admit(frame):
+                self.dropped += 1
+                return False
+            if timeout is not None:
+                self._not_full.wait_for(
+                    lambda: len(self._frames) < self.capacity or self._closed, timeout
+                )
+            while len(self._frames) >= self.capacity:
+                del self._frames[self._evict_index()]
+                self.dropped += 1
+            self._frames.append(QueuedFrame(frame, time.monotonic(), protected))
+            self._not_empty.notify()
+        on_put = self.on_put
+        if on_put is not None:
+            on_put()
+        return True
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        """Remove and return the next frame that has not expired.
+
+        Raises:
+            queue.Empty: If no frame is available and block is False or the timeout
+                elapsed.
+            QueueClosed: If the queue was closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._not_empty:
+            while True:
+                if self._closed:
+                    raise QueueClosed
+                self._drop_expired()
+                if self._frames:
+                    self.kept += 1
+                    if self._reserved:
+                        self._reserved -= 1
+                    self._not_full.notify()
+                    return self._frames.popleft().frame
+                if not block:
+                    raise Empty
+                if deadline is None:
+                    self._not_empty.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Empty
+                    self._not_empty.wait(remaining)
+
+    def get_batch(self, key: Optional[Callable[[Any], Any]] = None) -> List[Any]:
+        """Block for a frame, then gather up to ``batch_size`` frames in order.
+
+        Frames are added to the batch as long as they arrive within ``batch_window``
+        seconds of the first one.
+
+        Args:
+            key: Frames are only batched together while key(frame) is equal, e.g. the
+                tensor shape, the first frame with a different key starts the next batch.
+
+        Returns:
+            The frames of the batch, oldest first.
+        """
+        frames = [self.get(block=True)]
+        if self.batch_size <= 1:
+            return frames
+
+        deadline = time.monotonic() + self.batch_window
+        first_key = key(frames[0]) if key is not None else None
+        with self._not_empty:
+            while len(frames) < self.batch_size and not self._closed:
+                self._drop_expired()
+                if self._reserved:
+                    # The next frames are promised to other runs
+                    break
+                if self._frames:
+                    if key is not None and key(self._frames[0].frame) != first_key:
+                        break
+                    frames.append(self._frames.popleft().frame)
+                    self.kept += 1
+                    self._not_full.notify()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._not_empty.wait(remaining)
+        return frames
+
+    def _evict_index(self) -> int:
+        idx = self._policy.evict(self._frames)
+        if self._frames[idx].protected:
+            # Protected frames go last, a queue of only protected frames stays bounded
+            for unprotected_idx, queued in enumerate(self._frames):
+                if not queued.protected:
+                    return unprotected_idx
+        return idx
+
+    def try_reserve(self) -> bool:
+        """Reserve a queued frame for a run about to start.
+
+        Returns:
+            Whether a frame that no other run reserved is queued.
+        """
+        with self._not_empty:
+            self._drop_expired()
+            if len(self._frames) > self._reserved:
+                self._reserved += 1
+                return True
+            return False
+
+    def close(self):
+        """Wake up and fail blocked consumers and stop accepting frames."""
+        with self._not_empty:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def reopen(self):
+        """Accept frames again after ``close``."""
+        with self._not_empty:
+            self._closed = False
+
+    def clear(self) -> int:
+        """Drop all queued frames without blocking, expired or not.
+
+        Returns:
+            The number of frames dropped.
+        """
+        with self._not_empty:
+            count = len(self._frames)
+            self._frames.clear()
+            self._reserved = 0
+            self.dropped += count
+            self._not_full.notify_all()
+            return count
+
+    def _drop_expired(self):
+        now = time.monotonic()
+        # Reserved frames are about to be taken by the runs they were promised to
+        while len(self._frames) > self._reserved:
+            queued = self._frames[self._reserved]
+            if queued.protected or not self._policy.is_expired(queued, now):
+                break
+            del self._frames[self._reserved]
+            self.dropped += 1
+
+    def empty(self) -> bool:
+        with self._not_empty:
+            return not self._frames
+
+    def full(self) -> bool:
+        with self._not_empty:
+            return len(self._frames) >= self.capacity
+
+    def qsize(self) -> int:
+        with self._not_empty:
+            return len(self._frames)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the policy name and the kept/dropped frame counters."""
+        with self._not_empty:
+            return {
+                "policy": self._policy.name,
+                "kept_frames": self.kept,
+                "dropped_frames": self.dropped,
+                "queued_frames": len(self._frames),
+            }
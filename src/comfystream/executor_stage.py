@@ -0,0 +1,65 @@
+"""Executor stage that runs frame conversions off the asyncio event loop."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class ExecutorStage:
+    """Runs blocking frame conversions on a thread pool instead of the event loop.
+
+    The conversions (swscale colorspace conversion, numpy and torch ufuncs) release the
+    GIL for most of their run time, so a thread pool keeps the loop free for RTP, RTCP
+    and ICE handling. A process pool is not used because av frames cannot be pickled
+    and moving the decoded planes to another process would cost as much as converting
+    them.
+
+    Callers await each conversion before submitting the next one for the same stream,
+    so frames keep their pts order. The time spent in the stage is accumulated per
+    name as the event loop time it saved.
+    """
+
+    def __init__(self, max_workers: int = 2, thread_name_prefix: str = "comfystream-frames"):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=thread_name_prefix
+        )
+        self._lock = threading.Lock()
+        self._seconds: Dict[str, float] = {}
+        self._calls: Dict[str, int] = {}
+
+    async def run(self, name: str, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(*args) on the thread pool and return its result.
+
+        Args:
+            name: Name under which the run time is accounted, e.g. "video_preprocess".
+            fn: The blocking function.
+            *args: Arguments of the function.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._timed, name, fn, args)
+
+    def _timed(self, name: str, fn: Callable[..., Any], args) -> Any:
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._seconds[name] = self._seconds.get(name, 0.0) + elapsed
+                self._calls[name] = self._calls.get(name, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the loop time saved in seconds, in total and per conversion."""
+        with self._lock:
+            return {
+                "loop_time_saved": sum(self._seconds.values()),
+                "stages": {
+                    name: {"seconds": seconds, "calls": self._calls[name]}
+                    for name, seconds in self._seconds.items()
+                },
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,90 @@
+"""Mapping between client frame resolutions and the pipeline resolution."""
+
+from typing import NamedTuple
+
+RESIZE_NONE = "none"
+RESIZE_STRETCH = "stretch"
+RESIZE_CROP = "crop"
+RESIZE_LETTERBOX = "letterbox"
+RESIZE_MODES = (RESIZE_NONE, RESIZE_STRETCH, RESIZE_CROP, RESIZE_LETTERBOX)
+
+
+class FrameGeometry(NamedTuple):
+    """How a source frame maps onto the pipeline resolution.
+
+    The source is first scaled to ``scaled_width`` x ``scaled_height``. In crop mode the
+    scaled frame is larger than the target and the target window starts at
+    ``(crop_x, crop_y)``. In letterbox mode it is smaller and is placed at
+    ``(pad_x, pad_y)`` inside the target.
+    """
+
+    mode: str
+    source_width: int
+    source_height: int
+    target_width: int
+    target_height: int
+    scaled_width: int
+    scaled_height: int
+    crop_x: int = 0
+    crop_y: int = 0
+    pad_x: int = 0
+    pad_y: int = 0
+
+    @property
+    def is_identity(self) -> bool:
+        return (
+            self.source_width == self.target_width
+            and self.source_height == self.target_height
+        ) or self.mode == RESIZE_NONE
+
+
+def compute_geometry(
+    source_width: int, source_height: int, target_width: int, target_height: int, mode: str
+) -> FrameGeometry:
+    """Compute how to map a source frame onto the target resolution.
+
+    Args:
+        source_width: Width of the incoming frame.
+        source_height: Height of the incoming frame.
+        target_width: Width expected by the prompt.
+        target_height: Height expected by the prompt.
+        mode: One of ``none``, ``stretch``, ``crop`` or ``letterbox``.
+
+    Returns:
+        The geometry of the mapping.
+    """
+    if mode not in RESIZE_MODES:
+        raise ValueError(f"Unknown resize mode {mode}, expected one of {RESIZE_MODES}")
+
+    args = (mode, source_width, source_height, target_width, target_height)
+    if mode == RESIZE_NONE:
+        return FrameGeometry(*args, source_width, source_height)
+    if mode == RESIZE_STRETCH:
+        return FrameGeometry(*args, target_width, target_height)
+
+    scale_x = target_width / source_width
+    scale_y = target_height / source_height
+    if mode == RESIZE_CROP:
+        # Scale to cover the target and cut the overflow evenly from both sides
+        scale = max(scale_x, scale_y)
+        scaled_width = max(target_width, round(source_width * scale))
+        scaled_height = max(target_height, round(source_height * scale))
+        return FrameGeometry(
+            *args,
+            scaled_width,
+            scaled_height,
+            crop_x=(scaled_width - target_width) // 2,
+            crop_y=(scaled_height - target_height) // 2,
+        )
+
+    # Scale to fit inside the target and pad the remainder evenly on both sides
+    scale = min(scale_x, scale_y)
+    scaled_width = min(target_width, max(1, round(source_width * scale)))
+    scaled_height = min(target_height, max(1, round(source_height * scale)))
+    return FrameGeometry(
+        *args,
+        scaled_width,
+        scaled_height,
+        pad_x=(target_width - scaled_width) // 2,
+        pad_y=(target_height - scaled_height) // 2,
+    )
@@ -0,0 +1,82 @@
+"""Bounded index of the frames submitted to the prompt, keyed by sequence id."""
+
+import itertools
+from collections import OrderedDict
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple
+
+from comfystream.frame_geometry import FrameGeometry
+
+DEFAULT_CAPACITY = 256
+
+
+class FrameRecord(NamedTuple):
+    """What is kept of a submitted frame to build its output frame.
+
+    The decoded frame itself is not kept, so dropped frames cost a record each
+    instead of a full picture.
+    """
+
+    pts: Optional[int]
+    time_base: Any
+    geometry: Optional[FrameGeometry] = None
+    buffer_ptr: Optional[int] = None
+    trace: Any = None
+    received_at: Optional[float] = None
+
+
+class FrameIndex:
+    """Maps the sequence ids of submitted frames to their records.
+
+    Sequence ids increase in submission order and the prompt produces outputs in the
+    same order, so when the output of a frame arrives every older record belongs to
+    a frame that was dropped before inference and is removed with it. Lookups are
+    O(1) and every record is removed once, by its output, a later output or by
+    overflowing the capacity.
+
+    Only used from the event loop.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._records: "OrderedDict[int, FrameRecord]" = OrderedDict()
+        self._seqs: Iterator[int] = itertools.count()
+
+    def add(self, record: FrameRecord) -> Tuple[int, List[FrameRecord]]:
+        """Index a frame that is about to be submitted.
+
+        Returns:
+            The sequence id of the frame and the oldest records that were removed to
+            stay within the capacity.
+        """
+        seq = next(self._seqs)
+        self._records[seq] = record
+        evicted = []
+        while len(self._records) > self.capacity:
+            evicted.append(self._records.popitem(last=False)[1])
+        return seq, evicted
+
+    def pop(self, seq: Optional[int]) -> Tuple[Optional[FrameRecord], List[FrameRecord]]:
+        """Remove the record of an output's frame together with older records.
+
+        Returns:
+            The record, or None if the sequence id is unknown, and the records of the
+            older frames that will not get an output.
+        """
+        record = self._records.pop(seq, None) if seq is not None else None
+        dropped = []
+        if record is not None:
+            while self._records:
+                oldest = next(iter(self._records))
+                if oldest > seq:
+                    break
+                dropped.append(self._records.pop(oldest))
+        return record, dropped
+
+    def clear(self) -> List[FrameRecord]:
+        """Remove and return all records."""
+        records = list(self._records.values())
+        self._records.clear()
+        return records
+
+    def __len__(self) -> int:
+        return len(self._records)
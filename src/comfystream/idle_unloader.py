@@ -0,0 +1,102 @@
+"""Keeps the models of the shared ComfyUI client loaded between sessions."""
+
+import asyncio
+import logging
+from typing import Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_TIMEOUT = 300.0
+
+
+def unload_comfy_models():
+    """Unload all models from the GPU and release the cached memory."""
+    from comfy import model_management
+    model_management.unload_all_models()
+    model_management.soft_empty_cache()
+
+
+class IdleUnloader:
+    """Unloads the models of the shared client once no session used it for a while.
+
+    Sessions that end release only their own queues and tasks, so a reconnect within
+    the idle timeout finds the client and its models warm. Once the last session has
+    ended and no new one started for ``idle_timeout`` seconds, the models are unloaded
+    to free the GPU and ``on_unload`` is called, e.g. to forget the warmed shapes.
+
+    Only used from the event loop.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT,
+        unload: Callable[[], None] = unload_comfy_models,
+        on_unload: Optional[Callable[[], None]] = None,
+    ):
+        """Initialize the unloader.
+
+        Args:
+            idle_timeout: Seconds without sessions before the models are unloaded,
+                None or 0 to keep them loaded.
+            unload: Unloads the models, called on a worker thread.
+            on_unload: Called on the event loop after the models were unloaded.
+        """
+        self.idle_timeout = idle_timeout
+        self._unload = unload
+        self._on_unload = on_unload
+        self._sessions: Set[str] = set()
+        self._timer: Optional[asyncio.Task] = None
+        self.loaded = True
+        self.unloads = 0
+
+    def session_started(self, session_id: str):
+        """Keep the models loaded while the session runs."""
+        self._sessions.add(session_id)
+        self.loaded = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def session_ended(self, session_id: str):
+        """Start the idle timeout if this was the last session, safe to call twice."""
+        if session_id not in self._sessions:
+            return
+        self._sessions.discard(session_id)
+        if self._sessions or not self.idle_timeout or self._timer is not None:
+            return
+        self._timer = asyncio.create_task(self._unload_when_idle())
+
+    async def _unload_when_idle(self):
+        await asyncio.sleep(self.idle_timeout)
+        self._timer = None
+        if self._sessions or not self.loaded:
+            return
+        logger.info(f"No session for {self.idle_timeout}s, unloading models")
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._unload)
+        except Exception as e:
+            logger.error(f"Error unloading models: {e}")
+            return
+        self.unloads += 1
+        # A session that started while unloading reloads the models with its first run
+        self.loaded = bool(self._sessions)
+        if self._on_unload is not None:
+            self._on_unload()
+
+    async def close(self):
+        """Cancel a pending unload."""
+        if self._timer is not None:
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            self._timer = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "active_sessions": len(self._sessions),
+            "models_loaded": self.loaded,
+            "unloads": self.unloads,
+        }
@@ -0,0 +1,176 @@
+"""Entry point of the inference worker process of ProcessComfyStreamClient.
+
+The worker runs a ComfyStreamClient and its embedded ComfyUI executor, so node code
+holding the GIL cannot delay the event loop of the WebRTC server. Video frames cross
+as uint8 pictures through two shared memory rings, the pipes only carry a message per
+frame, audio chunks and the control commands.
+"""
+
+import asyncio
+import logging
+import threading
+from multiprocessing.connection import Connection
+from types import SimpleNamespace
+from typing import Any, Dict
+
+import numpy as np
+import torch
+
+from comfystream.shm_ring import SharedFrameRing
+
+logger = logging.getLogger(__name__)
+
+# Messages on the frame pipes, a video message announces a frame in the ring
+VIDEO = "video"
+AUDIO = "audio"
+
+# Longest time an output waits for a free slot of the output ring before it is dropped
+OUTPUT_RING_TIMEOUT = 0.5
+# Time between checks for a free slot, only while the parent falls behind reading outputs
+OUTPUT_RING_POLL_INTERVAL = 0.001
+
+
+def to_ring_frame(output: torch.Tensor) -> np.ndarray:
+    """Convert a [0, 1] float image of shape (1, H, W, C) or (H, W, C) to uint8 HxWxC."""
+    output = output.detach()
+    if output.dtype != torch.uint8:
+        output = output.mul(255.0).clamp_(0, 255).round_().to(torch.uint8)
+    return output.cpu().numpy().reshape(output.shape[-3:])
+
+
+def _read_inputs(client, input_ring: SharedFrameRing, inputs: Connection, loop: asyncio.AbstractEventLoop):
+    """Queue the frames announced on the input pipe, until the parent closes it."""
+    while True:
+        try:
+            message = inputs.recv()
+        except (EOFError, OSError):
+            return
+        if message == VIDEO:
+            slot = input_ring.acquire()
+            if slot is None:
+                continue
+            image = torch.from_numpy(slot.frame).float().div_(255.0).unsqueeze(0)
+            input_ring.release(slot)
+            frame = SimpleNamespace(
+                side_data=SimpleNamespace(input=image, seq=slot.pts, skipped=True)
+            )
+            # Frames without a sequence id are warmup frames whose outputs are awaited
+            client.put_video_input(frame, protected=slot.pts is None)
+        else:
+            _, samples, sample_rate = message
+            frame = SimpleNamespace(
+                sample_rate=sample_rate, side_data=SimpleNamespace(input=samples)
+            )
+            asyncio.run_coroutine_threadsafe(client.put_audio_input(frame), loop)
+
+
+async def _forward_video(client, output_ring: SharedFrameRing, outputs: Connection):
+    while True:
+        seq, output = await client.get_indexed_video_output()
+        frame = to_ring_frame(output)
+        # Written right away unless the ring is full, an idle stream never polls
+        waited = 0.0
+        while output_ring.write(frame, pts=seq) is None:
+            if waited >= OUTPUT_RING_TIMEOUT:
+                logger.warning("Output ring is full, dropping a video output")
+                break
+            await asyncio.sleep(OUTPUT_RING_POLL_INTERVAL)
+            waited += OUTPUT_RING_POLL_INTERVAL
+        else:
+            outputs.send(VIDEO)
+
+
+async def _forward_audio(client, outputs: Connection):
+    while True:
+        output = await client.get_audio_output()
+        outputs.send((AUDIO, output))
+
+
+def _stats(client) -> Dict[str, Any]:
+    return {
+        "video_input": client.get_video_input_stats(),
+        "audio_input": client.get_audio_input_stats(),
+        "stages": client.get_stage_stats(),
+        "reorder": client.get_reorder_stats(),
+        "node_timings": client.get_node_timings(),
+        "update_stats": dict(client.update_stats),
+    }
+
+
+async def _serve(
+    client_kwargs: Dict[str, Any],
+    input_ring_name: str,
+    output_ring_name: str,
+    control: Connection,
+    inputs: Connection,
+    outputs: Connection,
+):
+    from comfystream.client import ComfyStreamClient
+
+    loop = asyncio.get_running_loop()
+    client = ComfyStreamClient(**client_kwargs)
+    input_ring = SharedFrameRing.attach(input_ring_name)
+    output_ring = SharedFrameRing.attach(output_ring_name)
+    threading.Thread(
+        target=_read_inputs, args=(client, input_ring, inputs, loop), daemon=True
+    ).start()
+    forwarders = [
+        asyncio.create_task(_forward_video(client, output_ring, outputs)),
+        asyncio.create_task(_forward_audio(client, outputs)),
+    ]
+
+    commands = {
+        "set_prompts": client.set_prompts,
+        "update_prompts": client.update_prompts,
+        "get_available_nodes": client.get_available_nodes,
+    }
+    try:
+        while True:
+            try:
+                command, args = await loop.run_in_executor(None, control.recv)
+            except (EOFError, OSError):
+                # The parent is gone
+                break
+            if command == "stop":
+                break
+            try:
+                if command == "stats":
+                    result = _stats(client)
+                else:
+                    result = await commands[command](*args)
+                control.send(("ok", result))
+            except Exception as e:
+                logger.exception(f"Inference worker command {command} failed")
+                control.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        for task in forwarders:
+            task.cancel()
+        # Also stops the embedded ComfyUI client, which this client owns. The rings
+        # belong to the parent and are unmapped when this process exits
+        await client.cleanup()
+
+
+def run_worker(
+    client_kwargs: Dict[str, Any],
+    input_ring_name: str,
+    output_ring_name: str,
+    control: Connection,
+    inputs: Connection,
+    outputs: Connection,
+    log_level: int = logging.INFO,
+):
+    """Serve a ComfyStreamClient to the parent process until told to stop.
+
+    Args:
+        client_kwargs: Arguments of the ComfyStreamClient.
+        input_ring_name: Shared memory ring the parent writes input frames to.
+        output_ring_name: Shared memory ring this process writes outputs to.
+        control: Duplex pipe of the commands and their results.
+        inputs: Receives a message per input frame.
+        outputs: Sends a message per output.
+        log_level: Logging level of the worker process.
+    """
+    logging.basicConfig(level=log_level, format="%(asctime)s [%(levelname)s] worker: %(message)s")
+    asyncio.run(
+        _serve(client_kwargs, input_ring_name, output_ring_name, control, inputs, outputs)
+    )
@@ -0,0 +1,74 @@
+"""Parks prompt runs until their input queue has a frame for them."""
+
+import asyncio
+from typing import Dict, Optional, Tuple, Union
+
+from comfystream.audio_queue import AudioQueue
+from comfystream.eviction import FrameQueue
+
+
+class InputGate:
+    """Lets a prompt run start only once an input frame is queued for it.
+
+    Without the gate every run is queued right away and its LoadTensor blocks a
+    ComfyUI worker thread until a frame arrives, forever once the stream stops.
+    Gated runs instead park on the event loop, holding no thread and using no CPU,
+    and are woken by the queue when a frame is put.
+
+    Video runs reserve the frame they will take and audio runs the samples of the
+    window they will take, so concurrent runs never wait on the same input.
+
+    Only used from the event loop, the queue may be fed from any thread.
+    """
+
+    def __init__(
+        self,
+        queue: Union[FrameQueue, AudioQueue],
+        audio_window: Optional[Tuple[float, float]] = None,
+    ):
+        """Initialize the gate.
+
+        Args:
+            queue: The input queue the gated runs read.
+            audio_window: Buffer and hop size in ms of the LoadAudioTensor reading an
+                audio queue, without it audio runs only wait for a non-empty queue.
+        """
+        self._queue = queue
+        self.audio_window = audio_window
+        self._ready = asyncio.Event()
+        self.parked = 0
+        self.wakeups = 0
+        loop = asyncio.get_running_loop()
+
+        def on_put():
+            try:
+                loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                # The loop was closed while a worker thread was still queueing
+                pass
+
+        queue.on_put = on_put
+
+    def _take(self) -> bool:
+        if isinstance(self._queue, FrameQueue):
+            return self._queue.try_reserve()
+        if self.audio_window is None:
+            return not self._queue.empty()
+        return self._queue.try_reserve(*self.audio_window)
+
+    async def wait(self):
+        """Return once an input frame is available for the run."""
+        while not self._take():
+            self._ready.clear()
+            # A frame put before the clear would not set the event again
+            if self._take():
+                return
+            self.parked += 1
+            try:
+                await self._ready.wait()
+            finally:
+                self.parked -= 1
+            self.wakeups += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"parked_runs": self.parked, "wakeups": self.wakeups}
@@ -0,0 +1,148 @@
+"""Adaptive frame admission that keeps the pipeline latency under a target."""
+
+import time
+from typing import Any, Dict, Optional
+
+# Weight of a new sample in the moving averages
+DEFAULT_SMOOTHING = 0.2
+
+
+def _ema(current: Optional[float], sample: float, smoothing: float) -> float:
+    if current is None:
+        return sample
+    return current + smoothing * (sample - current)
+
+
+class LatencyController:
+    """Decides which incoming frames are submitted to the prompt.
+
+    The controller estimates the inference time of a frame from the output times: the
+    prompt starts a frame once it arrived and the previous output left, so the time
+    from the later of the two to the frame's output is its inference time. A frame
+    waits for every frame submitted before it, so submitting one more frame is
+    expected to produce its output after ``(in_flight + 1) * inference_time``. Frames
+    that would exceed the target latency are skipped before they are preprocessed,
+    which keeps the latency bounded when the prompt runs slower than the input.
+
+    Below the target the controller also adapts to the input rate: once the frames
+    that always run at once are in flight, a new frame has to wait for a run to
+    finish. If the next input is expected to arrive before that, the frame is skipped
+    in favour of the fresher one, so a prompt slower than the input runs on the
+    newest frames instead of keeping a backlog up to the target.
+
+    All methods are called from the event loop.
+    """
+
+    def __init__(
+        self,
+        target_latency_ms: float,
+        min_in_flight: int = 1,
+        smoothing: float = DEFAULT_SMOOTHING,
+    ):
+        """Initialize the controller.
+
+        Args:
+            target_latency_ms: Latency from receiving a frame to its output to stay under.
+            min_in_flight: Frames always admitted regardless of the estimate, at least
+                the batch size so batches can fill up.
+            smoothing: Weight of a new sample in the inference time and input
+                interval moving averages.
+        """
+        if target_latency_ms <= 0:
+            raise ValueError("target_latency_ms must be positive")
+        self.target_latency = target_latency_ms / 1000.0
+        self.min_in_flight = max(1, min_in_flight)
+        self.smoothing = smoothing
+
+        self.in_flight = 0
+        self.inference_time: Optional[float] = None
+        self.input_interval: Optional[float] = None
+        self.latency: Optional[float] = None
+        self._last_input_at: Optional[float] = None
+        self._last_output_at: Optional[float] = None
+
+        self.submitted_frames = 0
+        self.skipped_frames = 0
+        self.evicted_frames = 0
+
+    @property
+    def max_in_flight(self) -> int:
+        """Number of frames that can be in flight without exceeding the target."""
+        if self.inference_time is None or self.inference_time <= 0:
+            return self.min_in_flight
+        return max(self.min_in_flight, int(self.target_latency // self.inference_time))
+
+    def admit(self, now: Optional[float] = None) -> bool:
+        """Decide whether a frame that just arrived is submitted.
+
+        Args:
+            now: Arrival time in ``time.monotonic`` seconds, defaults to the current time.
+
+        Returns:
+            True if the frame should be submitted, False if it should be skipped.
+        """
+        now = time.monotonic() if now is None else now
+        if self._last_input_at is not None:
+            self.input_interval = _ema(
+                self.input_interval, now - self._last_input_at, self.smoothing
+            )
+        self._last_input_at = now
+
+        if self.in_flight < self.max_in_flight and not self._next_input_is_fresher(now):
+            self.in_flight += 1
+            self.submitted_frames += 1
+            return True
+        self.skipped_frames += 1
+        return False
+
+    def _next_input_is_fresher(self, now: float) -> bool:
+        """Return whether the next input would start running no later than this one."""
+        waiting = self.in_flight - self.min_in_flight + 1
+        if (
+            waiting <= 0
+            or self.input_interval is None
+            or self.inference_time is None
+            or self._last_output_at is None
+        ):
+            return False
+        starts_at = max(now, self._last_output_at + waiting * self.inference_time)
+        return starts_at >= now + self.input_interval
+
+    def on_output(self, submitted_at: float, now: Optional[float] = None):
+        """Record the output of a submitted frame.
+
+        Args:
+            submitted_at: Arrival time of the frame passed to ``admit``.
+            now: Output time, defaults to the current time.
+        """
+        now = time.monotonic() if now is None else now
+        started_at = submitted_at
+        if self._last_output_at is not None:
+            started_at = max(started_at, self._last_output_at)
+        self._last_output_at = now
+        self.inference_time = _ema(self.inference_time, now - started_at, self.smoothing)
+        self.latency = _ema(self.latency, now - submitted_at, self.smoothing)
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def on_dropped(self):
+        """Record that a submitted frame was evicted from the input queue."""
+        self.evicted_frames += 1
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the estimates and the admission counters."""
+
+        def _ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else seconds * 1000.0
+
+        return {
+            "target_latency_ms": self.target_latency * 1000.0,
+            "latency_ms": _ms(self.latency),
+            "inference_ms": _ms(self.inference_time),
+            "input_fps": 1.0 / self.input_interval if self.input_interval else None,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "submitted_frames": self.submitted_frames,
+            "skipped_frames": self.skipped_frames,
+            "evicted_frames": self.evicted_frames,
+        }
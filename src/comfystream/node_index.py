@@ -0,0 +1,222 @@
+"""Persistent index of the input schemas of the ComfyUI node classes.
+
+Importing every node of a workspace and calling ``INPUT_TYPES()`` on each class takes
+seconds with many custom node packs installed. The index does it once, stores the
+parsed schemas on disk and reuses them until the ``custom_nodes`` directories change.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_PATH = os.environ.get(
+    "COMFYSTREAM_NODE_INDEX",
+    os.path.join(os.path.expanduser("~"), ".cache", "comfystream", "node_index.json"),
+)
+
+
+def parse_input_types(input_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Parse the ``INPUT_TYPES()`` of a node class into per-input metadata."""
+    input_info = {}
+    for section, required in (("required", True), ("optional", False)):
+        for name, value in input_data.get(section, {}).items():
+            if not isinstance(value, tuple):
+                logger.error(f"Unexpected structure for {section} input {name}: {value}")
+                continue
+            if len(value) == 1 and isinstance(value[0], list):
+                # Handle combo box case where value is ([option1, option2, ...],)
+                input_info[name] = {
+                    'type': 'combo',
+                    'value': value[0],  # The list of options becomes the value
+                }
+            elif len(value) == 2:
+                input_type, config = value
+                config = config or {}
+                input_info[name] = {
+                    'type': input_type,
+                    'required': required,
+                    'min': config.get('min', None),
+                    'max': config.get('max', None),
+                    'widget': config.get('widget', None)
+                }
+            elif len(value) == 1:
+                # Handle simple type case like ('IMAGE',)
+                input_info[name] = {
+                    'type': value[0]
+                }
+    return input_info
+
+
+def describe_node(class_type: str, node: Dict[str, Any], input_info: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine the inputs of a prompt node with the metadata of its class."""
+    node_info = {
+        'class_type': class_type,
+        'inputs': {}
+    }
+    for input_name, input_value in node.get('inputs', {}).items():
+        if input_name == 'session_id':
+            # Injected by convert_prompt, not user facing
+            continue
+        input_metadata = input_info.get(input_name, {})
+        node_info['inputs'][input_name] = {
+            'value': input_value,
+            'type': input_metadata.get('type', 'unknown'),
+            'min': input_metadata.get('min', None),
+            'max': input_metadata.get('max', None),
+            'widget': input_metadata.get('widget', None)
+        }
+        # For combo type inputs, include the list of options
+        if input_metadata.get('type') == 'combo':
+            node_info['inputs'][input_name]['value'] = input_metadata.get('value', [])
+    return node_info
+
+
+def _default_custom_nodes_dirs() -> List[str]:
+    try:
+        from comfy.cmd import folder_paths
+        return list(folder_paths.get_folder_paths("custom_nodes"))
+    except Exception as e:
+        logger.warning(f"Could not locate the custom_nodes directories: {e}")
+        return []
+
+
+def _load_node_classes() -> Dict[str, Any]:
+    from comfy.nodes.package import import_all_nodes_in_workspace
+    return import_all_nodes_in_workspace().NODE_CLASS_MAPPINGS
+
+
+class NodeIndex:
+    """Input schemas of all node classes, keyed by class type.
+
+    The index is loaded from disk if its fingerprint matches the current modification
+    times of the ``custom_nodes`` directories, the node packs in them and their top
+    level Python files, and is rebuilt and saved otherwise. A class type missing from
+    a loaded index, e.g. a built-in node of a newer ComfyUI, triggers one rebuild.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_INDEX_PATH,
+        custom_nodes_dirs: Optional[List[str]] = None,
+        load_node_classes: Callable[[], Dict[str, Any]] = _load_node_classes,
+    ):
+        """Initialize the index.
+
+        Args:
+            path: File the index is persisted to.
+            custom_nodes_dirs: Directories whose changes invalidate the index.
+                Defaults to the custom_nodes folders registered with ComfyUI.
+            load_node_classes: Returns the node class mappings to build the index from.
+        """
+        self.path = path
+        self._custom_nodes_dirs = custom_nodes_dirs
+        self._load_node_classes = load_node_classes
+        self._schemas: Optional[Dict[str, Dict[str, Any]]] = None
+        self._rebuilt = False
+        self._lock = threading.Lock()
+
+    def fingerprint(self) -> List[List[Any]]:
+        """Return the modification times the index is valid for."""
+        dirs = self._custom_nodes_dirs
+        if dirs is None:
+            dirs = _default_custom_nodes_dirs()
+        entries = []
+        for directory in sorted(dirs):
+            if not os.path.isdir(directory):
+                continue
+            entries.append([directory, os.stat(directory).st_mtime_ns])
+            with os.scandir(directory) as packs:
+                for pack in sorted(packs, key=lambda entry: entry.name):
+                    entries.append([pack.path, self._pack_mtime(pack)])
+        return entries
+
+    @staticmethod
+    def _pack_mtime(pack: os.DirEntry) -> int:
+        mtime = pack.stat().st_mtime_ns
+        if pack.is_dir():
+            with os.scandir(pack.path) as files:
+                for entry in files:
+                    if entry.name.endswith(".py"):
+                        mtime = max(mtime, entry.stat().st_mtime_ns)
+        return mtime
+
+    def ensure(self, class_types: Iterable[str] = ()):
+        """Load or build the index so it covers the given class types.
+
+        Blocking, use ``ensure_async`` from the event loop.
+        """
+        with self._lock:
+            if self._schemas is None:
+                fingerprint = self.fingerprint()
+                if not self._load(fingerprint):
+                    self._rebuild(fingerprint)
+                    return
+            if not self._rebuilt and any(
+                class_type not in self._schemas for class_type in class_types
+            ):
+                self._rebuild(self.fingerprint())
+
+    async def ensure_async(self, class_types: Iterable[str] = ()):
+        """Load or build the index on a worker thread."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.ensure, list(class_types))
+
+    def get(self, class_type: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Return the input metadata of a class type, None if it is unknown."""
+        if self._schemas is None:
+            return None
+        return self._schemas.get(class_type)
+
+    def invalidate(self):
+        """Forget the loaded schemas so the next ``ensure`` checks the disk again."""
+        with self._lock:
+            self._schemas = None
+            self._rebuilt = False
+
+    def _load(self, fingerprint: List[List[Any]]) -> bool:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("fingerprint") != fingerprint:
+            return False
+        self._schemas = data["nodes"]
+        return True
+
+    def _rebuild(self, fingerprint: List[List[Any]]):
+        schemas = {}
+        for class_type, node_class in self._load_node_classes().items():
+            try:
+                input_data = node_class.INPUT_TYPES() if hasattr(node_class, 'INPUT_TYPES') else {}
+                schemas[class_type] = parse_input_types(input_data)
+            except Exception as e:
+                logger.warning(f"Skipping node {class_type} in the node index: {e}")
+        # Round trip through JSON so a fresh index and a loaded one look the same
+        encoded = json.dumps(
+            {"version": INDEX_VERSION, "fingerprint": fingerprint, "nodes": schemas},
+            default=str,
+        )
+        self._schemas = json.loads(encoded)["nodes"]
+        self._rebuilt = True
+        self._save(encoded)
+
+    def _save(self, encoded: str):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(encoded)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not persist the node index to {self.path}: {e}")
+
+
+# Process-wide index, node classes are registered per process
+node_index = NodeIndex()
@@ -0,0 +1,223 @@
+"""Per-node execution timing of the running prompts."""
+
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+from comfystream import tensor_cache
+
+logger = logging.getLogger(__name__)
+
+# Executions kept per node for the rolling percentiles
+NODE_TIMES_CAPACITY = 128
+
+# Prompt ids whose session was looked up, a run executes many nodes of one prompt
+PROMPT_SESSIONS_CAPACITY = 64
+
+# Key in the ``_meta`` of the tensor nodes holding the index of their prompt, prompts
+# reading the same session reuse node ids
+PROMPT_INDEX_META = "comfystream_prompt_index"
+
+TENSOR_NODES = ("LoadTensor", "SaveTensor")
+
+QUANTILES = (0.5, 0.95)
+
+
+def _percentile(sorted_values: list, quantile: float) -> float:
+    return sorted_values[min(int(len(sorted_values) * quantile), len(sorted_values) - 1)]
+
+
+NodeKey = Tuple[Optional[int], str]
+
+
+class NodeTimings:
+    """Rolling wall and CPU times of the nodes of a session's prompts.
+
+    Keyed by prompt index and node id, as prompts reading the same session reuse node
+    ids. A node whose class type changes, because the graph was edited, starts over.
+    Called from the ComfyUI worker threads.
+    """
+
+    def __init__(self, capacity: int = NODE_TIMES_CAPACITY):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._nodes: Dict[NodeKey, Tuple[str, Deque[Tuple[float, float]]]] = {}
+
+    def record(
+        self, prompt_index: Optional[int], node_id: str, class_type: str, wall: float, cpu: float
+    ):
+        """Add one execution of a node, times in seconds."""
+        key = (prompt_index, node_id)
+        with self._lock:
+            entry = self._nodes.get(key)
+            if entry is None or entry[0] != class_type:
+                entry = (class_type, deque(maxlen=self.capacity))
+                self._nodes[key] = entry
+            entry[1].append((wall, cpu))
+
+    def retain(self, keys: Iterable[NodeKey]):
+        """Forget the nodes that are no longer part of the prompts.
+
+        Args:
+            keys: Prompt index and node id of the nodes to keep.
+        """
+        keys = set(keys)
+        with self._lock:
+            for key in self._nodes.keys() - keys:
+                del self._nodes[key]
+
+    def stats(self) -> Dict[Optional[int], Dict[str, Dict[str, Any]]]:
+        """Return the class type, execution count and p50/p95 times in ms of the nodes.
+
+        Returns:
+            The stats per prompt index and node id.
+        """
+        with self._lock:
+            nodes = {key: (class_type, list(times)) for key, (class_type, times) in self._nodes.items()}
+        stats = {}
+        for (prompt_index, node_id), (class_type, times) in nodes.items():
+            if not times:
+                continue
+            walls = sorted(wall for wall, _ in times)
+            cpus = sorted(cpu for _, cpu in times)
+            node_stats = {"class_type": class_type, "executions": len(times)}
+            for quantile in QUANTILES:
+                suffix = f"p{int(quantile * 100)}"
+                node_stats[f"wall_ms_{suffix}"] = _percentile(walls, quantile) * 1000
+                node_stats[f"cpu_ms_{suffix}"] = _percentile(cpus, quantile) * 1000
+            stats.setdefault(prompt_index, {})[node_id] = node_stats
+        return stats
+
+
+def tag_prompt(prompt: Dict[str, Any], prompt_index: int):
+    """Mark the tensor nodes of a converted prompt with the prompt's index.
+
+    The index is read back when the nodes of a run are timed. Tagged nodes are
+    replaced, not modified, as they may be shared with other prompts.
+    """
+    for node_id, node in prompt.items():
+        if node.get("class_type") in TENSOR_NODES and "session_id" in node.get("inputs", {}):
+            prompt[node_id] = {
+                **node,
+                "_meta": {**node.get("_meta", {}), PROMPT_INDEX_META: prompt_index},
+            }
+
+
+_prompt_sessions: "OrderedDict[str, Tuple[Optional[str], Optional[int]]]" = OrderedDict()
+_prompt_sessions_lock = threading.Lock()
+
+
+def _prompt_nodes(prompt: Any) -> Dict[str, Any]:
+    # DynamicPrompt of newer ComfyUI versions, or the prompt dict itself
+    if hasattr(prompt, "get_original_prompt"):
+        return prompt.get_original_prompt()
+    return prompt
+
+
+def _session_of(prompt_id: Any, prompt: Any) -> Tuple[Optional[str], Optional[int]]:
+    """Return the session the tensor nodes of a prompt are routed to and the index
+    the prompt was tagged with."""
+    with _prompt_sessions_lock:
+        if prompt_id in _prompt_sessions:
+            return _prompt_sessions[prompt_id]
+    found = (None, None)
+    for node in _prompt_nodes(prompt).values():
+        inputs = node.get("inputs", {})
+        if node.get("class_type") in TENSOR_NODES and "session_id" in inputs:
+            found = (inputs["session_id"], node.get("_meta", {}).get(PROMPT_INDEX_META))
+            break
+    with _prompt_sessions_lock:
+        _prompt_sessions[prompt_id] = found
+        while len(_prompt_sessions) > PROMPT_SESSIONS_CAPACITY:
+            _prompt_sessions.popitem(last=False)
+    return found
+
+
+def _timings_for(prompt_id: Any, prompt: Any) -> Tuple[Optional[NodeTimings], Optional[int]]:
+    session_id, prompt_index = _session_of(prompt_id, prompt)
+    if session_id is None:
+        return None, None
+    channels = tensor_cache.find_session(session_id)
+    return (channels.node_timings if channels is not None else None), prompt_index
+
+
+def _class_type(prompt: Any, node_id: str) -> str:
+    if hasattr(prompt, "get_node"):
+        return prompt.get_node(node_id).get("class_type", "unknown")
+    return prompt.get(node_id, {}).get("class_type", "unknown")
+
+
+def _wrap_execute(execute: Callable) -> Callable:
+    signature = inspect.signature(execute)
+
+    def timed_node(args, kwargs) -> Tuple[Optional[NodeTimings], Optional[int], str, str]:
+        bound = signature.bind_partial(*args, **kwargs).arguments
+        prompt = bound.get("dynprompt")
+        node_id = bound.get("current_item")
+        timings, prompt_index = _timings_for(bound.get("prompt_id"), prompt)
+        if timings is None:
+            return None, None, node_id, ""
+        return timings, prompt_index, node_id, _class_type(prompt, node_id)
+
+    if inspect.iscoroutinefunction(execute):
+        @functools.wraps(execute)
+        async def timed_execute(*args, **kwargs):
+            timings, prompt_index, node_id, class_type = timed_node(args, kwargs)
+            if timings is None:
+                return await execute(*args, **kwargs)
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                return await execute(*args, **kwargs)
+            finally:
+                timings.record(
+                    prompt_index, node_id, class_type, time.perf_counter() - wall, time.thread_time() - cpu
+                )
+    else:
+        @functools.wraps(execute)
+        def timed_execute(*args, **kwargs):
+            timings, prompt_index, node_id, class_type = timed_node(args, kwargs)
+            if timings is None:
+                return execute(*args, **kwargs)
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                return execute(*args, **kwargs)
+            finally:
+                timings.record(
+                    prompt_index, node_id, class_type, time.perf_counter() - wall, time.thread_time() - cpu
+                )
+
+    timed_execute._comfystream_timed = True
+    return timed_execute
+
+
+_install_lock = threading.Lock()
+
+
+def install() -> bool:
+    """Time every node executed by ComfyUI for sessions with node timings enabled.
+
+    Wraps the function executing a single node, once per process. Sessions without
+    ``node_timings`` only pay for the session lookup.
+
+    Returns:
+        Whether node execution is timed, False if the ComfyUI version is not supported.
+    """
+    from comfy.cmd import execution
+
+    with _install_lock:
+        execute = getattr(execution, "execute", None)
+        if execute is None:
+            logger.warning("Node timing is not supported by this ComfyUI version")
+            return False
+        if getattr(execute, "_comfystream_timed", False):
+            return True
+        parameters = inspect.signature(execute).parameters
+        if not {"dynprompt", "current_item", "prompt_id"} <= parameters.keys():
+            logger.warning("Node timing is not supported by this ComfyUI version")
+            return False
+        execution.execute = _wrap_execute(execute)
+        return True
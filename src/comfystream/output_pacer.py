@@ -0,0 +1,245 @@
+"""Steady-cadence output of processed video frames."""
+
+import asyncio
+import fractions
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import av
+import numpy as np
+
+from comfystream import tracing
+
+PACING_NONE = "none"
+PACING_REPEAT = "repeat"
+PACING_BLEND = "blend"
+PACING_MODES = (PACING_NONE, PACING_REPEAT, PACING_BLEND)
+
+# RTP video clock used for the remapped timestamps
+VIDEO_CLOCK_RATE = 90000
+VIDEO_TIME_BASE = fractions.Fraction(1, VIDEO_CLOCK_RATE)
+
+# Gain of the interarrival jitter estimate, as in RFC 3550
+JITTER_GAIN = 1 / 16
+
+# Weight of a new sample in the output interval moving average
+INTERVAL_SMOOTHING = 0.2
+
+
+class OutputPacer:
+    """Emits processed frames at a fixed frame rate regardless of the inference rate.
+
+    A background task pulls outputs from the source as they complete and each call to
+    ``next_frame`` waits for the next tick of the target frame rate. If a new output
+    arrived since the last tick it is emitted, otherwise the last output is repeated
+    (``repeat``) or the two last outputs are blended (``blend``). Outputs replaced
+    before a tick came are dropped. Timestamps are remapped to the tick times on the
+    90 kHz video clock so the encoder sees an even cadence.
+
+    In ``blend`` mode the emitted frame moves linearly from the previous to the latest
+    output over one output interval, which smooths motion at the cost of showing each
+    output fully one output interval later. Every blended tick converts both outputs
+    to arrays and the blend back to a frame, which takes a few milliseconds at high
+    resolutions, so ``repeat`` is the default and a ``convert`` coroutine function can
+    run the blending off the event loop.
+
+    Repeated frames are the same frame object with a new pts, which is safe because
+    the sender encodes a frame before it asks for the next one.
+    """
+
+    def __init__(
+        self,
+        source: Callable[[], Awaitable[av.VideoFrame]],
+        fps: float = 30.0,
+        mode: str = PACING_REPEAT,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        convert: Optional[Callable[..., Awaitable[Any]]] = None,
+    ):
+        """Initialize the pacer.
+
+        Args:
+            source: Coroutine function returning the next processed frame.
+            fps: Target output frame rate.
+            mode: ``repeat`` or ``blend``, what to emit when no new output is ready.
+            clock: Monotonic time in seconds the ticks are scheduled on.
+            sleep: Coroutine function waiting for the given seconds of the clock.
+            convert: Coroutine function called with a name, a blocking function and
+                its arguments that runs the function, e.g. on the pipeline's frame
+                executor. Blending runs on the event loop without it.
+        """
+        if mode not in (PACING_REPEAT, PACING_BLEND):
+            raise ValueError(f"Unknown pacing mode {mode}, expected repeat or blend")
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self._source = source
+        self._clock = clock
+        self._sleep = sleep
+        self._convert = convert
+        self.fps = fps
+        self.mode = mode
+        self.period = 1.0 / fps
+
+        self._task: Optional[asyncio.Task] = None
+        self._latest: Optional[av.VideoFrame] = None
+        self._previous: Optional[av.VideoFrame] = None
+        self._latest_at: Optional[float] = None
+        self._fresh = False
+        self._arrays: Dict[int, np.ndarray] = {}
+
+        self._start: Optional[float] = None
+        self._next_tick: Optional[float] = None
+        self._last_emit_at: Optional[float] = None
+        self._last_pts = -1
+
+        self._output_interval: Optional[float] = None
+        self._last_source_interval: Optional[float] = None
+        self.output_jitter = 0.0
+        self.source_jitter = 0.0
+
+        self.emitted_frames = 0
+        self.new_frames = 0
+        self.repeated_frames = 0
+        self.blended_frames = 0
+        self.dropped_outputs = 0
+        self.late_ticks = 0
+
+    def _receive(self, frame: av.VideoFrame):
+        now = self._clock()
+        if self._latest_at is not None:
+            interval = now - self._latest_at
+            if self._last_source_interval is not None:
+                deviation = abs(interval - self._last_source_interval)
+                self.source_jitter += (deviation - self.source_jitter) * JITTER_GAIN
+            self._last_source_interval = interval
+            if self._output_interval is None:
+                self._output_interval = interval
+            else:
+                self._output_interval += INTERVAL_SMOOTHING * (interval - self._output_interval)
+
+        if self._fresh and self._latest is not None:
+            self.dropped_outputs += 1
+            tracing.tracer.finish(tracing.get_trace(self._latest), dropped=True)
+        self._previous, self._latest = self._latest, frame
+        self._latest_at = now
+        self._fresh = True
+        # Replaced rather than cleared, a blend in progress may still fill the old one
+        self._arrays = {}
+
+    async def _pull(self):
+        while True:
+            self._receive(await self._source())
+
+    async def next_frame(self) -> av.VideoFrame:
+        """Wait for the next tick and return the frame to emit at it."""
+        if self._task is None:
+            # Block on the first output so the stream starts with a real frame
+            self._receive(await self._source())
+            self._task = asyncio.create_task(self._pull())
+
+        now = self._clock()
+        if self._next_tick is None:
+            self._start = self._next_tick = now
+        elif self._next_tick > now:
+            await self._sleep(self._next_tick - now)
+        elif now - self._next_tick > self.period:
+            # The consumer fell behind, restart the schedule instead of bursting
+            self.late_ticks += 1
+            self._next_tick = now
+        if self._task.done():
+            self._task.result()
+
+        tick = self._next_tick
+        self._next_tick += self.period
+        emit_at = self._clock()
+        if self._last_emit_at is not None:
+            deviation = abs((emit_at - self._last_emit_at) - self.period)
+            self.output_jitter += (deviation - self.output_jitter) * JITTER_GAIN
+        self._last_emit_at = emit_at
+
+        frame = await self._select_frame(emit_at)
+        frame.pts = max(self._last_pts + 1, round((tick - self._start) * VIDEO_CLOCK_RATE))
+        frame.time_base = VIDEO_TIME_BASE
+        self._last_pts = frame.pts
+        self.emitted_frames += 1
+        return frame
+
+    async def _select_frame(self, now: float) -> av.VideoFrame:
+        fresh, self._fresh = self._fresh, False
+        if self.mode == PACING_BLEND and self._previous is not None and self._output_interval:
+            alpha = min(1.0, (now - self._latest_at) / self._output_interval)
+            if alpha < 1.0:
+                args = (self._arrays, self._previous, self._latest, alpha)
+                if self._convert is None:
+                    blended = self._blend(*args)
+                else:
+                    blended = await self._convert("output_blend", self._blend, *args)
+                if blended is not None:
+                    self.blended_frames += 1
+                    if fresh:
+                        self._finish_trace(self._latest)
+                    return blended
+
+        if fresh:
+            self.new_frames += 1
+            return self._latest
+        self.repeated_frames += 1
+        # The trace of the output was finished when it was first emitted
+        self._latest.side_data.trace = None
+        return self._latest
+
+    def _blend(
+        self,
+        arrays: Dict[int, np.ndarray],
+        previous: av.VideoFrame,
+        latest: av.VideoFrame,
+        alpha: float,
+    ) -> Optional[av.VideoFrame]:
+        previous = self._to_array(arrays, previous)
+        latest = self._to_array(arrays, latest)
+        if previous.shape != latest.shape:
+            return None
+        weight = np.uint16(round(alpha * 256))
+        blended = previous.astype(np.uint16) * (256 - weight)
+        blended += latest.astype(np.uint16) * weight
+        blended >>= 8
+        return av.VideoFrame.from_ndarray(blended.astype(np.uint8), format="rgb24")
+
+    @staticmethod
+    def _to_array(arrays: Dict[int, np.ndarray], frame: av.VideoFrame) -> np.ndarray:
+        array = arrays.get(id(frame))
+        if array is None:
+            array = arrays[id(frame)] = frame.to_ndarray(format="rgb24")
+        return array
+
+    def _finish_trace(self, frame: av.VideoFrame):
+        trace = tracing.get_trace(frame)
+        if trace is not None:
+            trace.mark("recv")
+            tracing.tracer.finish(trace)
+            frame.side_data.trace = None
+
+    async def stop(self):
+        """Stop pulling outputs from the source."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the frame counters and the jitter of the source and the output."""
+        return {
+            "mode": self.mode,
+            "target_fps": self.fps,
+            "source_fps": 1.0 / self._output_interval if self._output_interval else None,
+            "emitted_frames": self.emitted_frames,
+            "new_frames": self.new_frames,
+            "repeated_frames": self.repeated_frames,
+            "blended_frames": self.blended_frames,
+            "dropped_outputs": self.dropped_outputs,
+            "late_ticks": self.late_ticks,
+            "source_jitter_ms": self.source_jitter * 1000.0,
+            "output_jitter_ms": self.output_jitter * 1000.0,
+        }
@@ -0,0 +1,75 @@
+"""Output queue that hands results from ComfyUI worker threads to the event loop."""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Deque, List
+
+
+class OutputQueue:
+    """Queue written from any thread and awaited on an asyncio event loop.
+
+    ``asyncio.Queue`` is not thread-safe: calling ``put_nowait`` from a ComfyUI
+    worker thread mutates the queue and resolves the getter future off-loop, and the
+    loop only notices once something else wakes its selector. This queue guards its
+    items with a lock and wakes waiting getters via ``call_soon_threadsafe``, which
+    writes to the loop's self-pipe so the loop wakes up immediately.
+    """
+
+    def __init__(self):
+        self._items: Deque[Any] = deque()
+        self._lock = threading.Lock()
+        self._waiters: List[asyncio.Future] = []
+
+    def put_nowait(self, item: Any):
+        """Queue an item and wake up waiting getters. Safe to call from any thread."""
+        with self._lock:
+            self._items.append(item)
+            waiters, self._waiters = self._waiters, []
+
+        for waiter in waiters:
+            try:
+                waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # The loop of the getter has been closed
+                pass
+
+    async def get(self) -> Any:
+        """Remove and return an item, waiting until one is available."""
+        while True:
+            with self._lock:
+                if self._items:
+                    return self._items.popleft()
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                raise
+
+    def get_nowait(self) -> Any:
+        """Remove and return an item if one is immediately available.
+
+        Raises:
+            asyncio.QueueEmpty: If the queue is empty.
+        """
+        with self._lock:
+            if not self._items:
+                raise asyncio.QueueEmpty
+            return self._items.popleft()
+
+    def empty(self) -> bool:
+        with self._lock:
+            return not self._items
+
+    def qsize(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
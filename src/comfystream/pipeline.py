@@ -3,12 +3,42 @@ import torch
 import numpy as np
 import asyncio
 import logging
+import time
+import uuid
 from typing import Any, Dict, Union, List, Optional
 
+from comfystream import tracing
+from comfystream.audio_ring_buffer import AudioRingBuffer
+from comfystream.buffer_pool import InputBufferPool, OutputBuffers
 from comfystream.client import ComfyStreamClient
+from comfystream.client_pool import ROUND_ROBIN, ClientPool
+from comfystream.executor_stage import ExecutorStage
+from comfystream.frame_index import FrameIndex, FrameRecord
+from comfystream.frame_geometry import (
+    RESIZE_CROP,
+    RESIZE_LETTERBOX,
+    RESIZE_NONE,
+    FrameGeometry,
+    compute_geometry,
+)
+from comfystream.latency_controller import LatencyController
+from comfystream.output_pacer import VIDEO_CLOCK_RATE, VIDEO_TIME_BASE
+from comfystream.process_client import ProcessComfyStreamClient
 from comfystream.server.utils import temporary_log_level
+from comfystream.warmup_cache import WarmupCache, hash_prompts
 
 WARMUP_RUNS = 5
+# Runs for a prompt and shape that were warmed before, to prime the session's prompt
+CACHED_WARMUP_RUNS = 1
+
+# Generated frames computing or waiting to be sent, one is encoded while the next computes
+GENERATIVE_PIPELINE_DEPTH = 2
+
+# Capacity of the buffer of processed audio waiting to be sent, in samples
+PROCESSED_AUDIO_CAPACITY = 48000 * 4
+
+# Incoming audio frames waiting for their processed audio, about 5s of 20 ms frames
+AUDIO_INCOMING_CAPACITY = 256
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +52,14 @@ class Pipeline:
     """
     
     def __init__(self, width: int = 512, height: int = 512, 
-                 comfyui_inference_log_level: Optional[int] = None, **kwargs):
+                 comfyui_inference_log_level: Optional[int] = None,
+                 resize_mode: str = RESIZE_NONE, frame_executor_workers: int = 0,
+                 latency_target_ms: Optional[float] = None,
+                 warmup_cache: Optional[WarmupCache] = None,
+                 generative_fps: Optional[float] = None,
+                 worker_process: bool = False, workers: int = 1,
+                 worker_strategy: str = ROUND_ROBIN,
+                 reorder_window: Optional[int] = None, **kwargs):
         """Initialize the pipeline with the given configuration.
         
         Args:
@@ -30,30 +67,135 @@ class Pipeline:
             height: Height of the video frames (default: 512)
             comfyui_inference_log_level: The logging level for ComfyUI inference.
                 Defaults to None, using the global ComfyUI log level.
-            **kwargs: Additional arguments to pass to the ComfyStreamClient
+            resize_mode: How incoming frames are mapped to width x height before
+                inference, one of "none", "stretch", "crop" or "letterbox". Outputs
+                are mapped back to the incoming resolution (default: "none")
+            frame_executor_workers: Number of threads converting video frames off the
+                event loop, 0 converts them on the loop (default: 0)
+            latency_target_ms: Latency from receiving a video frame to its output to
+                stay under by skipping frames before inference, None submits every
+                frame (default: None)
+            warmup_cache: Record of warm prompt and shape combinations, shared by
+                pipelines using the same ComfyUI client so reconnects skip most of
+                the warmup. Defaults to a cache of this pipeline only
+            generative_fps: Generate video at this frame rate without input frames,
+                running the prompt with no LoadTensor or with the image set by
+                set_conditioning_image. None processes input frames (default: None)
+            worker_process: Run the ComfyUI executor in a supervised child process
+                that frames reach through shared memory, so nodes holding the GIL
+                do not delay this process's event loop (default: False)
+            workers: Number of worker processes running their own copy of the
+                prompts, each video frame goes to one of them, scaling prompts bound
+                by the GIL across cores. Requires worker_process (default: 1)
+            worker_strategy: How frames are assigned to the workers, round_robin
+                or least_loaded (default: round_robin)
+            reorder_window: Outputs of the workers held while waiting for a missing
+                one before it is skipped, None for twice the frames in flight
+            **kwargs: Additional arguments to pass to the ComfyStreamClient, e.g.
+                ``session_id`` and ``comfy_client`` to serve a stream from a shared,
+                already running ComfyUI client, or ``eviction_policy`` to choose how
+                frames are dropped when inference falls behind, and
+                ``audio_overflow_policy``, ``audio_max_queued_ms`` and
+                ``audio_max_queued_bytes`` to bound the queued audio, and
+                ``batch_size`` and ``batch_window_ms`` to run the prompt on batches
+                of frames, and ``prompt_depth`` to run several frames through the
+                prompt at once, and ``node_timing`` to time every node of the prompt
         """
-        self.client = ComfyStreamClient(**kwargs)
+        self.generative_fps = generative_fps
+        if generative_fps:
+            kwargs.setdefault("max_runs_ahead", GENERATIVE_PIPELINE_DEPTH)
+        client_class = ProcessComfyStreamClient if worker_process else ComfyStreamClient
+        if workers > 1:
+            if generative_fps:
+                raise ValueError("Generative mode does not support several workers")
+            if not worker_process:
+                # Clients in this process share one GIL and do not run in parallel
+                raise ValueError("Several workers require worker_process")
+            session_id = kwargs.pop("session_id", None) or str(uuid.uuid4())
+            self.client = ClientPool(
+                [
+                    client_class(**kwargs, session_id=f"{session_id}:worker{idx}")
+                    for idx in range(workers)
+                ],
+                strategy=worker_strategy,
+                reorder_window=reorder_window,
+                session_id=session_id,
+            )
+        else:
+            self.client = client_class(**kwargs)
         self.width = width
         self.height = height
+        compute_geometry(width, height, width, height, resize_mode)  # Validate the mode
+        self.resize_mode = resize_mode
+
+        # Records of the submitted video frames, matched to outputs by sequence id
+        self._frame_index = FrameIndex()
+        self.audio_incoming_frames = asyncio.Queue(maxsize=AUDIO_INCOMING_CAPACITY)
+
+        self.processed_audio_buffer = AudioRingBuffer(PROCESSED_AUDIO_CAPACITY)
+        # Input samples the audio queue shed, no processed audio comes for them
+        self._shed_audio_samples = 0
+        self._shed_audio_seen = 0
+        # Processed samples of incoming frames dropped from a full incoming queue
+        self._audio_output_skip = 0
+
+        # Preallocated buffers reused across frames, rebuilt on resolution change
+        self._input_buffers = InputBufferPool()
+        self._output_buffers = OutputBuffers()
 
-        self.video_incoming_frames = asyncio.Queue()
-        self.audio_incoming_frames = asyncio.Queue()
+        self._frame_executor_workers = frame_executor_workers
+        self._frame_stage: Optional[ExecutorStage] = None
+        # Set by cleanup until prompts are set again, late frames are not converted
+        self._closed = False
 
-        self.processed_audio_buffer = np.array([], dtype=np.int16)
+        self._latency_controller: Optional[LatencyController] = None
+        if latency_target_ms:
+            self._latency_controller = LatencyController(
+                latency_target_ms,
+                min_in_flight=self.client.batch_size * self.client.prompt_depth,
+            )
 
         self._comfyui_inference_log_level = comfyui_inference_log_level
 
+        self.warmup_cache = warmup_cache if warmup_cache is not None else WarmupCache()
+        self._prompt_hash: Optional[str] = None
+
+        # Output clock of the generative mode
+        self._clock = time.monotonic
+        self._sleep = asyncio.sleep
+        self._generation_start: Optional[float] = None
+        self._next_generation_tick: Optional[float] = None
+        self._last_generated_pts = -1
+
+    def _warmup_runs(self, key) -> int:
+        return CACHED_WARMUP_RUNS if self.warmup_cache.is_warm(key) else WARMUP_RUNS
+
+    def _warmup_key(self, kind: str, input: Union[torch.Tensor, np.ndarray]):
+        if self._prompt_hash is None:
+            return None
+        return WarmupCache.key(
+            self._prompt_hash, kind, (self.client.batch_size, *input.shape), str(input.dtype)
+        )
+
     async def warm_video(self):
         """Warm up the video processing pipeline with dummy frames."""
         # Create dummy frame with the CURRENT resolution settings
         dummy_frame = av.VideoFrame()
         dummy_frame.side_data.input = torch.randn(1, self.height, self.width, 3)
-        
-        logger.info(f"Warming video pipeline with resolution {self.width}x{self.height}")
 
-        for _ in range(WARMUP_RUNS):
-            self.client.put_video_input(dummy_frame)
-            await self.client.get_video_output()
+        key = self._warmup_key("video", dummy_frame.side_data.input)
+        runs = self._warmup_runs(key)
+        logger.info(
+            f"Warming video pipeline with resolution {self.width}x{self.height} ({runs} runs)"
+        )
+
+        # Warm with full batches so batched kernels are compiled as well
+        for _ in range(runs):
+            for _ in range(self.client.batch_size):
+                self.client.put_video_input(dummy_frame, protected=True)
+            for _ in range(self.client.batch_size):
+                await self.client.get_video_output()
+        self.warmup_cache.mark_warm(key)
 
     async def warm_audio(self):
         """Warm up the audio processing pipeline with dummy frames."""
@@ -61,20 +203,28 @@ class Pipeline:
         dummy_frame.side_data.input = np.random.randint(-32768, 32767, int(48000 * 0.5), dtype=np.int16)   # TODO: adds a lot of delay if it doesn't match the buffer size, is warmup needed?
         dummy_frame.sample_rate = 48000
 
-        for _ in range(WARMUP_RUNS):
-            self.client.put_audio_input(dummy_frame)
+        key = self._warmup_key("audio", dummy_frame.side_data.input)
+        for _ in range(self._warmup_runs(key)):
+            await self.client.put_audio_input(dummy_frame)
             await self.client.get_audio_output()
+        self.warmup_cache.mark_warm(key)
+        # Warmup audio shed by the queue has no incoming frame to account against
+        self._shed_audio_seen = self._shed_audio_total()
 
-    async def set_prompts(self, prompts: Union[Dict[Any, Any], List[Dict[Any, Any]]]):
+    async def set_prompts(self, prompts: Union[Dict[Any, Any], List[Dict[Any, Any]]],
+                          chain: bool = False):
         """Set the processing prompts for the pipeline.
         
         Args:
             prompts: Either a single prompt dictionary or a list of prompt dictionaries
+            chain: Run the prompts as concurrent stages where each prompt feeds the
+                next one, e.g. depth estimation into a stylization pass
         """
-        if isinstance(prompts, list):
-            await self.client.set_prompts(prompts)
-        else:
-            await self.client.set_prompts([prompts])
+        if not isinstance(prompts, list):
+            prompts = [prompts]
+        self._prompt_hash = hash_prompts(prompts, chain=chain)
+        self._closed = False
+        await self.client.set_prompts(prompts, chain=chain)
 
     async def update_prompts(self, prompts: Union[Dict[Any, Any], List[Dict[Any, Any]]]):
         """Update the existing processing prompts.
@@ -82,10 +232,10 @@ class Pipeline:
         Args:
             prompts: Either a single prompt dictionary or a list of prompt dictionaries
         """
-        if isinstance(prompts, list):
-            await self.client.update_prompts(prompts)
-        else:
-            await self.client.update_prompts([prompts])
+        if not isinstance(prompts, list):
+            prompts = [prompts]
+        await self.client.update_prompts(prompts)
+        self._prompt_hash = hash_prompts(prompts, chain=self.client.chain_prompts)
 
     async def put_video_frame(self, frame: av.VideoFrame):
         """Queue a video frame for processing.
@@ -93,10 +243,34 @@ class Pipeline:
         Args:
             frame: The video frame to process
         """
-        frame.side_data.input = self.video_preprocess(frame)
+        if self.generative_fps:
+            raise RuntimeError(
+                "Generative pipelines take no input frames, use set_conditioning_image"
+            )
+        received_at = None
+        if self._latency_controller is not None:
+            received_at = time.monotonic()
+            if not self._latency_controller.admit(received_at):
+                # Skipped before preprocessing, the frame never reaches the prompt
+                frame.side_data.skipped = True
+                tracing.tracer.finish(tracing.get_trace(frame), dropped=True)
+                return
+        frame.side_data.input = await self._convert("video_preprocess", self.video_preprocess, frame)
+        tracing.mark(frame, "video_preprocess")
+
+        # LoadTensor and SaveTensor carry the sequence id to the output
+        frame.side_data.seq, evicted = self._frame_index.add(FrameRecord(
+            pts=frame.pts,
+            time_base=frame.time_base,
+            geometry=frame.side_data.geometry,
+            buffer_ptr=frame.side_data.input.data_ptr(),
+            trace=tracing.get_trace(frame),
+            received_at=received_at,
+        ))
+        self._drop_records(evicted)
         frame.side_data.skipped = True
         self.client.put_video_input(frame)
-        await self.video_incoming_frames.put(frame)
+        tracing.mark(frame, "enqueue")
 
     async def put_audio_frame(self, frame: av.AudioFrame):
         """Queue an audio frame for processing.
@@ -106,8 +280,13 @@ class Pipeline:
         """
         frame.side_data.input = self.audio_preprocess(frame)
         frame.side_data.skipped = True
-        self.client.put_audio_input(frame)
-        await self.audio_incoming_frames.put(frame)
+        await self.client.put_audio_input(frame)
+        if self.audio_incoming_frames.full():
+            # Nothing reads the processed audio, the output of the oldest frame is
+            # discarded when it arrives
+            stale = self.audio_incoming_frames.get_nowait()
+            self._audio_output_skip += stale.samples
+        self.audio_incoming_frames.put_nowait(frame)
 
     def video_preprocess(self, frame: av.VideoFrame) -> Union[torch.Tensor, np.ndarray]:
         """Preprocess a video frame before processing.
@@ -118,7 +297,39 @@ class Pipeline:
         Returns:
             The preprocessed frame as a tensor or numpy array
         """
-        frame_np = frame.to_ndarray(format="rgb24").astype(np.float32) / 255.0
+        geometry = compute_geometry(
+            frame.width, frame.height, self.width, self.height, self.resize_mode
+        )
+        frame.side_data.geometry = geometry
+        if geometry.is_identity:
+            frame_rgb = frame.to_ndarray(format="rgb24")
+            frame_np = self._input_buffers.acquire(frame_rgb.shape)
+            np.multiply(frame_rgb, np.float32(1 / 255.0), out=frame_np)
+            return torch.from_numpy(frame_np).unsqueeze(0)
+
+        # Scaling happens in swscale, cropping and padding on views of the buffers
+        frame_rgb = frame.to_ndarray(
+            format="rgb24", width=geometry.scaled_width, height=geometry.scaled_height
+        )
+        frame_np = self._input_buffers.acquire((self.height, self.width, 3))
+        if geometry.mode == RESIZE_CROP:
+            frame_rgb = frame_rgb[
+                geometry.crop_y:geometry.crop_y + self.height,
+                geometry.crop_x:geometry.crop_x + self.width,
+            ]
+            np.multiply(frame_rgb, np.float32(1 / 255.0), out=frame_np)
+        elif geometry.mode == RESIZE_LETTERBOX:
+            frame_np.fill(0.0)
+            np.multiply(
+                frame_rgb,
+                np.float32(1 / 255.0),
+                out=frame_np[
+                    geometry.pad_y:geometry.pad_y + geometry.scaled_height,
+                    geometry.pad_x:geometry.pad_x + geometry.scaled_width,
+                ],
+            )
+        else:
+            np.multiply(frame_rgb, np.float32(1 / 255.0), out=frame_np)
         return torch.from_numpy(frame_np).unsqueeze(0)
     
     def audio_preprocess(self, frame: av.AudioFrame) -> Union[torch.Tensor, np.ndarray]:
@@ -132,18 +343,40 @@ class Pipeline:
         """
         return frame.to_ndarray().ravel().reshape(-1, 2).mean(axis=1).astype(np.int16)
     
-    def video_postprocess(self, output: Union[torch.Tensor, np.ndarray]) -> av.VideoFrame:
+    def video_postprocess(self, output: Union[torch.Tensor, np.ndarray],
+                          geometry: Optional[FrameGeometry] = None) -> av.VideoFrame:
         """Postprocess a video frame after processing.
         
         Args:
             output: The processed output tensor or numpy array
+            geometry: The mapping applied to the input frame in video_preprocess,
+                which is inverted so the output matches the incoming resolution
             
         Returns:
             The postprocessed video frame
         """
-        return av.VideoFrame.from_ndarray(
-            (output * 255.0).clamp(0, 255).to(dtype=torch.uint8).squeeze(0).cpu().numpy()
-        )
+        frame_rgb = self._output_buffers.to_uint8(output).squeeze(0)
+        if (
+            geometry is None
+            or geometry.is_identity
+            or frame_rgb.shape[:2] != (geometry.target_height, geometry.target_width)
+        ):
+            return av.VideoFrame.from_ndarray(frame_rgb)
+
+        if geometry.mode == RESIZE_LETTERBOX:
+            frame_rgb = np.ascontiguousarray(frame_rgb[
+                geometry.pad_y:geometry.pad_y + geometry.scaled_height,
+                geometry.pad_x:geometry.pad_x + geometry.scaled_width,
+            ])
+        processed_frame = av.VideoFrame.from_ndarray(frame_rgb)
+
+        if geometry.mode == RESIZE_CROP:
+            # The cropped-away borders cannot be restored, scale back the visible window
+            width = round(geometry.target_width * geometry.source_width / geometry.scaled_width)
+            height = round(geometry.target_height * geometry.source_height / geometry.scaled_height)
+        else:
+            width, height = geometry.source_width, geometry.source_height
+        return processed_frame.reformat(width=width, height=height)
 
     def audio_postprocess(self, output: Union[torch.Tensor, np.ndarray]) -> av.AudioFrame:
         """Postprocess an audio frame after processing.
@@ -156,23 +389,137 @@ class Pipeline:
         """
         return av.AudioFrame.from_ndarray(np.repeat(output, 2).reshape(1, -1))
     
-    # TODO: make it generic to support purely generative video cases
+    async def _convert(self, name: str, fn, *args):
+        """Run a frame conversion on the executor stage if enabled, else on the loop.
+
+        Conversions of a stream are awaited one at a time, so frames stay in pts order.
+
+        Raises:
+            RuntimeError: If the pipeline was cleaned up, so a frame arriving late
+                does not start a new executor stage that is never shut down.
+        """
+        if self._closed:
+            raise RuntimeError("The pipeline was cleaned up")
+        if self._frame_executor_workers <= 0:
+            return fn(*args)
+        if self._frame_stage is None:
+            self._frame_stage = ExecutorStage(self._frame_executor_workers)
+        return await self._frame_stage.run(name, fn, *args)
+
+    async def run_frame_conversion(self, name: str, fn, *args):
+        """Run a blocking frame conversion where the pipeline runs its own.
+
+        Used for conversions outside the pipeline, e.g. the output pacer's blending.
+
+        Args:
+            name: Name under which the run time is accounted in the offload stats.
+            fn: The blocking function.
+            *args: Arguments of the function.
+        """
+        return await self._convert(name, fn, *args)
+
+    def get_offload_stats(self) -> Dict[str, Any]:
+        """Get the event loop time saved by converting frames on the executor stage.
+
+        Returns:
+            Dictionary containing the total and per-conversion offloaded seconds
+        """
+        if self._frame_stage is None:
+            return {"loop_time_saved": 0.0, "stages": {}}
+        return self._frame_stage.stats()
+
+    def _drop_records(self, records: List[FrameRecord]):
+        """Finish the frames that were dropped before inference."""
+        for record in records:
+            tracing.tracer.finish(record.trace, dropped=True)
+            self._input_buffers.release(record.buffer_ptr)
+            if self._latency_controller is not None:
+                self._latency_controller.on_dropped()
+
+    def set_conditioning_image(self, image: Optional[Union[torch.Tensor, np.ndarray]]):
+        """Set the static image LoadTensor reads on every run of a generative pipeline.
+
+        Args:
+            image: A HxWx3 uint8 array or a 1xHxWx3 float tensor in [0, 1], or None
+                for prompts without LoadTensor
+        """
+        if image is None:
+            self.client.run_input = None
+            return
+        if isinstance(image, np.ndarray):
+            image = torch.from_numpy(image.astype(np.float32) / 255.0).unsqueeze(0)
+        conditioning_frame = av.VideoFrame()
+        conditioning_frame.side_data.input = image
+        self.client.run_input = conditioning_frame
+
     async def get_processed_video_frame(self) -> av.VideoFrame:
         """Get the next processed video frame.
         
         Returns:
             The processed video frame
         """
+        if self.generative_fps:
+            return await self._get_generated_video_frame()
+
+        record = None
+        while record is None:
+            # Outputs of frames that are no longer indexed, e.g. warmup frames, are skipped
+            async with temporary_log_level("comfy", self._comfyui_inference_log_level):
+                seq, out_tensor = await self.client.get_indexed_video_output()
+            record, dropped = self._frame_index.pop(seq)
+            self._drop_records(dropped)
+        if self._latency_controller is not None:
+            self._latency_controller.on_output(record.received_at)
+        if record.trace is not None:
+            record.trace.mark("output_wait")
+
+        try:
+            processed_frame = await self._convert(
+                "video_postprocess", self.video_postprocess, out_tensor, record.geometry
+            )
+        finally:
+            # The output may be a view of the input buffer, e.g. for pass-through
+            # prompts, so the buffer is reused only once it has been converted
+            self._input_buffers.release(record.buffer_ptr)
+        processed_frame.pts = record.pts
+        processed_frame.time_base = record.time_base
+
+        if record.trace is not None:
+            record.trace.mark("video_postprocess")
+            processed_frame.side_data.trace = record.trace
+        
+        return processed_frame
+
+    async def _get_generated_video_frame(self) -> av.VideoFrame:
+        """Get the next generated frame at the tick of the output clock.
+
+        Consuming the output lets the client start the next run, so it computes
+        while this frame is postprocessed and encoded.
+        """
+        period = 1.0 / self.generative_fps
         async with temporary_log_level("comfy", self._comfyui_inference_log_level):
             out_tensor = await self.client.get_video_output()
-        frame = await self.video_incoming_frames.get()
-        while frame.side_data.skipped:
-            frame = await self.video_incoming_frames.get()
 
-        processed_frame = self.video_postprocess(out_tensor)
-        processed_frame.pts = frame.pts
-        processed_frame.time_base = frame.time_base
-        
+        now = self._clock()
+        if self._next_generation_tick is None:
+            self._generation_start = self._next_generation_tick = now
+        elif self._next_generation_tick > now:
+            await self._sleep(self._next_generation_tick - now)
+        elif now - self._next_generation_tick > period:
+            # Generation fell behind the clock, restart it instead of bursting
+            self._next_generation_tick = now
+        tick = self._next_generation_tick
+        self._next_generation_tick += period
+
+        processed_frame = await self._convert(
+            "video_postprocess", self.video_postprocess, out_tensor
+        )
+        processed_frame.pts = max(
+            self._last_generated_pts + 1,
+            round((tick - self._generation_start) * VIDEO_CLOCK_RATE),
+        )
+        processed_frame.time_base = VIDEO_TIME_BASE
+        self._last_generated_pts = processed_frame.pts
         return processed_frame
 
     async def get_processed_audio_frame(self) -> av.AudioFrame:
@@ -182,12 +529,16 @@ class Pipeline:
             The processed audio frame
         """
         frame = await self.audio_incoming_frames.get()
-        if frame.samples > len(self.processed_audio_buffer):
-            async with temporary_log_level("comfy", self._comfyui_inference_log_level):
-                out_tensor = await self.client.get_audio_output()
-            self.processed_audio_buffer = np.concatenate([self.processed_audio_buffer, out_tensor])
-        out_data = self.processed_audio_buffer[:frame.samples]
-        self.processed_audio_buffer = self.processed_audio_buffer[frame.samples:]
+        shed = self._shed_audio_total()
+        self._shed_audio_samples += shed - self._shed_audio_seen
+        self._shed_audio_seen = shed
+        if self._shed_audio_samples >= frame.samples:
+            # The prompt never sees as much input as was shed, send silence in its
+            # place instead of waiting for processed audio that will not come
+            self._shed_audio_samples -= frame.samples
+            out_data = np.zeros(frame.samples, dtype=np.int16)
+        else:
+            out_data = await self._read_processed_audio(frame.samples)
 
         processed_frame = self.audio_postprocess(out_data)
         processed_frame.pts = frame.pts
@@ -196,6 +547,91 @@ class Pipeline:
         
         return processed_frame
     
+    def _shed_audio_total(self) -> int:
+        stats = self.client.get_audio_input_stats()
+        return stats.get("dropped_samples", 0) + stats.get("stretched_samples", 0)
+
+    async def _read_processed_audio(self, samples: int) -> np.ndarray:
+        buffer = self.processed_audio_buffer
+        while True:
+            if self._audio_output_skip:
+                skipped = min(self._audio_output_skip, len(buffer))
+                buffer.consume(skipped)
+                self._audio_output_skip -= skipped
+            if not self._audio_output_skip and samples <= len(buffer):
+                # audio_postprocess copies the view before the ring is written again
+                return buffer.read(samples)
+            async with temporary_log_level("comfy", self._comfyui_inference_log_level):
+                out_tensor = await self.client.get_audio_output()
+            buffer.write(out_tensor)
+
+    @property
+    def session_id(self) -> str:
+        """The id of the tensor_cache session this pipeline reads and writes."""
+        return self.client.session_id
+
+    def get_video_input_stats(self) -> Dict[str, Any]:
+        """Get the counters of frames kept and dropped by the eviction policy.
+
+        Returns:
+            Dictionary containing the policy name and frame counters
+        """
+        return self.client.get_video_input_stats()
+
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """Get the estimates and frame admission decisions of the latency controller.
+
+        Returns:
+            Dictionary containing the latency and inference time estimates and the
+            submitted and skipped frame counters, empty if no target is set
+        """
+        if self._latency_controller is None:
+            return {}
+        return self._latency_controller.stats()
+
+    def get_audio_input_stats(self) -> Dict[str, Any]:
+        """Get the budget usage and shed load counters of the audio input queue.
+
+        Returns:
+            Dictionary containing the overflow policy and queue counters
+        """
+        return self.client.get_audio_input_stats()
+
+    def get_stage_stats(self) -> List[Dict[str, Any]]:
+        """Get the queued frames and run latency of every prompt stage.
+
+        Returns:
+            One dictionary per stage, a single one unless the prompts are chained
+        """
+        return self.client.get_stage_stats()
+
+    def get_node_timings(self) -> Dict[int, Dict[str, Dict[str, Any]]]:
+        """Get the wall and CPU time of the nodes of the running prompts.
+
+        Returns:
+            Dictionary mapping prompt index to node id to the class type, execution
+            count and p50/p95 wall and CPU times in ms, empty unless node timing is
+            enabled
+        """
+        return self.client.get_node_timings()
+
+    def get_reorder_stats(self) -> Dict[str, Any]:
+        """Get the in-flight depth of the prompt runs and the output reorder counters.
+
+        Returns:
+            Dictionary containing the prompt depth and reorder buffer counters
+        """
+        return self.client.get_reorder_stats()
+
+    def get_prompt_update_stats(self) -> Dict[str, int]:
+        """Get how prompt updates were applied.
+
+        Returns:
+            Dictionary counting prompts updated in place, prompts converted again and
+            updates discarded in favour of a newer one
+        """
+        return dict(self.client.update_stats)
+
     async def get_nodes_info(self) -> Dict[str, Any]:
         """Get information about all nodes in the current prompt including metadata.
         
@@ -206,5 +642,16 @@ class Pipeline:
         return nodes_info
     
     async def cleanup(self):
-        """Clean up resources used by the pipeline."""
-        await self.client.cleanup() 
\ No newline at end of file
+        """Clean up resources used by the pipeline.
+
+        Calling it again before new prompts are set does nothing, so the session of
+        the pipeline is not recreated.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        await self.client.cleanup()
+        self._drop_records(self._frame_index.clear())
+        if self._frame_stage is not None:
+            self._frame_stage.shutdown()
+            self._frame_stage = None 
\ No newline at end of file
@@ -0,0 +1,384 @@
+"""Client running the ComfyUI executor in a supervised worker process."""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from comfystream import tensor_cache
+from comfystream.inference_worker import AUDIO, VIDEO, run_worker
+from comfystream.shm_ring import SharedFrameRing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_FRAME_SIZE = 1920
+
+# Restarts of a crashed worker before giving up, the count is reset once a worker
+# stayed up for RESTART_RESET_SECONDS
+MAX_RESTARTS = 5
+RESTART_RESET_SECONDS = 60.0
+MAX_RESTART_BACKOFF = 30.0
+
+# Interval of the stats snapshots fetched from the worker, the stats getters are sync
+STATS_INTERVAL = 1.0
+
+# Time the worker gets to stop before it is terminated
+STOP_TIMEOUT = 10.0
+
+
+class WorkerError(RuntimeError):
+    """Raised when a command fails in the inference worker or the worker exits."""
+
+
+class ProcessComfyStreamClient:
+    """ComfyStreamClient whose ComfyUI executor runs in a child process.
+
+    Node code holding the GIL, e.g. Python-level image operations, then runs in its
+    own process instead of delaying RTP packetization and ICE on the server's event
+    loop. Frames are copied into shared memory rings as uint8 pictures and a message
+    per frame is sent through a pipe, which the event loop watches without polling.
+
+    The child is supervised: when it exits unexpectedly it is restarted with a
+    backoff and the last prompts are set again. Frames in flight during a crash are
+    lost.
+
+    Frames queued without a sequence id are treated as protected warmup frames.
+    Sharing an EmbeddedComfyClient and conditioning images are not supported.
+    """
+
+    def __init__(
+        self,
+        max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+        ring_slots: Optional[int] = None,
+        max_restarts: int = MAX_RESTARTS,
+        worker_target: Callable[..., None] = run_worker,
+        **kwargs,
+    ):
+        """Initialize the client, the worker is started by ``set_prompts``.
+
+        Args:
+            max_frame_size: Largest width and height of the frames crossing the rings.
+            ring_slots: Frames each ring holds, defaults to twice the frames in
+                flight.
+            max_restarts: Restarts of a crashed worker before giving up.
+            worker_target: Function run in the child process.
+            **kwargs: Arguments of the ComfyStreamClient in the worker.
+        """
+        if kwargs.get("comfy_client") is not None:
+            raise ValueError("An inference worker process cannot share an in-process ComfyUI client")
+        self.session_id = kwargs.get("session_id") or tensor_cache.DEFAULT_SESSION_ID
+        self.batch_size = kwargs.get("batch_size", 1)
+        self.prompt_depth = kwargs.get("prompt_depth", 1)
+        self.chain_prompts = False
+        self.max_frame_size = max_frame_size
+        self.ring_slots = ring_slots or max(4, 2 * self.batch_size * self.prompt_depth)
+        self.max_restarts = max_restarts
+        self._client_kwargs = kwargs
+        self._worker_target = worker_target
+        self._context = multiprocessing.get_context("spawn")
+
+        self._process = None
+        self._control = None
+        self._inputs = None
+        self._outputs = None
+        self._input_ring: Optional[SharedFrameRing] = None
+        self._output_ring: Optional[SharedFrameRing] = None
+        self._input_scratch: Optional[np.ndarray] = None
+        # Shape of the last frame dropped for not fitting in the rings, warned once
+        self._oversized_shape: Optional[Tuple[int, ...]] = None
+        self._control_lock = asyncio.Lock()
+        self._video_outputs: asyncio.Queue = asyncio.Queue()
+        self._audio_outputs: asyncio.Queue = asyncio.Queue()
+
+        # Last prompts, set again on a restarted worker
+        self._prompts: Optional[Tuple[List[Dict[Any, Any]], bool]] = None
+        self._stats: Dict[str, Any] = {}
+        self._stats_task: Optional[asyncio.Task] = None
+        self._restart_task: Optional[asyncio.Task] = None
+        self._started_at = 0.0
+        self._stopping = False
+        self.restarts = 0
+        self.failed = False
+
+    @property
+    def run_input(self):
+        return None
+
+    @run_input.setter
+    def run_input(self, frame):
+        if frame is not None:
+            raise ValueError("Conditioning images are not supported with an inference worker process")
+
+    def _start_worker(self):
+        loop = asyncio.get_running_loop()
+        self._input_ring = SharedFrameRing.create(
+            slot_count=self.ring_slots, height=self.max_frame_size, width=self.max_frame_size
+        )
+        self._output_ring = SharedFrameRing.create(
+            slot_count=self.ring_slots, height=self.max_frame_size, width=self.max_frame_size
+        )
+        self._control, control = self._context.Pipe()
+        inputs, self._inputs = self._context.Pipe(duplex=False)
+        self._outputs, outputs = self._context.Pipe(duplex=False)
+        self._process = self._context.Process(
+            target=self._worker_target,
+            args=(
+                self._client_kwargs,
+                self._input_ring.name,
+                self._output_ring.name,
+                control,
+                inputs,
+                outputs,
+                logging.getLogger().level,
+            ),
+            daemon=True,
+        )
+        self._process.start()
+        self._started_at = time.monotonic()
+        # Without the child's ends in this process, a crash shows up as EOF
+        for connection in (control, inputs, outputs):
+            connection.close()
+        loop.add_reader(self._outputs.fileno(), self._on_outputs)
+        loop.add_reader(self._process.sentinel, self._on_worker_exit)
+        logger.info(f"Started inference worker {self._process.pid} for session {self.session_id}")
+
+    def _release_worker(self):
+        """Forget a stopped worker, its pipes and its rings."""
+        loop = asyncio.get_running_loop()
+        if self._process is not None:
+            loop.remove_reader(self._process.sentinel)
+            if self._process.is_alive():
+                self._process.kill()
+            self._process.join()
+            self._process.close()
+            self._process = None
+        if self._outputs is not None:
+            loop.remove_reader(self._outputs.fileno())
+        for connection in (self._control, self._inputs, self._outputs):
+            if connection is not None:
+                connection.close()
+        self._control = self._inputs = self._outputs = None
+        for ring in (self._input_ring, self._output_ring):
+            if ring is not None:
+                ring.close()
+        self._input_ring = self._output_ring = None
+
+    def _on_worker_exit(self):
+        # The sentinel is ready once the process exits, reaping it does not block
+        self._process.join(0)
+        exitcode = self._process.exitcode
+        # Outputs the worker announced before exiting are still in the ring
+        self._on_outputs()
+        self._release_worker()
+        if self._stopping:
+            return
+        logger.error(f"Inference worker of session {self.session_id} exited with code {exitcode}")
+        if time.monotonic() - self._started_at >= RESTART_RESET_SECONDS:
+            self.restarts = 0
+        if self.restarts >= self.max_restarts:
+            logger.error(f"Inference worker crashed {self.restarts} times in a row, giving up")
+            self.failed = True
+            return
+        self._restart_task = asyncio.create_task(self._restart())
+
+    async def _restart(self):
+        backoff = min(0.5 * 2 ** self.restarts, MAX_RESTART_BACKOFF)
+        self.restarts += 1
+        await asyncio.sleep(backoff)
+        if self._stopping:
+            return
+        self._start_worker()
+        if self._prompts is not None:
+            prompts, chain = self._prompts
+            try:
+                await self._command("set_prompts", prompts, chain)
+            except WorkerError as e:
+                logger.error(f"Could not set the prompts of the restarted worker: {e}")
+
+    def _on_outputs(self):
+        """Move the announced outputs from the ring and the pipe to the output queues."""
+        if self._outputs is None:
+            return
+        try:
+            while self._outputs.poll():
+                message = self._outputs.recv()
+                if message == VIDEO:
+                    slot = self._output_ring.acquire()
+                    if slot is None:
+                        continue
+                    output = torch.from_numpy(slot.frame.copy()).unsqueeze(0)
+                    self._output_ring.release(slot)
+                    self._video_outputs.put_nowait((slot.pts, output))
+                elif message[0] == AUDIO:
+                    self._audio_outputs.put_nowait(message[1])
+        except (EOFError, OSError):
+            # The worker is gone, its sentinel handler restarts it
+            asyncio.get_running_loop().remove_reader(self._outputs.fileno())
+
+    async def _command(self, name: str, *args) -> Any:
+        async with self._control_lock:
+            if self._control is None:
+                raise WorkerError("The inference worker is not running")
+            loop = asyncio.get_running_loop()
+            try:
+                self._control.send((name, args))
+                status, result = await loop.run_in_executor(None, self._control.recv)
+            except (EOFError, OSError) as e:
+                raise WorkerError(f"The inference worker exited during {name}") from e
+        if status == "error":
+            raise WorkerError(result)
+        return result
+
+    async def _refresh_stats(self):
+        while True:
+            try:
+                self._stats = await self._command("stats")
+            except WorkerError:
+                pass
+            await asyncio.sleep(STATS_INTERVAL)
+
+    async def set_prompts(self, prompts: List[Dict[Any, Any]], chain: bool = False):
+        """Start the worker if needed and start running the prompts in it."""
+        self._stopping = False
+        self.failed = False
+        if self._restart_task is not None and not self._restart_task.done():
+            await self._restart_task
+        if self._process is None:
+            self._start_worker()
+        self.chain_prompts = chain
+        self._prompts = (prompts, chain)
+        await self._command("set_prompts", prompts, chain)
+        if self._stats_task is None:
+            self._stats_task = asyncio.create_task(self._refresh_stats())
+
+    async def update_prompts(self, prompts: List[Dict[Any, Any]]):
+        await self._command("update_prompts", prompts)
+        self._prompts = (prompts, self.chain_prompts)
+
+    def put_video_input(self, frame, protected: bool = False):
+        """Copy a video frame to the input ring.
+
+        The frame is dropped if the ring is full or the frame is larger than
+        ``max_frame_size``.
+
+        Args:
+            frame: The frame, with a [0, 1] float image of shape (1, H, W, C) in
+                ``side_data.input``.
+            protected: Ignored, frames without a sequence id are protected.
+        """
+        if self._input_ring is None:
+            return
+        image = frame.side_data.input
+        if isinstance(image, torch.Tensor):
+            image = image.detach().cpu().numpy()
+        image = image.reshape(image.shape[-3:])
+        if image.shape[0] > self._input_ring.height or image.shape[1] > self._input_ring.width:
+            if image.shape != self._oversized_shape:
+                self._oversized_shape = image.shape
+                logger.warning(
+                    f"Dropping frames of {image.shape[1]}x{image.shape[0]}, larger than the "
+                    f"max_frame_size of {self.max_frame_size}, resize them with resize_mode"
+                )
+            return
+        if self._input_scratch is None or self._input_scratch.shape != image.shape:
+            self._input_scratch = np.empty(image.shape, dtype=np.float32)
+        # Rounded to uint8 by the ring's copy
+        np.multiply(image, 255.0, out=self._input_scratch)
+        self._input_scratch += 0.5
+        if self._input_ring.write(self._input_scratch, pts=getattr(frame.side_data, "seq", None)) is None:
+            return
+        try:
+            self._inputs.send(VIDEO)
+        except OSError:
+            # The worker is being restarted
+            pass
+
+    async def put_audio_input(self, frame):
+        if self._inputs is None:
+            return
+        try:
+            self._inputs.send((AUDIO, frame.side_data.input, frame.sample_rate))
+        except OSError:
+            pass
+
+    async def get_video_output(self):
+        _, output = await self.get_indexed_video_output()
+        return output
+
+    async def get_indexed_video_output(self) -> Tuple[Optional[int], torch.Tensor]:
+        """Get the next video output, a uint8 image, with the sequence id of its input."""
+        return await self._video_outputs.get()
+
+    async def get_audio_output(self):
+        return await self._audio_outputs.get()
+
+    async def get_available_nodes(self):
+        try:
+            return await self._command("get_available_nodes")
+        except WorkerError as e:
+            logger.error(f"Error getting node info: {e}")
+            return {}
+
+    def get_video_input_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats.get("video_input", {}))
+        if self._input_ring is not None:
+            stats["ring_dropped_frames"] = self._input_ring.dropped
+        return stats
+
+    def get_audio_input_stats(self) -> Dict[str, Any]:
+        return self._stats.get("audio_input", {})
+
+    def get_stage_stats(self) -> List[Dict[str, Any]]:
+        return self._stats.get("stages", [])
+
+    def get_reorder_stats(self) -> Dict[str, Any]:
+        return self._stats.get("reorder", {"prompt_depth": self.prompt_depth})
+
+    def get_node_timings(self) -> Dict[int, Dict[str, Dict[str, Any]]]:
+        return self._stats.get("node_timings", {})
+
+    @property
+    def update_stats(self) -> Dict[str, int]:
+        return self._stats.get("update_stats", {"incremental": 0, "full": 0, "superseded": 0})
+
+    def get_worker_stats(self) -> Dict[str, Any]:
+        """Get the state of the worker process and its rings."""
+        return {
+            "pid": self._process.pid if self._process is not None else None,
+            "restarts": self.restarts,
+            "failed": self.failed,
+            "input_ring": self._input_ring.stats() if self._input_ring is not None else {},
+            "output_ring": self._output_ring.stats() if self._output_ring is not None else {},
+        }
+
+    async def cleanup(self):
+        """Stop the worker process and release the rings."""
+        self._stopping = True
+        for task in (self._stats_task, self._restart_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._stats_task = self._restart_task = None
+        if self._process is None:
+            return
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(self._process.sentinel)
+        async with self._control_lock:
+            try:
+                self._control.send(("stop", ()))
+            except OSError:
+                pass
+        await loop.run_in_executor(None, self._process.join, STOP_TIMEOUT)
+        if self._process.is_alive():
+            logger.warning(f"Inference worker {self._process.pid} did not stop, terminating it")
+            self._process.terminate()
+            await loop.run_in_executor(None, self._process.join)
+        self._release_worker()
+        logger.info(f"Worker client cleanup complete for session {self.session_id}")
@@ -0,0 +1,105 @@
+"""Diff-based updates of running prompts.
+
+The UI sends the whole prompt on every widget change, usually with a single literal
+input changed. Instead of converting and validating the whole prompt again, the new
+prompt is compared with the running one and only the changed inputs are copied into
+the running converted prompt. Any change of the graph structure falls back to a full
+conversion.
+"""
+
+import copy
+from typing import Any, Dict, Mapping, Optional
+
+from comfy.api.components.schema.prompt import Prompt
+
+InputChanges = Dict[str, Dict[str, Any]]
+
+
+def _is_link(value: Any) -> bool:
+    """Return whether an input value is a link to the output of another node."""
+    return (
+        isinstance(value, (list, tuple))
+        and len(value) == 2
+        and isinstance(value[0], str)
+        and isinstance(value[1], int)
+    )
+
+
+def diff_prompt_inputs(old: Mapping[str, Any], new: Mapping[str, Any]) -> Optional[InputChanges]:
+    """Return the literal inputs that changed between two prompts, per node id.
+
+    Returns:
+        The changed inputs, empty if the prompts are equal, or None if nodes, class
+        types, input names or links differ and the prompt must be converted again.
+    """
+    if old.keys() != new.keys():
+        return None
+    changes = {}
+    for node_id, new_node in new.items():
+        old_node = old[node_id]
+        if old_node.get("class_type") != new_node.get("class_type"):
+            return None
+        old_inputs = old_node.get("inputs", {})
+        new_inputs = new_node.get("inputs", {})
+        if old_inputs.keys() != new_inputs.keys():
+            return None
+        node_changes = {}
+        for name, value in new_inputs.items():
+            old_value = old_inputs[name]
+            if value == old_value:
+                continue
+            if _is_link(value) or _is_link(old_value):
+                return None
+            node_changes[name] = value
+        if node_changes:
+            changes[node_id] = node_changes
+    return changes
+
+
+def copy_changed_nodes(
+    old: Mapping[str, Any], new: Mapping[str, Any], changes: InputChanges
+) -> Dict[str, Any]:
+    """Copy a new prompt, sharing the nodes that did not change with the old one.
+
+    Unchanged nodes are equal to the old ones, so only the changed nodes are copied
+    to keep the result independent of dicts the caller may modify and resend.
+    """
+    updated = dict(old)
+    for node_id in changes:
+        updated[node_id] = copy.deepcopy(new[node_id])
+    return updated
+
+
+def apply_input_changes(
+    converted: Mapping[str, Any], raw: Mapping[str, Any], changes: InputChanges
+) -> Optional[Dict[str, Any]]:
+    """Copy changed inputs into a converted prompt.
+
+    Only the changed nodes are copied, the others are shared with ``converted``,
+    which is not modified so runs that already use it are unaffected. The changed
+    nodes are validated like ``convert_prompt`` validates a whole prompt, the others
+    were validated when ``converted`` was.
+
+    Args:
+        converted: The running converted prompt.
+        raw: The new prompt as sent by the client.
+        changes: The output of ``diff_prompt_inputs``.
+
+    Returns:
+        The updated prompt, or None if a changed node was replaced during conversion,
+        e.g. a LoadImage turned into a LoadTensor, and the prompt must be converted
+        again.
+
+    Raises:
+        Exception: If a changed node does not pass the prompt schema validation.
+    """
+    changed_nodes = {}
+    for node_id, node_changes in changes.items():
+        node = converted[node_id]
+        if node.get("class_type") != raw[node_id].get("class_type"):
+            return None
+        changed_nodes[node_id] = {**node, "inputs": {**node.get("inputs", {}), **node_changes}}
+    updated = dict(converted)
+    if changed_nodes:
+        updated.update(Prompt.validate(changed_nodes))
+    return updated
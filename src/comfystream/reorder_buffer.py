@@ -0,0 +1,84 @@
+"""Restores the input order of outputs produced by concurrent prompt runs."""
+
+import itertools
+import threading
+from typing import Any, Dict, List
+
+DEFAULT_WINDOW = 2
+
+
+class ReorderBuffer:
+    """Releases the outputs of prompt runs in the order the runs took their inputs.
+
+    LoadTensor takes a ticket when a run takes its frames and SaveTensor pushes the
+    run's outputs with that ticket. Outputs of a run that finished early are held
+    until the runs before it have pushed theirs. A run that never pushes, because it
+    failed or was cancelled, would stall the buffer, so once more than ``window``
+    runs are held the missing tickets are skipped. Tickets known to never push can be
+    skipped right away instead. Outputs arriving for a skipped ticket are dropped as
+    late.
+
+    Called from the ComfyUI worker threads.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._tickets = itertools.count()
+        self._next = 0
+        self._pending: Dict[int, List[Any]] = {}
+        self.reordered_runs = 0
+        self.skipped_tickets = 0
+        self.late_runs = 0
+
+    def next_ticket(self) -> int:
+        """Issue the ticket of a run that just took its inputs."""
+        with self._lock:
+            return next(self._tickets)
+
+    def push(self, ticket: int, outputs: List[Any]) -> List[Any]:
+        """Add the outputs of a run and return the outputs that are now in order."""
+        with self._lock:
+            if ticket < self._next:
+                self.late_runs += 1
+                return []
+            if ticket != self._next:
+                self.reordered_runs += 1
+            self._pending[ticket] = outputs
+            return self._release()
+
+    def skip(self, ticket: int) -> List[Any]:
+        """Skip the ticket of a run that will never push its outputs.
+
+        Returns:
+            The outputs that are now in order.
+        """
+        with self._lock:
+            if ticket < self._next:
+                return []
+            self.skipped_tickets += 1
+            self._pending[ticket] = []
+            return self._release()
+
+    def _release(self) -> List[Any]:
+        ready = []
+        while self._pending:
+            if self._next in self._pending:
+                ready.extend(self._pending.pop(self._next))
+                self._next += 1
+            elif len(self._pending) > self.window:
+                skip_to = min(self._pending)
+                self.skipped_tickets += skip_to - self._next
+                self._next = skip_to
+            else:
+                break
+        return ready
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "held_runs": len(self._pending),
+                "reordered_runs": self.reordered_runs,
+                "skipped_tickets": self.skipped_tickets,
+                "late_runs": self.late_runs,
+            }
@@ -2,7 +2,7 @@
 
 from prometheus_client import Gauge, generate_latest
 from aiohttp import web
-from typing import Optional
+from typing import Any, Dict, Optional, Set, Tuple
 
 
 class MetricsManager:
@@ -21,6 +21,61 @@ class MetricsManager:
         self._fps_gauge = Gauge(
             "stream_fps", "Frames per second of the stream", base_labels
         )
+        self._loop_time_saved_gauge = Gauge(
+            "stream_loop_time_saved_seconds",
+            "Event loop time saved by converting frames off the loop",
+            base_labels,
+        )
+        self._latency_gauge = Gauge(
+            "stream_latency_ms",
+            "Smoothed latency from receiving a frame to its output",
+            base_labels,
+        )
+        self._skipped_frames_gauge = Gauge(
+            "stream_latency_skipped_frames",
+            "Frames skipped by the latency controller before inference",
+            base_labels,
+        )
+        self._output_jitter_gauge = Gauge(
+            "stream_output_jitter_ms",
+            "Jitter of the paced output frame intervals",
+            base_labels,
+        )
+        self._audio_queued_gauge = Gauge(
+            "stream_audio_queued_ms",
+            "Audio input queued for the audio prompt",
+            base_labels,
+        )
+        self._audio_dropped_samples_gauge = Gauge(
+            "stream_audio_dropped_samples",
+            "Audio input samples dropped by the audio overflow policy",
+            base_labels,
+        )
+        self._audio_stretched_samples_gauge = Gauge(
+            "stream_audio_stretched_samples",
+            "Audio input samples removed by time stretching the queued audio",
+            base_labels,
+        )
+        self._prompt_updates_gauge = Gauge(
+            "stream_prompt_updates",
+            "Prompts updated in place (incremental), converted again (full) or "
+            "discarded for a newer update (superseded)",
+            base_labels + ["kind"],
+        )
+        node_labels = base_labels + ["prompt", "node_id", "class_type", "quantile"]
+        self._node_wall_time_gauge = Gauge(
+            "stream_node_wall_time_ms",
+            "Rolling percentiles of the wall time of a prompt node",
+            node_labels,
+        )
+        self._node_cpu_time_gauge = Gauge(
+            "stream_node_cpu_time_ms",
+            "Rolling percentiles of the CPU time of a prompt node",
+            node_labels,
+        )
+        # Label values of the node series each stream reported last, removed once the
+        # node or the stream is gone
+        self._node_series: Dict[str, Set[Tuple[str, ...]]] = {}
 
     def enable(self):
         """Enable Prometheus metrics collection."""
@@ -39,6 +94,161 @@ class MetricsManager:
             else:
                 self._fps_gauge.set(fps)
 
+    def update_loop_time_saved_metrics(
+        self, seconds: float, stream_id: Optional[str] = None
+    ):
+        """Update the event loop time saved by the frame executor stage of a stream.
+
+        Args:
+            seconds: Total seconds of frame conversion run off the event loop.
+            stream_id: The ID of the stream.
+        """
+        if self._enabled:
+            if self._include_stream_id:
+                self._loop_time_saved_gauge.labels(stream_id=stream_id or "").set(
+                    seconds
+                )
+            else:
+                self._loop_time_saved_gauge.set(seconds)
+
+    def update_latency_metrics(
+        self, stats: Dict[str, Any], stream_id: Optional[str] = None
+    ):
+        """Update the latency controller metrics of a stream.
+
+        Args:
+            stats: The latency controller stats, empty if the controller is disabled.
+            stream_id: The ID of the stream.
+        """
+        if not self._enabled or not stats:
+            return
+        gauges = [(self._skipped_frames_gauge, stats["skipped_frames"])]
+        if stats["latency_ms"] is not None:
+            gauges.append((self._latency_gauge, stats["latency_ms"]))
+        for gauge, value in gauges:
+            if self._include_stream_id:
+                gauge.labels(stream_id=stream_id or "").set(value)
+            else:
+                gauge.set(value)
+
+    def update_audio_input_metrics(
+        self, stats: Dict[str, Any], stream_id: Optional[str] = None
+    ):
+        """Update the audio input queue metrics of a stream.
+
+        Args:
+            stats: The audio input queue stats.
+            stream_id: The ID of the stream.
+        """
+        if not self._enabled:
+            return
+        gauges = [
+            (self._audio_queued_gauge, stats["queued_ms"]),
+            (self._audio_dropped_samples_gauge, stats["dropped_samples"]),
+            (self._audio_stretched_samples_gauge, stats["stretched_samples"]),
+        ]
+        for gauge, value in gauges:
+            if self._include_stream_id:
+                gauge.labels(stream_id=stream_id or "").set(value)
+            else:
+                gauge.set(value)
+
+    def update_prompt_update_metrics(
+        self, stats: Dict[str, int], stream_id: Optional[str] = None
+    ):
+        """Update how the prompt updates of a stream were applied.
+
+        Args:
+            stats: The prompt update counters per kind.
+            stream_id: The ID of the stream.
+        """
+        if not self._enabled:
+            return
+        base = (stream_id or "",) if self._include_stream_id else ()
+        for kind, count in stats.items():
+            self._prompt_updates_gauge.labels(*base, kind).set(count)
+
+    def update_output_jitter_metrics(
+        self, jitter_ms: float, stream_id: Optional[str] = None
+    ):
+        """Update the output frame interval jitter of a paced stream.
+
+        Args:
+            jitter_ms: Smoothed deviation of the output intervals from the target.
+            stream_id: The ID of the stream.
+        """
+        if self._enabled:
+            if self._include_stream_id:
+                self._output_jitter_gauge.labels(stream_id=stream_id or "").set(jitter_ms)
+            else:
+                self._output_jitter_gauge.set(jitter_ms)
+
+    def update_node_timing_metrics(
+        self, timings: Dict[int, Dict[str, Dict[str, Any]]], stream_id: Optional[str] = None
+    ):
+        """Update the per-node execution time percentiles of a stream.
+
+        Series of nodes the stream no longer reports are removed. Without the stream
+        ID label streams running the same prompt share series, the last update wins.
+
+        Args:
+            timings: The node timings per prompt index and node id.
+            stream_id: The ID of the stream.
+        """
+        if not self._enabled:
+            return
+        base = (stream_id or "",) if self._include_stream_id else ()
+        series = set()
+        for prompt_index, nodes in timings.items():
+            for node_id, stats in nodes.items():
+                for quantile in ("p50", "p95"):
+                    labels = base + (str(prompt_index), node_id, stats["class_type"], quantile)
+                    series.add(labels)
+                    self._node_wall_time_gauge.labels(*labels).set(stats[f"wall_ms_{quantile}"])
+                    self._node_cpu_time_gauge.labels(*labels).set(stats[f"cpu_ms_{quantile}"])
+        previous = self._node_series.get(stream_id or "", set())
+        self._node_series[stream_id or ""] = series
+        self._remove_node_series(previous - series)
+
+    def _remove_node_series(self, series: Set[Tuple[str, ...]]):
+        # Without the stream ID label other streams may still report the same series
+        reported = set().union(*self._node_series.values())
+        for labels in series - reported:
+            for gauge in (self._node_wall_time_gauge, self._node_cpu_time_gauge):
+                try:
+                    gauge.remove(*labels)
+                except KeyError:
+                    pass
+
+    def remove_stream_metrics(self, stream_id: Optional[str] = None):
+        """Remove the series of an ended stream.
+
+        Args:
+            stream_id: The ID of the stream.
+        """
+        self._remove_node_series(self._node_series.pop(stream_id or "", set()))
+        if not self._include_stream_id:
+            return
+        for gauge in (
+            self._fps_gauge,
+            self._loop_time_saved_gauge,
+            self._latency_gauge,
+            self._skipped_frames_gauge,
+            self._output_jitter_gauge,
+            self._audio_queued_gauge,
+            self._audio_dropped_samples_gauge,
+            self._audio_stretched_samples_gauge,
+        ):
+            try:
+                gauge.remove(stream_id or "")
+            except KeyError:
+                pass
+        for kind in ("incremental", "full", "superseded"):
+            try:
+                self._prompt_updates_gauge.remove(stream_id or "", kind)
+            except KeyError:
+                pass
+
     async def metrics_handler(self, _):
         """Handle Prometheus metrics endpoint."""
         return web.Response(body=generate_latest(), content_type="text/plain")
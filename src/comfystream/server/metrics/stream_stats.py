@@ -26,13 +26,26 @@ class StreamStatsManager:
             video_track: The video stream track instance.
 
         Returns:
-            A dictionary containing FPS-related statistics.
+            A dictionary containing FPS-related statistics, the input queue
+            eviction counters, the audio input queue counters, the event loop time
+            saved by offloading and the latency controller decisions, the output
+            pacing jitter, how prompt updates were applied and the node execution
+            times.
         """
         return {
             "timestamp": await video_track.fps_meter.last_fps_calculation_time,
             "fps": await video_track.fps_meter.fps,
             "minute_avg_fps": await video_track.fps_meter.average_fps,
             "minute_fps_array": await video_track.fps_meter.fps_measurements,
+            "input_queue": video_track.pipeline.get_video_input_stats(),
+            "audio_input_queue": video_track.pipeline.get_audio_input_stats(),
+            "offload": video_track.pipeline.get_offload_stats(),
+            "reorder": video_track.pipeline.get_reorder_stats(),
+            "stages": video_track.pipeline.get_stage_stats(),
+            "latency_controller": video_track.pipeline.get_latency_stats(),
+            "output_pacing": video_track.pacer.stats() if video_track.pacer else {},
+            "prompt_updates": video_track.pipeline.get_prompt_update_stats(),
+            "node_timings": video_track.pipeline.get_node_timings(),
         }
 
     async def collect_all_stream_metrics(self, _) -> web.Response:
@@ -0,0 +1,259 @@
+"""Fixed-slot ring of video frames in shared memory.
+
+The ring lets a producer process (the WebRTC server) hand decoded frames to a
+consumer process (an inference worker) without pickling or copying them through a
+pipe. It is single-producer/single-consumer: the producer owns the write sequence,
+the consumer owns the read sequence, and a slot is only reused after the consumer
+released it, so a frame view handed out by ``acquire`` stays valid until
+``release``.
+
+The ring has no wakeup of its own and never waits: the producer announces every
+written frame through a pipe or socket the consumer blocks on, and the consumer
+acquires the frame once it is announced.
+"""
+
+from fractions import Fraction
+from multiprocessing import shared_memory
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+MAGIC = 0x434D5352  # "CMSR"
+VERSION = 1
+
+DTYPES = {0: np.dtype(np.uint8), 1: np.dtype(np.float32)}
+DTYPE_CODES = {dtype: code for code, dtype in DTYPES.items()}
+
+# Control block layout, one int64 per field
+_MAGIC, _VERSION, _SLOT_COUNT, _HEIGHT, _WIDTH, _CHANNELS, _DTYPE, _WRITE_SEQ, _READ_SEQ = range(9)
+CONTROL_SIZE = 128
+
+SLOT_HEADER_DTYPE = np.dtype(
+    [
+        ("seq", "<i8"),
+        ("pts", "<i8"),
+        ("time_base_num", "<i4"),
+        ("time_base_den", "<i4"),
+        ("height", "<i4"),
+        ("width", "<i4"),
+        ("session_id", "S64"),
+    ]
+)
+
+ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class RingSlot(NamedTuple):
+    seq: int
+    pts: Optional[int]
+    time_base: Optional[Fraction]
+    session_id: str
+    frame: np.ndarray
+
+
+class SharedFrameRing:
+    """Single-producer/single-consumer ring of HxWxC frame slots in shared memory."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+
+        self._control = np.ndarray((CONTROL_SIZE // 8,), dtype=np.int64, buffer=shm.buf)
+        if self._control[_MAGIC] != MAGIC or self._control[_VERSION] != VERSION:
+            raise ValueError(f"Shared memory {shm.name} does not hold a frame ring")
+
+        self.slot_count = int(self._control[_SLOT_COUNT])
+        self.height = int(self._control[_HEIGHT])
+        self.width = int(self._control[_WIDTH])
+        self.channels = int(self._control[_CHANNELS])
+        self.dtype = DTYPES[int(self._control[_DTYPE])]
+
+        self._headers = np.ndarray(
+            (self.slot_count,), dtype=SLOT_HEADER_DTYPE, buffer=shm.buf, offset=CONTROL_SIZE
+        )
+        data_offset = _align(CONTROL_SIZE + SLOT_HEADER_DTYPE.itemsize * self.slot_count)
+        self._slots = np.ndarray(
+            (self.slot_count, self.height, self.width, self.channels),
+            dtype=self.dtype,
+            buffer=shm.buf,
+            offset=data_offset,
+        )
+
+        self.written = 0
+        self.dropped = 0
+        self.skipped = 0
+
+    @staticmethod
+    def required_size(
+        slot_count: int, height: int, width: int, channels: int = 3, dtype=np.uint8
+    ) -> int:
+        """Return the size in bytes of a ring with the given geometry."""
+        data_offset = _align(CONTROL_SIZE + SLOT_HEADER_DTYPE.itemsize * slot_count)
+        return data_offset + slot_count * height * width * channels * np.dtype(dtype).itemsize
+
+    @classmethod
+    def create(
+        cls,
+        slot_count: int = 4,
+        height: int = 512,
+        width: int = 512,
+        channels: int = 3,
+        dtype=np.uint8,
+        name: Optional[str] = None,
+    ) -> "SharedFrameRing":
+        """Allocate a new ring. The creator is responsible for unlinking it.
+
+        Args:
+            slot_count: Number of frame slots.
+            height: Maximum frame height.
+            width: Maximum frame width.
+            channels: Number of channels per pixel.
+            dtype: Pixel type, uint8 (rgb24) or float32.
+            name: Name of the shared memory block, generated if None.
+        """
+        dtype = np.dtype(dtype)
+        if dtype not in DTYPE_CODES:
+            raise ValueError(f"Unsupported frame dtype {dtype}")
+        if slot_count < 2:
+            raise ValueError("slot_count must be at least 2")
+
+        size = cls.required_size(slot_count, height, width, channels, dtype)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        control = np.ndarray((CONTROL_SIZE // 8,), dtype=np.int64, buffer=shm.buf)
+        control[:] = 0
+        control[_SLOT_COUNT] = slot_count
+        control[_HEIGHT] = height
+        control[_WIDTH] = width
+        control[_CHANNELS] = channels
+        control[_DTYPE] = DTYPE_CODES[dtype]
+        control[_VERSION] = VERSION
+        control[_MAGIC] = MAGIC
+        del control
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedFrameRing":
+        """Attach to a ring created by another process.
+
+        The attaching process should be started through ``multiprocessing`` so that
+        it shares the creator's resource tracker and does not unlink the block on exit.
+        """
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __len__(self) -> int:
+        return int(self._control[_WRITE_SEQ] - self._control[_READ_SEQ])
+
+    def write(
+        self,
+        frame: np.ndarray,
+        pts: Optional[int] = None,
+        time_base: Optional[Fraction] = None,
+        session_id: str = "",
+    ) -> Optional[int]:
+        """Copy a HxWxC frame into the next free slot.
+
+        Args:
+            frame: The frame, at most as large as the ring slots.
+            pts: Presentation timestamp of the frame.
+            time_base: Time base of the pts.
+            session_id: Session the frame belongs to.
+
+        Returns:
+            The sequence number of the frame, or None if the ring is full and the
+            frame was dropped.
+        """
+        height, width = frame.shape[0], frame.shape[1]
+        if height > self.height or width > self.width or frame.shape[2] != self.channels:
+            raise ValueError(
+                f"Frame of shape {frame.shape} does not fit in ring slots of "
+                f"{self.height}x{self.width}x{self.channels}"
+            )
+
+        seq = int(self._control[_WRITE_SEQ])
+        if seq - int(self._control[_READ_SEQ]) >= self.slot_count:
+            self.dropped += 1
+            return None
+
+        idx = seq % self.slot_count
+        np.copyto(self._slots[idx, :height, :width], frame, casting="unsafe")
+        header = self._headers[idx]
+        header["pts"] = -1 if pts is None else pts
+        header["time_base_num"] = time_base.numerator if time_base is not None else 0
+        header["time_base_den"] = time_base.denominator if time_base is not None else 0
+        header["height"] = height
+        header["width"] = width
+        header["session_id"] = session_id.encode()[:64]
+        header["seq"] = seq
+
+        # Publish the slot only after its data and header are written
+        self._control[_WRITE_SEQ] = seq + 1
+        self.written += 1
+        return seq
+
+    def acquire(self, latest: bool = False) -> Optional[RingSlot]:
+        """Return a zero-copy view of the next frame without waiting.
+
+        The view stays valid until the slot is passed to ``release``.
+
+        Args:
+            latest: Skip to the newest frame, releasing older unread frames.
+
+        Returns:
+            The slot, or None if no frame is unread.
+        """
+        read_seq = int(self._control[_READ_SEQ])
+        write_seq = int(self._control[_WRITE_SEQ])
+        if write_seq <= read_seq:
+            return None
+
+        if latest and write_seq - read_seq > 1:
+            self.skipped += write_seq - 1 - read_seq
+            read_seq = write_seq - 1
+            self._control[_READ_SEQ] = read_seq
+
+        idx = read_seq % self.slot_count
+        header = self._headers[idx]
+        height, width = int(header["height"]), int(header["width"])
+        time_base = None
+        if header["time_base_den"]:
+            time_base = Fraction(int(header["time_base_num"]), int(header["time_base_den"]))
+        return RingSlot(
+            seq=int(header["seq"]),
+            pts=None if header["pts"] < 0 else int(header["pts"]),
+            time_base=time_base,
+            session_id=bytes(header["session_id"]).decode(),
+            frame=self._slots[idx, :height, :width],
+        )
+
+    def release(self, slot: RingSlot):
+        """Hand a slot back to the producer."""
+        if int(self._control[_READ_SEQ]) == slot.seq:
+            self._control[_READ_SEQ] = slot.seq + 1
+
+    def stats(self):
+        """Return the producer and consumer counters of this end of the ring."""
+        return {
+            "queued_frames": len(self),
+            "written_frames": self.written,
+            "dropped_frames": self.dropped,
+            "skipped_frames": self.skipped,
+        }
+
+    def close(self):
+        """Detach from the ring, unlinking it if this end created it."""
+        # Views into the buffer must be released before the mapping can be closed
+        del self._control, self._headers, self._slots
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -1,14 +1,118 @@
-import torch
-import numpy as np
+from collections import deque
+from threading import Lock, local
+from types import SimpleNamespace
 
-from queue import Queue
-from asyncio import Queue as AsyncQueue
+from typing import Any, Dict, List, Optional
 
-from typing import Union
+from comfystream.audio_queue import AudioQueue
+from comfystream.eviction import FrameQueue
+from comfystream.output_queue import OutputQueue
+from comfystream.reorder_buffer import ReorderBuffer
 
-# TODO: improve eviction policy fifo might not be the best, skip alternate frames instead
-image_inputs: Queue[Union[torch.Tensor, np.ndarray]] = Queue(maxsize=1)
-image_outputs: AsyncQueue[Union[torch.Tensor, np.ndarray]] = AsyncQueue()
+DEFAULT_SESSION_ID = "default"
 
-audio_inputs: Queue[Union[torch.Tensor, np.ndarray]] = Queue()
-audio_outputs: AsyncQueue[Union[torch.Tensor, np.ndarray]] = AsyncQueue()
+# Run durations kept per session for the stage latency stats
+RUN_TIMES_CAPACITY = 128
+
+# A run executes on one worker thread, so LoadTensor hands the channels, ticket,
+# sequence ids and traces of its frames to the run's SaveTensor through a thread local
+runs = local()
+
+
+class ChainedFrame:
+    """Output of a chained stage, queued as an input frame of the next stage."""
+
+    __slots__ = ("side_data",)
+
+    def __init__(self, input: Any, seq: Optional[int], trace: Any):
+        self.side_data = SimpleNamespace(input=input, seq=seq, trace=trace, skipped=True)
+
+
+class SessionChannels:
+    """Input and output queues for a single stream session.
+
+    Each session gets its own set of queues so that several streams can be served by
+    the same ComfyUI process without their frames being interleaved.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+
+        # Eviction of stale frames and batching are configured by the client
+        self.image_inputs: FrameQueue = FrameQueue()
+        # Written by ComfyUI worker threads, awaited on the server's event loop
+        self.image_outputs: OutputQueue = OutputQueue()
+        # Taking frames and a ticket is atomic so tickets follow the frame order
+        self.take_lock = Lock()
+        # Outputs of concurrent runs reading from this session leave in ticket order
+        self.reorder = ReorderBuffer()
+        # Durations of the runs reading from this session, in seconds
+        self.run_times = deque(maxlen=RUN_TIMES_CAPACITY)
+        # Set on the channels linking chained stages, SaveTensor then queues its
+        # outputs as input frames of the next stage instead of as outputs
+        self.chained = False
+        # NodeTimings of the prompts reading this session, set when node timing is enabled
+        self.node_timings = None
+
+        # Bounded by the audio budget configured by the client
+        self.audio_inputs: AudioQueue = AudioQueue()
+        # Buffered windows of LoadAudioTensor, concurrent runs of the session take
+        # them one at a time under the lock
+        self.audio_buffer = None
+        self.audio_lock = Lock()
+        self.audio_outputs: OutputQueue = OutputQueue()
+
+
+_sessions: Dict[str, SessionChannels] = {}
+_sessions_lock = Lock()
+
+
+def get_session(session_id: Optional[str] = None) -> SessionChannels:
+    """Get the channels of a session, creating them if the session is unknown.
+
+    Args:
+        session_id: The session to look up. Defaults to the default session.
+
+    Returns:
+        The channels of the session.
+    """
+    session_id = session_id or DEFAULT_SESSION_ID
+    channels = _sessions.get(session_id)
+    if channels is None:
+        with _sessions_lock:
+            channels = _sessions.get(session_id)
+            if channels is None:
+                channels = SessionChannels(session_id)
+                _sessions[session_id] = channels
+    return channels
+
+
+def find_session(session_id: str) -> Optional[SessionChannels]:
+    """Get the channels of a session without creating them, None if it is unknown."""
+    return _sessions.get(session_id)
+
+
+def remove_session(session_id: str):
+    """Forget the channels of a session. The default session is never removed.
+
+    Args:
+        session_id: The session to remove.
+    """
+    if session_id == DEFAULT_SESSION_ID:
+        return
+    with _sessions_lock:
+        _sessions.pop(session_id, None)
+
+
+def list_sessions() -> List[str]:
+    """Return the ids of all registered sessions."""
+    return list(_sessions.keys())
+
+
+# Channels of the default session, kept for single-stream callers.
+_default_session = get_session(DEFAULT_SESSION_ID)
+image_inputs = _default_session.image_inputs
+image_outputs = _default_session.image_outputs
+
+audio_inputs = _default_session.audio_inputs
+audio_outputs = _default_session.audio_outputs
@@ -0,0 +1,149 @@
+"""Per-frame lifecycle tracing exported as Chrome trace events.
+
+A trace is attached to a frame when it is received and each stage of the pipeline
+marks the time at which it finished with the frame. Completed traces are kept in a
+ring buffer and can be exported in the Chrome trace-event format, which can be
+opened in ``chrome://tracing`` or https://ui.perfetto.dev.
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+DEFAULT_CAPACITY = 2048
+
+
+class FrameTrace:
+    """Timestamps of the stages a single frame went through."""
+
+    __slots__ = ("frame_id", "session_id", "pts", "marks", "dropped")
+
+    def __init__(self, frame_id: int, session_id: str, pts: Optional[int]):
+        self.frame_id = frame_id
+        self.session_id = session_id
+        self.pts = pts
+        self.marks: List[Tuple[str, int, int]] = []
+        self.dropped = False
+
+    def mark(self, stage: str):
+        """Record that the frame finished the given stage."""
+        self.marks.append((stage, time.perf_counter_ns(), threading.get_ident()))
+
+
+class FrameTracer:
+    """Creates frame traces and buffers completed ones in a ring."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.enabled = False
+        self._traces: Deque[FrameTrace] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._frame_ids = itertools.count()
+
+    def enable(self, capacity: Optional[int] = None):
+        """Start tracing frames.
+
+        Args:
+            capacity: Number of completed traces to keep, the oldest are discarded.
+        """
+        with self._lock:
+            if capacity is not None:
+                self._traces = deque(self._traces, maxlen=capacity)
+            self.enabled = True
+
+    def disable(self):
+        """Stop tracing new frames."""
+        self.enabled = False
+
+    def start(self, frame: Any, session_id: str, stage: str = "receive") -> Optional[FrameTrace]:
+        """Attach a new trace to a frame if tracing is enabled.
+
+        Args:
+            frame: The received frame, the trace is stored in ``side_data.trace``.
+            session_id: The session the frame belongs to.
+            stage: The name of the first mark.
+
+        Returns:
+            The trace, or None if tracing is disabled.
+        """
+        if not self.enabled:
+            return None
+        trace = FrameTrace(next(self._frame_ids), session_id, getattr(frame, "pts", None))
+        trace.mark(stage)
+        frame.side_data.trace = trace
+        return trace
+
+    def finish(self, trace: Optional[FrameTrace], dropped: bool = False):
+        """Store a completed trace in the ring."""
+        if trace is None:
+            return
+        trace.dropped = dropped
+        with self._lock:
+            self._traces.append(trace)
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Export the buffered traces as Chrome trace-event JSON.
+
+        Every frame becomes an async track with one span for the whole frame and one
+        span per stage, named after the stage that ended at each mark.
+        """
+        with self._lock:
+            traces = list(self._traces)
+
+        pid = os.getpid()
+        events = []
+        for trace in traces:
+            if len(trace.marks) < 2:
+                continue
+            args = {
+                "session_id": trace.session_id,
+                "pts": trace.pts,
+                "dropped": trace.dropped,
+            }
+            first_ts, last_ts = trace.marks[0][1], trace.marks[-1][1]
+            events.append(_async_event("frame", "b", first_ts, pid, trace.marks[0][2], trace.frame_id, args))
+            for (_, start_ts, _), (stage, end_ts, tid) in zip(trace.marks, trace.marks[1:]):
+                events.append(_async_event(stage, "b", start_ts, pid, tid, trace.frame_id))
+                events.append(_async_event(stage, "e", end_ts, pid, tid, trace.frame_id))
+            events.append(_async_event("frame", "e", last_ts, pid, trace.marks[-1][2], trace.frame_id))
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _async_event(
+    name: str, phase: str, ts_ns: int, pid: int, tid: int, frame_id: int, args: Optional[Dict] = None
+) -> Dict[str, Any]:
+    event = {
+        "name": name,
+        "cat": "frame",
+        "ph": phase,
+        "ts": ts_ns / 1000,
+        "pid": pid,
+        "tid": tid,
+        "id": frame_id,
+    }
+    if args is not None:
+        event["args"] = args
+    return event
+
+
+def get_trace(frame: Any) -> Optional[FrameTrace]:
+    """Return the trace attached to a frame, if any."""
+    return getattr(frame.side_data, "trace", None)
+
+
+def mark(frame: Any, stage: str):
+    """Mark a stage on the trace attached to a frame, if any."""
+    trace = getattr(frame.side_data, "trace", None)
+    if trace is not None:
+        trace.mark(stage)
+
+
+# Process-wide tracer shared by the pipeline, the tensor nodes and the server
+tracer = FrameTracer()
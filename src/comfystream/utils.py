@@ -1,9 +1,13 @@
 import copy
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from comfy.api.components.schema.prompt import Prompt, PromptDictInput
 
 
+# Nodes that read from or write to the tensor_cache and need to know their session
+SESSION_NODE_TYPES = {"LoadTensor", "SaveTensor", "LoadAudioTensor", "SaveAudioTensor"}
+
+
 def create_load_tensor_node():
     return {
         "inputs": {},
@@ -20,7 +24,13 @@ def create_save_tensor_node(inputs: Dict[Any, Any]):
     }
 
 
-def convert_prompt(prompt: PromptDictInput) -> Prompt:
+def convert_prompt(
+    prompt: PromptDictInput,
+    session_id: Optional[str] = None,
+    input_session_id: Optional[str] = None,
+    output_session_id: Optional[str] = None,
+    require_input: bool = True,
+) -> Prompt:
     # Validate the schema
     Prompt.validate(prompt)
 
@@ -64,7 +74,8 @@ def convert_prompt(prompt: PromptDictInput) -> Prompt:
     if num_outputs > 1:
         raise Exception("too many outputs in prompt")
 
-    if num_primary_inputs + num_inputs == 0:
+    # Generative prompts produce frames without reading any input
+    if require_input and num_primary_inputs + num_inputs == 0:
         raise Exception("missing input")
 
     if num_outputs == 0:
@@ -81,6 +92,21 @@ def convert_prompt(prompt: PromptDictInput) -> Prompt:
         node = prompt[key]
         prompt[key] = create_save_tensor_node(node["inputs"])
 
+    # Route tensor nodes to the channels of the given session, the video nodes of a
+    # chained stage read from and write to the channels linking it to its neighbours
+    node_session_ids = {
+        "LoadTensor": input_session_id or session_id,
+        "SaveTensor": output_session_id or session_id,
+        "LoadAudioTensor": session_id,
+        "SaveAudioTensor": session_id,
+    }
+    for node in prompt.values():
+        if node.get("class_type") not in SESSION_NODE_TYPES:
+            continue
+        node_session_id = node_session_ids[node["class_type"]]
+        if node_session_id is not None:
+            node["inputs"] = {**node.get("inputs", {}), "session_id": node_session_id}
+
     # Validate the processed prompt input
     prompt = Prompt.validate(prompt)
 
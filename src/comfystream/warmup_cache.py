@@ -0,0 +1,74 @@
+"""Record of the prompt and input shape combinations that are already warm."""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 64
+
+WarmupKey = Tuple[str, str, Tuple[int, ...], str]
+
+
+def hash_prompts(prompts: List[Dict[Any, Any]], chain: bool = False) -> str:
+    """Return a stable hash of prompts as sent by the client, before conversion.
+
+    The unconverted prompts are hashed so the same workflow hashes the same in every
+    session, the converted ones carry the session id. Chained prompts hash
+    differently from the same prompts run side by side.
+    """
+    payload = {"chain": True, "prompts": prompts} if chain else prompts
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class WarmupCache:
+    """LRU set of warmup keys whose warmup completed on a ComfyUI client.
+
+    A key combines the prompt hash, the media kind, the input shape and the input
+    dtype. Share one cache between all pipelines that share an embedded client, the
+    models and compiled kernels it tracks live in that client. The cache does not
+    notice when ComfyUI unloads a model, the shortened warmup then loads it again.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[WarmupKey, None]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(prompt_hash: str, kind: str, shape: Tuple[int, ...], dtype: str) -> WarmupKey:
+        return (prompt_hash, kind, tuple(shape), dtype)
+
+    def is_warm(self, key: Optional[WarmupKey]) -> bool:
+        """Return whether the warmup of key completed before, counting hits and misses."""
+        if key is not None and key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def mark_warm(self, key: Optional[WarmupKey]):
+        """Record that the warmup of key completed."""
+        if key is None:
+            return
+        self._entries[key] = None
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, prompt_hash: Optional[str] = None):
+        """Forget the keys of one prompt, or all keys if no prompt hash is given."""
+        if prompt_hash is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == prompt_hash]:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+
+class FakeClock:
+    """Clock whose sleeps return at once and advance the time they waited for."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+        # Let tasks waiting for the new time, e.g. a pull task, run
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def fake_clock():
+    return FakeClock()
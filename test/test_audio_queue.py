@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from types import SimpleNamespace
+
+from comfystream.audio_queue import AudioQueue, time_stretch
+
+
+def make_frame(value: int, samples: int = 960, sample_rate: int = 48000):
+    return SimpleNamespace(
+        sample_rate=sample_rate,
+        side_data=SimpleNamespace(input=np.full(samples, value, dtype=np.int16)),
+    )
+
+
+def test_drop_oldest_enforces_duration_budget():
+    queue = AudioQueue(policy="drop_oldest", max_duration_ms=40.0)
+    for i in range(5):
+        queue.put(make_frame(i))
+
+    stats = queue.stats()
+    assert stats["queued_frames"] == 2
+    assert stats["dropped_frames"] == 3
+    assert queue.get(block=False).side_data.input[0] == 3
+
+
+def test_time_stretch_compresses_backlog():
+    queue = AudioQueue(policy="time_stretch", max_duration_ms=40.0)
+    for i in range(3):
+        queue.put(make_frame(i))
+
+    stats = queue.stats()
+    assert stats["dropped_frames"] == 0
+    assert stats["stretched_samples"] > 0
+    assert stats["queued_ms"] <= 40.0
+
+
+def test_time_stretch_keeps_the_pitch():
+    sample_rate = 48000
+    tone = np.sin(2 * np.pi * 440 * np.arange(sample_rate) / sample_rate)
+    samples = (tone * 10000).astype(np.int16)
+
+    stretched = time_stretch(samples, sample_rate * 2 // 3, frame_length=960)
+
+    assert stretched.shape[0] == sample_rate * 2 // 3
+    assert stretched.dtype == np.int16
+    spectrum = np.abs(np.fft.rfft(stretched))
+    peak_hz = np.argmax(spectrum) * sample_rate / stretched.shape[0]
+    assert abs(peak_hz - 440) < 5
+
+
+def test_drop_oldest_counts_dropped_samples():
+    queue = AudioQueue(policy="drop_oldest", max_duration_ms=40.0)
+    for i in range(5):
+        queue.put(make_frame(i))
+
+    assert queue.stats()["dropped_samples"] == 3 * 960
+
+
+def test_each_window_is_reserved_once():
+    queue = AudioQueue()
+    assert not queue.try_reserve(40.0)
+
+    queue.put(make_frame(0))
+    assert not queue.try_reserve(40.0)
+    queue.put(make_frame(1))
+    assert queue.try_reserve(40.0)
+    assert not queue.try_reserve(40.0)
+
+    queue.get(block=False)
+    queue.get(block=False)
+    queue.window_taken(buffered=0)
+    queue.put(make_frame(2))
+    queue.put(make_frame(3))
+    assert queue.try_reserve(40.0)
+
+
+def test_drop_oldest_spares_reserved_samples():
+    queue = AudioQueue(policy="drop_oldest", max_duration_ms=40.0)
+    queue.put(make_frame(0))
+    queue.put(make_frame(1))
+    assert queue.try_reserve(40.0)
+
+    # Dropping the oldest frame would leave the reserved window short
+    queue.put(make_frame(2, samples=1))
+
+    assert queue.stats()["dropped_frames"] == 0
+    assert queue.get(block=False).side_data.input[0] == 0
+
+
+def test_window_over_the_budget_is_reserved_when_the_queue_is_full():
+    queue = AudioQueue(policy="drop_oldest", max_duration_ms=40.0)
+    queue.put(make_frame(0))
+    queue.put(make_frame(1))
+
+    assert queue.try_reserve(500.0)
+
+
+def test_backpressure_wakes_the_producer_when_frames_are_taken():
+    async def run():
+        queue = AudioQueue(policy="backpressure", max_duration_ms=20.0)
+        queue.put(make_frame(0))
+        queue.put(make_frame(1))
+        assert not await queue.wait_for_space(timeout=0.01, frame=make_frame(2))
+
+        threading.Timer(0.02, queue.get).start()
+        assert await asyncio.wait_for(
+            queue.wait_for_space(timeout=5.0, frame=make_frame(2)), timeout=1.0
+        )
+
+    asyncio.run(run())
+
+
+def test_byte_budget_applies_to_every_policy():
+    queue = AudioQueue(policy="backpressure", max_duration_ms=10_000.0, max_bytes=4000)
+    for i in range(4):
+        queue.put(make_frame(i))
+
+    stats = queue.stats()
+    assert stats["queued_bytes"] <= 4000
+    assert stats["dropped_frames"] == 2
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        AudioQueue(policy="block")
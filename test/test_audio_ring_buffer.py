@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from comfystream.audio_ring_buffer import AudioRingBuffer
+
+
+def test_reads_across_wraparound_are_contiguous_views():
+    ring = AudioRingBuffer(capacity=8)
+    ring.write(np.arange(6, dtype=np.int16))
+    ring.consume(5)
+    ring.write(np.arange(6, 12, dtype=np.int16))
+
+    view = ring.peek(7)
+
+    np.testing.assert_array_equal(view, np.arange(5, 12))
+    assert not view.flags.owndata
+
+
+def test_overlapping_windows():
+    ring = AudioRingBuffer(capacity=16)
+    ring.write(np.arange(10, dtype=np.int16))
+
+    windows = []
+    while len(ring) >= 4:
+        windows.append(ring.peek(4).tolist())
+        ring.consume(2)
+
+    assert windows == [[0, 1, 2, 3], [2, 3, 4, 5], [4, 5, 6, 7], [6, 7, 8, 9]]
+
+
+def test_overflow_drops_oldest_samples():
+    ring = AudioRingBuffer(capacity=4)
+    ring.write(np.arange(3, dtype=np.int16))
+    ring.write(np.arange(3, 6, dtype=np.int16))
+
+    assert ring.dropped_samples == 2
+    np.testing.assert_array_equal(ring.read(4), [2, 3, 4, 5])
+    with pytest.raises(ValueError):
+        ring.peek(1)
@@ -0,0 +1,75 @@
+import numpy as np
+import torch
+
+from comfystream.buffer_pool import InputBufferPool, OutputBuffers
+
+
+def test_released_buffers_are_reused():
+    pool = InputBufferPool()
+    first = pool.acquire((4, 4, 3))
+    second = pool.acquire((4, 4, 3))
+    assert first.dtype == np.float32
+    assert pool.allocations == 2
+
+    pool.release(first.ctypes.data)
+    assert pool.acquire((4, 4, 3)) is first
+    assert pool.allocations == 2
+
+    # Unknown and missing pointers are ignored
+    pool.release(None)
+    pool.release(12345)
+    pool.release(second.ctypes.data)
+    pool.release(second.ctypes.data)
+    assert pool.acquire((4, 4, 3)) is second
+    assert pool.acquire((4, 4, 3)) is not second
+
+
+def test_resolution_change_discards_the_free_buffers():
+    pool = InputBufferPool()
+    small = pool.acquire((4, 4, 3))
+    pool.release(small.ctypes.data)
+
+    large = pool.acquire((8, 8, 3))
+    assert large.shape == (8, 8, 3)
+    assert pool.allocations == 2
+
+    # A buffer of the old resolution released late is not pooled
+    stale = pool.acquire((4, 4, 3))
+    pool.acquire((8, 8, 3))
+    pool.release(stale.ctypes.data)
+    assert pool.acquire((8, 8, 3)).shape == (8, 8, 3)
+    assert pool.allocations == 5
+
+
+def test_free_buffers_are_bounded():
+    pool = InputBufferPool(max_free_buffers=1)
+    buffers = [pool.acquire((2, 2, 3)) for _ in range(3)]
+    for buffer in buffers:
+        pool.release(buffer.ctypes.data)
+
+    pool.acquire((2, 2, 3))
+    pool.acquire((2, 2, 3))
+    assert pool.allocations == 4
+
+
+def test_outputs_are_quantized_into_reused_buffers():
+    buffers = OutputBuffers()
+    output = torch.tensor([[[0.0, 0.5, 1.0], [-0.5, 2.0, 0.25]]])
+
+    converted = buffers.to_uint8(output)
+    assert converted.dtype == np.uint8
+    assert converted.tolist() == [[[0, 127, 255], [0, 255, 63]]]
+
+    buffers.to_uint8(output * 0.5)
+    assert buffers.allocations == 1
+    buffers.to_uint8(torch.zeros(1, 4, 3))
+    assert buffers.allocations == 2
+
+
+def test_quantized_outputs_are_returned_as_is():
+    buffers = OutputBuffers()
+    output = torch.full((2, 2, 3), 7, dtype=torch.uint8)
+
+    converted = buffers.to_uint8(output)
+    assert converted.tolist() == output.numpy().tolist()
+    assert buffers.allocations == 0
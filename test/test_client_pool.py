@@ -0,0 +1,162 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from comfystream.client_pool import LEAST_LOADED, ClientPool
+from comfystream.pipeline import Pipeline
+
+
+class StubClient:
+    """Stands in for a ComfyStreamClient, answers every frame after a fixed delay."""
+
+    def __init__(self, session_id, delay, drop=()):
+        self.session_id = session_id
+        self.batch_size = 1
+        self.prompt_depth = 1
+        self.delay = delay
+        self.drop = set(drop)
+        self.received = []
+        self.outputs = asyncio.Queue()
+        self.prompts = None
+        self._lock = asyncio.Lock()
+
+    async def set_prompts(self, prompts, chain=False):
+        self.prompts = prompts
+
+    def put_video_input(self, frame, protected=False):
+        seq = frame.side_data.seq
+        self.received.append(seq)
+        if seq not in self.drop:
+            asyncio.get_running_loop().create_task(self._run(seq, frame.side_data.input))
+
+    async def _run(self, seq, value):
+        # One frame at a time, like a single executor
+        async with self._lock:
+            await asyncio.sleep(self.delay)
+        self.outputs.put_nowait((seq, value * 10))
+
+    async def get_indexed_video_output(self):
+        return await self.outputs.get()
+
+    async def cleanup(self):
+        pass
+
+
+def make_frame(seq):
+    return SimpleNamespace(side_data=SimpleNamespace(input=seq if seq is not None else -1, seq=seq))
+
+
+async def collect(pool, count):
+    return [await asyncio.wait_for(pool.get_indexed_video_output(), timeout=2) for _ in range(count)]
+
+
+def test_round_robin_outputs_leave_in_sequence_order():
+    async def run():
+        # The second worker is much slower, its outputs arrive after later frames
+        clients = [StubClient("a", 0.001), StubClient("b", 0.02), StubClient("c", 0.005)]
+        pool = ClientPool(clients)
+        await pool.set_prompts([{"prompt": 1}])
+        for seq in range(9):
+            pool.put_video_input(make_frame(seq))
+
+        outputs = await collect(pool, 9)
+
+        assert [seq for seq, _ in outputs] == list(range(9))
+        assert [value for _, value in outputs] == [seq * 10 for seq in range(9)]
+        assert [client.received for client in clients] == [[0, 3, 6], [1, 4, 7], [2, 5, 8]]
+        assert all(client.prompts == [{"prompt": 1}] for client in clients)
+        assert pool.get_reorder_stats()["reordered_runs"] > 0
+        await pool.cleanup()
+
+    asyncio.run(run())
+
+
+def test_least_loaded_prefers_idle_workers():
+    async def run():
+        clients = [StubClient("a", 0.05), StubClient("b", 0.05)]
+        pool = ClientPool(clients, strategy=LEAST_LOADED)
+        await pool.set_prompts([{}])
+        pool.put_video_input(make_frame(0))
+        pool.put_video_input(make_frame(1))
+        await collect(pool, 2)
+
+        # Both workers are idle again, so the next frames are spread across both
+        pool.put_video_input(make_frame(2))
+        pool.put_video_input(make_frame(3))
+        await collect(pool, 2)
+
+        assert sorted(len(client.received) for client in clients) == [2, 2]
+        assert pool.get_reorder_stats()["in_flight_frames"] == [0, 0]
+        await pool.cleanup()
+
+    asyncio.run(run())
+
+
+def test_dropped_frame_is_skipped_once_the_window_is_full():
+    async def run():
+        clients = [StubClient("a", 0.001, drop={0}), StubClient("b", 0.001)]
+        pool = ClientPool(clients, reorder_window=2)
+        await pool.set_prompts([{}])
+        for seq in range(5):
+            pool.put_video_input(make_frame(seq))
+
+        outputs = await collect(pool, 4)
+
+        assert [seq for seq, _ in outputs] == [1, 2, 3, 4]
+        assert pool.get_reorder_stats()["skipped_tickets"] == 1
+        await pool.cleanup()
+
+    asyncio.run(run())
+
+
+def test_frame_dropped_by_a_worker_does_not_hold_back_later_outputs():
+    async def run():
+        clients = [StubClient("a", 0.001, drop={0}), StubClient("b", 0.001)]
+        pool = ClientPool(clients, reorder_window=8)
+        await pool.set_prompts([{}])
+        for seq in range(4):
+            pool.put_video_input(make_frame(seq))
+
+        # Worker "a" answers frame 2, so frame 0 is known to be dropped
+        outputs = await collect(pool, 3)
+
+        assert [seq for seq, _ in outputs] == [1, 2, 3]
+        assert pool.get_reorder_stats()["held_runs"] == 0
+        await pool.cleanup()
+
+    asyncio.run(run())
+
+
+def test_warmup_frames_reach_every_worker_and_return_once():
+    async def run():
+        clients = [StubClient("a", 0.001), StubClient("b", 0.001)]
+        pool = ClientPool(clients)
+        await pool.set_prompts([{}])
+        pool.put_video_input(make_frame(None))
+
+        assert await asyncio.wait_for(pool.get_video_output(), timeout=2) == -10
+        await asyncio.sleep(0.01)
+        assert pool._outputs.empty()
+        assert [client.received for client in clients] == [[None], [None]]
+        await pool.cleanup()
+
+    asyncio.run(run())
+
+
+def test_generative_mode_is_rejected():
+    pool = ClientPool([StubClient("a", 0)])
+
+    pool.run_input = None
+    with pytest.raises(ValueError):
+        pool.run_input = SimpleNamespace()
+
+
+def test_several_workers_require_worker_processes():
+    with pytest.raises(ValueError):
+        Pipeline(workers=2, comfy_client=object())
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        ClientPool([StubClient("a", 0)], strategy="random")
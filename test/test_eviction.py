@@ -0,0 +1,150 @@
+import pytest
+import threading
+import time
+
+from queue import Empty
+from types import SimpleNamespace
+
+from comfystream.eviction import (
+    DeadlinePolicy,
+    FrameQueue,
+    KeyframePolicy,
+    LatestWinsPolicy,
+    QueueClosed,
+    SkipEveryNthPolicy,
+    create_eviction_policy,
+)
+
+
+def test_latest_wins_keeps_newest_frame():
+    queue = FrameQueue(LatestWinsPolicy())
+    for i in range(3):
+        queue.put(i)
+
+    assert queue.get(block=False) == 2
+    assert queue.stats()["dropped_frames"] == 2
+    assert queue.stats()["kept_frames"] == 1
+
+
+def test_skip_every_nth_drops_on_admission():
+    queue = FrameQueue(SkipEveryNthPolicy(n=2, capacity=4))
+    admitted = [queue.put(i) for i in range(4)]
+
+    assert admitted == [True, False, True, False]
+    assert [queue.get(block=False), queue.get(block=False)] == [0, 2]
+
+
+def test_keyframe_policy_retains_keyframe():
+    queue = FrameQueue(KeyframePolicy(capacity=2))
+    queue.put(SimpleNamespace(id=0, key_frame=True))
+    queue.put(SimpleNamespace(id=1, key_frame=False))
+    queue.put(SimpleNamespace(id=2, key_frame=False))
+
+    assert [queue.get(block=False).id, queue.get(block=False).id] == [0, 2]
+
+
+def test_deadline_policy_expires_stale_frames():
+    queue = FrameQueue(DeadlinePolicy(max_age_ms=0.0))
+    queue.put("stale")
+    queue.put("warmup", protected=True)
+
+    assert queue.get(block=False) == "warmup"
+    with pytest.raises(Empty):
+        queue.get(block=False)
+
+
+def test_eviction_spares_protected_frames():
+    queue = FrameQueue(LatestWinsPolicy(capacity=2))
+    queue.put("warmup", protected=True)
+    queue.put(0)
+    queue.put(1)
+
+    assert [queue.get(block=False), queue.get(block=False)] == ["warmup", 1]
+
+
+def test_clear_drops_expired_frames_without_blocking():
+    queue = FrameQueue(DeadlinePolicy(max_age_ms=0.0))
+    queue.put("stale")
+    # Still counted as queued, a blocking get would wait for the next frame
+    assert not queue.empty()
+
+    assert queue.clear() == 1
+    assert queue.empty()
+    assert queue.stats()["dropped_frames"] == 1
+
+
+def test_create_eviction_policy_from_spec():
+    assert isinstance(create_eviction_policy(None), LatestWinsPolicy)
+    assert create_eviction_policy("skip_nth:3").n == 3
+    assert create_eviction_policy("keyframe:4").capacity == 4
+    with pytest.raises(ValueError):
+        create_eviction_policy("fifo")
+
+
+def test_get_batch_stops_at_shape_change():
+    queue = FrameQueue(LatestWinsPolicy())
+    queue.batch_size = 3
+    for shape in [(1, 4), (1, 4), (1, 8)]:
+        queue.put(SimpleNamespace(shape=shape))
+
+    batch = queue.get_batch(key=lambda frame: frame.shape)
+
+    assert [frame.shape for frame in batch] == [(1, 4), (1, 4)]
+    assert queue.get(block=False).shape == (1, 8)
+
+
+def test_put_with_timeout_waits_for_the_consumer():
+    queue = FrameQueue()
+    queue.put("first")
+    threading.Timer(0.02, queue.get).start()
+
+    assert queue.put("second", timeout=1.0)
+
+    assert queue.stats()["dropped_frames"] == 0
+    assert queue.get(block=False) == "second"
+
+
+def test_each_queued_frame_is_reserved_once():
+    queue = FrameQueue(KeyframePolicy(capacity=2))
+    assert not queue.try_reserve()
+
+    queue.put("a")
+    assert queue.try_reserve()
+    assert not queue.try_reserve()
+
+    queue.get(block=False)
+    queue.put("b")
+    assert queue.try_reserve()
+
+
+def test_reserved_frames_do_not_expire():
+    queue = FrameQueue(DeadlinePolicy(max_age_ms=20.0))
+    queue.put("a")
+    queue.put("b")
+    assert queue.try_reserve()
+    time.sleep(0.05)
+
+    assert queue.get(block=False) == "a"
+    with pytest.raises(Empty):
+        queue.get(block=False)
+
+
+def test_get_batch_leaves_reserved_frames_to_other_runs():
+    queue = FrameQueue(KeyframePolicy(capacity=4))
+    queue.batch_size = 2
+    queue.put("a")
+    queue.put("b")
+    assert queue.try_reserve()
+    assert queue.try_reserve()
+
+    assert queue.get_batch() == ["a"]
+    assert queue.get_batch() == ["b"]
+
+
+def test_close_releases_a_blocked_consumer():
+    queue = FrameQueue()
+    threading.Timer(0.02, queue.close).start()
+
+    with pytest.raises(QueueClosed):
+        queue.get(block=True)
+    assert not queue.put("late")
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from comfystream.executor_stage import ExecutorStage
+
+
+def test_concurrent_conversions_return_their_own_results():
+    def convert(value):
+        # Earlier frames take longer, so they finish after later ones
+        time.sleep((5 - value) * 0.005)
+        return value * 10, threading.current_thread().name
+
+    async def run():
+        stage = ExecutorStage(max_workers=4)
+        results = await asyncio.gather(*(stage.run("convert", convert, value) for value in range(5)))
+        stage.shutdown()
+        return results
+
+    results = asyncio.run(run())
+    assert [value for value, _ in results] == [0, 10, 20, 30, 40]
+    assert all(name.startswith("comfystream-frames") for _, name in results)
+
+
+def test_loop_time_saved_is_accounted_per_name():
+    async def run():
+        stage = ExecutorStage()
+        await stage.run("video_preprocess", time.sleep, 0.01)
+        await stage.run("video_preprocess", time.sleep, 0.01)
+        with pytest.raises(ZeroDivisionError):
+            await stage.run("video_postprocess", lambda: 1 / 0)
+        stage.shutdown()
+        return stage.stats()
+
+    stats = asyncio.run(run())
+    assert stats["stages"]["video_preprocess"]["calls"] == 2
+    assert stats["stages"]["video_preprocess"]["seconds"] >= 0.02
+    # Failed conversions are accounted too
+    assert stats["stages"]["video_postprocess"]["calls"] == 1
+    assert stats["loop_time_saved"] == pytest.approx(
+        sum(stage["seconds"] for stage in stats["stages"].values())
+    )
+
+
+def test_shutdown_refuses_new_conversions():
+    async def run():
+        stage = ExecutorStage()
+        assert await stage.run("convert", abs, -1) == 1
+        stage.shutdown()
+        with pytest.raises(RuntimeError):
+            await stage.run("convert", abs, -1)
+
+    asyncio.run(run())
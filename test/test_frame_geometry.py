@@ -0,0 +1,28 @@
+import pytest
+
+from comfystream.frame_geometry import compute_geometry
+
+
+def test_crop_covers_target_and_centers_window():
+    geometry = compute_geometry(1280, 720, 512, 512, "crop")
+
+    assert (geometry.scaled_width, geometry.scaled_height) == (910, 512)
+    assert (geometry.crop_x, geometry.crop_y) == (199, 0)
+
+
+def test_letterbox_fits_target_and_centers_padding():
+    geometry = compute_geometry(1280, 720, 512, 512, "letterbox")
+
+    assert (geometry.scaled_width, geometry.scaled_height) == (512, 288)
+    assert (geometry.pad_x, geometry.pad_y) == (0, 112)
+
+
+def test_identity_geometry():
+    assert compute_geometry(512, 512, 512, 512, "letterbox").is_identity
+    assert compute_geometry(1280, 720, 512, 512, "none").is_identity
+    assert not compute_geometry(1280, 720, 512, 512, "stretch").is_identity
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        compute_geometry(1280, 720, 512, 512, "zoom")
@@ -0,0 +1,38 @@
+from fractions import Fraction
+
+from comfystream.frame_index import FrameIndex, FrameRecord
+
+
+def _record(pts):
+    return FrameRecord(pts=pts, time_base=Fraction(1, 90000))
+
+
+def test_pop_returns_record_and_drops_older_frames():
+    index = FrameIndex()
+    seqs = [index.add(_record(pts))[0] for pts in (0, 3000, 6000, 9000)]
+
+    record, dropped = index.pop(seqs[2])
+
+    assert record.pts == 6000
+    assert [r.pts for r in dropped] == [0, 3000]
+    assert len(index) == 1
+
+
+def test_unknown_sequence_ids_keep_records():
+    index = FrameIndex()
+    index.add(_record(0))
+
+    assert index.pop(None) == (None, [])
+    assert index.pop(42) == (None, [])
+    assert len(index) == 1
+
+
+def test_capacity_evicts_oldest_records():
+    index = FrameIndex(capacity=2)
+    index.add(_record(0))
+    index.add(_record(1))
+
+    seq, evicted = index.add(_record(2))
+
+    assert [r.pts for r in evicted] == [0]
+    assert index.pop(seq)[0].pts == 2
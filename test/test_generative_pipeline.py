@@ -0,0 +1,152 @@
+import asyncio
+
+import numpy as np
+import pytest
+import torch
+
+from comfystream import tensor_cache
+from comfystream.output_pacer import VIDEO_CLOCK_RATE, VIDEO_TIME_BASE
+from comfystream.pipeline import Pipeline
+
+
+GENERATIVE_PROMPT = {
+    "1": {"inputs": {"width": 4, "height": 4}, "class_type": "EmptyImage"},
+    "2": {"inputs": {"images": ["1", 0]}, "class_type": "PreviewImage"},
+}
+
+CONDITIONED_PROMPT = {
+    "1": {"inputs": {"image": "conditioning.png"}, "class_type": "LoadImage"},
+    "2": {"inputs": {"images": ["1", 0]}, "class_type": "PreviewImage"},
+}
+
+
+class GeneratingComfyClient:
+    """Runs prompts the way LoadTensor and SaveTensor would, without ComfyUI.
+
+    A prompt with LoadTensor outputs the frame it takes, one without generates a frame
+    holding the run number. Outputs of the runs in ``drop`` are never produced.
+    """
+
+    def __init__(self, drop=()):
+        self.runs = 0
+        self.drop = set(drop)
+
+    async def queue_prompt(self, prompt):
+        await asyncio.sleep(0)
+        self.runs += 1
+        nodes = {node["class_type"]: node["inputs"] for node in prompt.values()}
+        channels = tensor_cache.get_session(nodes["SaveTensor"]["session_id"])
+        if "LoadTensor" in nodes:
+            image = channels.image_inputs.get(block=False).side_data.input
+        else:
+            image = torch.full((1, 4, 4, 3), self.runs / 255.0)
+        if self.runs not in self.drop:
+            channels.image_outputs.put_nowait((None, image))
+
+
+def make_pipeline(session_id, comfy_client, clock, **kwargs):
+    pipeline = Pipeline(
+        width=4,
+        height=4,
+        generative_fps=100,
+        comfy_client=comfy_client,
+        session_id=session_id,
+        **kwargs,
+    )
+    pipeline._clock, pipeline._sleep = clock, clock.sleep
+    return pipeline
+
+
+async def next_frame(pipeline):
+    return await asyncio.wait_for(pipeline.get_processed_video_frame(), timeout=2)
+
+
+def value(frame):
+    return int(frame.to_ndarray(format="rgb24")[0, 0, 0])
+
+
+def test_generates_frames_on_the_output_clock(fake_clock):
+    async def run():
+        pipeline = make_pipeline("generative-clock", GeneratingComfyClient(), fake_clock)
+        await pipeline.set_prompts(GENERATIVE_PROMPT)
+        frames = [await next_frame(pipeline) for _ in range(3)]
+        await pipeline.cleanup()
+        return frames, fake_clock.sleeps
+
+    frames, sleeps = asyncio.run(run())
+
+    assert [frame.pts for frame in frames] == [0, VIDEO_CLOCK_RATE // 100, 2 * VIDEO_CLOCK_RATE // 100]
+    assert all(frame.time_base == VIDEO_TIME_BASE for frame in frames)
+    assert sleeps == pytest.approx([0.01, 0.01])
+    assert [value(frame) for frame in frames] == [1, 2, 3]
+
+
+def test_restarts_the_clock_instead_of_bursting(fake_clock):
+    async def run():
+        pipeline = make_pipeline("generative-late", GeneratingComfyClient(), fake_clock)
+        await pipeline.set_prompts(GENERATIVE_PROMPT)
+        first = (await next_frame(pipeline)).pts
+        fake_clock.now = 1.0
+        late = (await next_frame(pipeline)).pts
+        after = (await next_frame(pipeline)).pts
+        await pipeline.cleanup()
+        return first, late, after
+
+    first, late, after = asyncio.run(run())
+
+    assert (first, late, after) == (0, VIDEO_CLOCK_RATE, VIDEO_CLOCK_RATE + VIDEO_CLOCK_RATE // 100)
+
+
+def test_runs_ahead_are_bounded_by_unconsumed_outputs(fake_clock):
+    async def run():
+        comfy_client = GeneratingComfyClient()
+        pipeline = make_pipeline("generative-bounded", comfy_client, fake_clock)
+        await pipeline.set_prompts(GENERATIVE_PROMPT)
+        await asyncio.sleep(0.05)
+        runs_before = comfy_client.runs
+        await next_frame(pipeline)
+        await asyncio.sleep(0.05)
+        runs_after = comfy_client.runs
+        await pipeline.cleanup()
+        return runs_before, runs_after
+
+    assert asyncio.run(run()) == (2, 3)
+
+
+def test_runs_without_output_free_their_slot(fake_clock):
+    async def run():
+        pipeline = make_pipeline("generative-dropped", GeneratingComfyClient(drop={1, 2}), fake_clock)
+        await pipeline.set_prompts(GENERATIVE_PROMPT)
+        frames = [await next_frame(pipeline) for _ in range(2)]
+        await pipeline.cleanup()
+        return frames
+
+    assert [value(frame) for frame in asyncio.run(run())] == [3, 4]
+
+
+def test_second_cleanup_does_not_recreate_the_session(fake_clock):
+    async def run():
+        pipeline = make_pipeline("generative-cleanup", GeneratingComfyClient(), fake_clock)
+        await pipeline.set_prompts(GENERATIVE_PROMPT)
+        await next_frame(pipeline)
+        await pipeline.cleanup()
+        assert tensor_cache.find_session("generative-cleanup") is None
+        await pipeline.cleanup()
+        await pipeline.client.cleanup()
+        assert tensor_cache.find_session("generative-cleanup") is None
+
+    asyncio.run(run())
+
+
+def test_every_run_reads_the_conditioning_image(fake_clock):
+    async def run():
+        pipeline = make_pipeline("generative-conditioned", GeneratingComfyClient(), fake_clock)
+        pipeline.set_conditioning_image(np.full((4, 4, 3), 128, dtype=np.uint8))
+        await pipeline.set_prompts(CONDITIONED_PROMPT)
+        frames = [await next_frame(pipeline) for _ in range(3)]
+        with pytest.raises(RuntimeError):
+            await pipeline.put_video_frame(frames[0])
+        await pipeline.cleanup()
+        return frames
+
+    assert [value(frame) for frame in asyncio.run(run())] == [128, 128, 128]
@@ -0,0 +1,57 @@
+import asyncio
+
+from comfystream.idle_unloader import IdleUnloader
+
+
+def make_unloader(idle_timeout=0.05):
+    events = []
+    unloader = IdleUnloader(
+        idle_timeout=idle_timeout,
+        unload=lambda: events.append("unload"),
+        on_unload=lambda: events.append("on_unload"),
+    )
+    return unloader, events
+
+
+def test_models_unload_after_the_last_session_is_idle():
+    async def run():
+        unloader, events = make_unloader()
+        unloader.session_started("a")
+        unloader.session_started("b")
+        unloader.session_ended("a")
+        await asyncio.sleep(0.1)
+        assert events == []
+
+        unloader.session_ended("b")
+        unloader.session_ended("b")
+        await asyncio.sleep(0.1)
+        assert events == ["unload", "on_unload"]
+        assert unloader.stats() == {"active_sessions": 0, "models_loaded": False, "unloads": 1}
+
+    asyncio.run(run())
+
+
+def test_reconnect_within_the_timeout_keeps_models_loaded():
+    async def run():
+        unloader, events = make_unloader()
+        unloader.session_started("a")
+        unloader.session_ended("a")
+        await asyncio.sleep(0.01)
+        unloader.session_started("b")
+        await asyncio.sleep(0.1)
+        assert events == []
+        assert unloader.loaded
+
+    asyncio.run(run())
+
+
+def test_no_timeout_never_unloads():
+    async def run():
+        unloader, events = make_unloader(idle_timeout=0)
+        unloader.session_started("a")
+        unloader.session_ended("a")
+        await asyncio.sleep(0.05)
+        await unloader.close()
+        assert events == []
+
+    asyncio.run(run())
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+from comfystream.audio_queue import AudioQueue
+from comfystream.eviction import FrameQueue, KeyframePolicy
+from comfystream.input_gate import InputGate
+
+
+def test_runs_park_until_a_frame_is_queued():
+    async def run():
+        queue = FrameQueue(KeyframePolicy(capacity=4))
+        gate = InputGate(queue)
+        first = asyncio.create_task(gate.wait())
+        second = asyncio.create_task(gate.wait())
+        await asyncio.sleep(0.01)
+        assert gate.stats()["parked_runs"] == 2
+
+        # Frames arrive from another thread, each wakes exactly one run
+        threading.Thread(target=queue.put, args=("a",)).start()
+        await asyncio.sleep(0.05)
+        assert sum(task.done() for task in (first, second)) == 1
+        assert gate.stats()["parked_runs"] == 1
+
+        queue.put("b")
+        await asyncio.wait_for(asyncio.gather(first, second), timeout=1.0)
+        assert gate.stats()["parked_runs"] == 0
+
+    asyncio.run(run())
+
+
+def test_queued_frame_opens_the_gate_right_away():
+    async def run():
+        queue = FrameQueue()
+        gate = InputGate(queue)
+        queue.put("a")
+        await asyncio.wait_for(gate.wait(), timeout=1.0)
+        assert gate.stats()["wakeups"] == 0
+
+    asyncio.run(run())
+
+
+def test_audio_gate_waits_for_a_full_window():
+    def frame():
+        return SimpleNamespace(
+            sample_rate=48000,
+            side_data=SimpleNamespace(input=np.zeros(960, dtype=np.int16)),
+        )
+
+    async def run():
+        queue = AudioQueue()
+        gate = InputGate(queue, audio_window=(40.0, 0.0))
+        waiter = asyncio.create_task(gate.wait())
+        queue.put(frame())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        queue.put(frame())
+        await asyncio.wait_for(waiter, timeout=1.0)
+
+        # The next run waits for samples that the first run did not reserve
+        second = asyncio.create_task(gate.wait())
+        queue.put(frame())
+        await asyncio.sleep(0.01)
+        assert not second.done()
+        queue.put(frame())
+        await asyncio.wait_for(second, timeout=1.0)
+
+    asyncio.run(run())
@@ -0,0 +1,66 @@
+import pytest
+
+from comfystream.latency_controller import LatencyController
+
+
+def test_admits_every_frame_when_inference_keeps_up():
+    controller = LatencyController(target_latency_ms=100, smoothing=1.0)
+
+    for i in range(10):
+        now = i * 0.033
+        assert controller.admit(now)
+        controller.on_output(now, now + 0.02)
+
+    assert controller.skipped_frames == 0
+    assert controller.stats()["inference_ms"] == pytest.approx(20)
+
+
+def simulate(controller, inference_time, frames=90, fps=30):
+    """Feed frames at fps to a prompt running one frame at a time."""
+    pending = []
+    last_output = 0.0
+    for i in range(frames):
+        now = i / fps
+        while pending and max(pending[0], last_output) + inference_time <= now:
+            received_at = pending.pop(0)
+            last_output = max(received_at, last_output) + inference_time
+            controller.on_output(received_at, last_output)
+        if controller.admit(now):
+            pending.append(now)
+    return controller.stats()
+
+
+def test_skips_frames_when_inference_falls_behind():
+    # 30 fps input against a prompt that takes 80 ms per frame
+    controller = LatencyController(target_latency_ms=100, smoothing=1.0)
+
+    stats = simulate(controller, inference_time=0.08, frames=60)
+
+    assert stats["max_in_flight"] == 1
+    assert stats["skipped_frames"] > 0
+    assert stats["latency_ms"] <= 100
+
+
+def test_adapts_to_the_input_rate_below_the_target():
+    # The target allows 6 frames in flight, but a backlog only adds latency
+    controller = LatencyController(target_latency_ms=300, smoothing=1.0)
+
+    stats = simulate(controller, inference_time=0.05)
+
+    assert stats["max_in_flight"] == 6
+    assert stats["skipped_frames"] > 0
+    assert stats["latency_ms"] <= 100
+    assert stats["input_fps"] == pytest.approx(30)
+
+
+def test_evicted_frames_free_their_slot():
+    controller = LatencyController(target_latency_ms=50, smoothing=1.0)
+    assert controller.admit(0.0)
+    controller.on_output(0.0, 0.04)
+    assert controller.admit(0.05)
+    assert not controller.admit(0.06)
+
+    controller.on_dropped()
+
+    assert controller.admit(0.07)
+    assert controller.evicted_frames == 1
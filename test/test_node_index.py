@@ -0,0 +1,72 @@
+import os
+
+from comfystream.node_index import NodeIndex, describe_node, parse_input_types
+
+
+class KSampler:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "steps": ("INT", {"min": 1, "max": 100}),
+                "sampler": (["euler", "ddim"],),
+            },
+            "optional": {"latent": ("LATENT",)},
+        }
+
+
+def _index(tmp_path, calls):
+    custom_nodes = tmp_path / "custom_nodes"
+    custom_nodes.mkdir(exist_ok=True)
+
+    def load_node_classes():
+        calls.append(1)
+        return {"KSampler": KSampler}
+
+    return NodeIndex(str(tmp_path / "index.json"), [str(custom_nodes)], load_node_classes)
+
+
+def test_parse_input_types():
+    info = parse_input_types(KSampler.INPUT_TYPES())
+
+    assert info["steps"] == {"type": "INT", "required": True, "min": 1, "max": 100, "widget": None}
+    assert info["sampler"] == {"type": "combo", "value": ["euler", "ddim"]}
+    assert info["latent"] == {"type": "LATENT"}
+
+
+def test_index_is_persisted_and_reused(tmp_path):
+    calls = []
+    _index(tmp_path, calls).ensure()
+
+    index = _index(tmp_path, calls)
+    index.ensure(["KSampler"])
+
+    assert len(calls) == 1
+    node = {"inputs": {"steps": 20, "sampler": "euler", "session_id": "s"}}
+    info = describe_node("KSampler", node, index.get("KSampler"))
+    assert info["inputs"]["steps"]["max"] == 100
+    assert info["inputs"]["sampler"]["value"] == ["euler", "ddim"]
+    assert "session_id" not in info["inputs"]
+
+
+def test_custom_node_changes_invalidate_the_index(tmp_path):
+    calls = []
+    _index(tmp_path, calls).ensure()
+    pack = tmp_path / "custom_nodes" / "new_pack"
+    pack.mkdir()
+    os.utime(pack, ns=(2**62, 2**62))
+
+    _index(tmp_path, calls).ensure()
+
+    assert len(calls) == 2
+
+
+def test_unknown_class_type_rebuilds_once(tmp_path):
+    calls = []
+    _index(tmp_path, calls).ensure()
+
+    reloaded = _index(tmp_path, calls)
+    reloaded.ensure(["Missing"])
+    reloaded.ensure(["Missing"])
+
+    assert len(calls) == 2
@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+
+from comfystream import tensor_cache
+from comfystream.node_timing import NodeTimings, _wrap_execute, tag_prompt
+
+
+def test_percentiles_per_node_and_reset_on_class_change():
+    timings = NodeTimings(capacity=4)
+    for wall in (0.001, 0.002, 0.003, 0.004, 0.010):
+        timings.record(0, "3", "KSampler", wall, wall / 2)
+
+    stats = timings.stats()[0]["3"]
+    assert stats["class_type"] == "KSampler"
+    assert stats["executions"] == 4
+    assert stats["wall_ms_p50"] == pytest.approx(4)
+    assert stats["wall_ms_p95"] == pytest.approx(10)
+    assert stats["cpu_ms_p50"] == pytest.approx(2)
+
+    timings.record(0, "3", "VAEDecode", 0.001, 0.001)
+    assert timings.stats()[0]["3"]["executions"] == 1
+
+    timings.retain([(0, "1")])
+    assert timings.stats() == {}
+
+
+def test_prompts_reusing_node_ids_are_kept_apart():
+    timings = NodeTimings()
+    timings.record(0, "2", "KSampler", 0.010, 0.001)
+    timings.record(1, "2", "VAEDecode", 0.002, 0.001)
+    timings.record(1, "2", "VAEDecode", 0.002, 0.001)
+
+    stats = timings.stats()
+    assert stats[0]["2"]["class_type"] == "KSampler"
+    assert stats[0]["2"]["executions"] == 1
+    assert stats[1]["2"]["executions"] == 2
+
+    timings.retain([(1, "2")])
+    assert list(timings.stats()) == [1]
+
+
+class FakeDynamicPrompt:
+    def __init__(self, prompt):
+        self._prompt = prompt
+
+    def get_original_prompt(self):
+        return self._prompt
+
+    def get_node(self, node_id):
+        return self._prompt[node_id]
+
+
+def make_prompt(session_id, prompt_index=0):
+    prompt = {
+        "1": {"class_type": "LoadTensor", "inputs": {"session_id": session_id}},
+        "2": {"class_type": "Sleep", "inputs": {}},
+    }
+    tag_prompt(prompt, prompt_index)
+    return FakeDynamicPrompt(prompt)
+
+
+def test_wrapped_execute_records_into_the_prompt_session():
+    channels = tensor_cache.get_session("timed")
+    channels.node_timings = NodeTimings()
+
+    def execute(server, dynprompt, caches, current_item, extra_data, executed, prompt_id):
+        time.sleep(0.01)
+        return "done"
+
+    timed = _wrap_execute(execute)
+    assert timed(None, make_prompt("timed"), None, "2", {}, set(), "p1") == "done"
+    # Sessions without node timings are not recorded
+    timed(None, make_prompt("untimed"), None, "2", {}, set(), "p2")
+    timed(None, make_prompt("timed", prompt_index=1), None, "2", {}, set(), "p4")
+
+    stats = channels.node_timings.stats()
+    assert list(stats) == [0, 1]
+    stats = stats[0]
+    assert list(stats) == ["2"]
+    assert stats["2"]["class_type"] == "Sleep"
+    assert stats["2"]["wall_ms_p50"] >= 10
+    assert stats["2"]["cpu_ms_p50"] < stats["2"]["wall_ms_p50"]
+    tensor_cache.remove_session("timed")
+
+
+def test_wrapped_async_execute():
+    channels = tensor_cache.get_session("timed_async")
+    channels.node_timings = NodeTimings()
+
+    async def execute(server, dynprompt, caches, current_item, extra_data, executed, prompt_id):
+        await asyncio.sleep(0.01)
+
+    timed = _wrap_execute(execute)
+    asyncio.run(timed(None, make_prompt("timed_async"), None, "1", {}, set(), "p3"))
+
+    assert channels.node_timings.stats()[0]["1"]["class_type"] == "LoadTensor"
+    tensor_cache.remove_session("timed_async")
@@ -0,0 +1,94 @@
+import asyncio
+
+import av
+import numpy as np
+import pytest
+
+from comfystream.output_pacer import PACING_BLEND, VIDEO_CLOCK_RATE, OutputPacer
+
+
+def _frame(value):
+    return av.VideoFrame.from_ndarray(np.full((4, 4, 3), value, dtype=np.uint8), format="rgb24")
+
+
+def _pacer(outputs, clock, **kwargs):
+    return OutputPacer(outputs.get, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_repeats_last_output_at_target_rate(fake_clock):
+    async def main():
+        clock = fake_clock
+        outputs = asyncio.Queue()
+        outputs.put_nowait(_frame(10))
+        pacer = _pacer(outputs, clock, fps=100)
+        # Repeated frames are the same object, so read the pts as it is emitted
+        pts = [(await pacer.next_frame()).pts for _ in range(4)]
+        await pacer.stop()
+        return pacer, pts, clock.sleeps
+
+    pacer, pts, sleeps = asyncio.run(main())
+
+    assert pts == [round(i * VIDEO_CLOCK_RATE / 100) for i in range(4)]
+    assert sleeps == pytest.approx([0.01] * 3)
+    assert pacer.new_frames == 1
+    assert pacer.repeated_frames == 3
+
+
+def test_blend_moves_from_the_previous_to_the_latest_output(fake_clock):
+    async def main():
+        clock = fake_clock
+        outputs = asyncio.Queue()
+        outputs.put_nowait(_frame(0))
+        pacer = _pacer(outputs, clock, fps=200, mode=PACING_BLEND)
+        frames = [await pacer.next_frame()]
+        # The second output arrives 20 ms later, four ticks of the output clock
+        clock.now = 0.02
+        outputs.put_nowait(_frame(200))
+        await asyncio.sleep(0)
+        for _ in range(5):
+            frame = await pacer.next_frame()
+            frames.append((frame.pts, int(frame.to_ndarray(format="rgb24")[0, 0, 0])))
+        await pacer.stop()
+        return pacer, frames[1:], clock.sleeps
+
+    pacer, frames, sleeps = asyncio.run(main())
+
+    # Blended over one output interval, then the latest output is shown as is
+    assert [value for _, value in frames] == [0, 50, 100, 150, 200]
+    assert [pts for pts, _ in frames] == [
+        round(seconds * VIDEO_CLOCK_RATE) for seconds in (0.02, 0.025, 0.03, 0.035, 0.04)
+    ]
+    assert sleeps == pytest.approx([0.005] * 4)
+    assert pacer.late_ticks == 1
+    assert pacer.blended_frames == 4
+
+
+def test_blending_runs_in_the_convert_function(fake_clock):
+    conversions = []
+
+    async def convert(name, fn, *args):
+        conversions.append(name)
+        return fn(*args)
+
+    async def main():
+        outputs = asyncio.Queue()
+        outputs.put_nowait(_frame(0))
+        pacer = _pacer(outputs, fake_clock, fps=200, mode=PACING_BLEND, convert=convert)
+        await pacer.next_frame()
+        fake_clock.now = 0.02
+        outputs.put_nowait(_frame(200))
+        await asyncio.sleep(0)
+        await pacer.next_frame()
+        frame = await pacer.next_frame()
+        await pacer.stop()
+        return frame
+
+    frame = asyncio.run(main())
+
+    assert int(frame.to_ndarray(format="rgb24")[0, 0, 0]) == 50
+    assert conversions == ["output_blend", "output_blend"]
+
+
+def test_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        OutputPacer(asyncio.Queue().get, mode="interpolate")
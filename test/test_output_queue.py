@@ -0,0 +1,26 @@
+import asyncio
+import threading
+
+from comfystream.output_queue import OutputQueue
+
+
+def test_put_from_worker_thread_wakes_loop():
+    async def main():
+        queue = OutputQueue()
+        threading.Timer(0.01, queue.put_nowait, args=("output",)).start()
+        # Nothing else runs on the loop, so only the handoff can wake the getter
+        return await asyncio.wait_for(queue.get(), timeout=1.0)
+
+    assert asyncio.run(main()) == "output"
+
+
+def test_cancelled_getter_does_not_lose_items():
+    async def main():
+        queue = OutputQueue()
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        getter.cancel()
+        queue.put_nowait("output")
+        return await queue.get()
+
+    assert asyncio.run(main()) == "output"
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from comfystream.inference_worker import VIDEO
+from comfystream.process_client import ProcessComfyStreamClient, WorkerError
+from comfystream.shm_ring import SharedFrameRing
+
+
+def echo_worker(client_kwargs, input_ring_name, output_ring_name, control, inputs, outputs, log_level):
+    """Stands in for the ComfyUI worker, outputs the inverted input frames."""
+    input_ring = SharedFrameRing.attach(input_ring_name)
+    output_ring = SharedFrameRing.attach(output_ring_name)
+
+    def echo():
+        while True:
+            try:
+                message = inputs.recv()
+            except EOFError:
+                return
+            if message == VIDEO:
+                slot = input_ring.acquire()
+                output_ring.write(255 - slot.frame, pts=slot.pts)
+                input_ring.release(slot)
+                outputs.send(VIDEO)
+
+    threading.Thread(target=echo, daemon=True).start()
+    while True:
+        try:
+            command, args = control.recv()
+        except EOFError:
+            return
+        if command == "stop":
+            return
+        if command == "update_prompts" and args[0] == "crash":
+            os._exit(3)
+        control.send(("ok", {"update_stats": {"full": 1}} if command == "stats" else None))
+
+
+def make_frame(seq, size=4):
+    return SimpleNamespace(
+        side_data=SimpleNamespace(input=torch.full((1, size, size, 3), 0.2), seq=seq)
+    )
+
+
+async def roundtrip(client, seq):
+    client.put_video_input(make_frame(seq))
+    return await asyncio.wait_for(client.get_indexed_video_output(), timeout=10)
+
+
+def test_frames_cross_the_worker_process_and_crashes_restart_it():
+    async def run():
+        client = ProcessComfyStreamClient(max_frame_size=8, worker_target=echo_worker)
+        await client.set_prompts([{"prompt": 1}])
+        try:
+            seq, output = await roundtrip(client, 7)
+            assert seq == 7
+            assert output.shape == (1, 4, 4, 3)
+            assert output.dtype == torch.uint8
+            assert int(output[0, 0, 0, 0]) == 255 - 51
+
+            pid = client.get_worker_stats()["pid"]
+            with pytest.raises(WorkerError):
+                await client.update_prompts("crash")
+
+            for _ in range(200):
+                stats = client.get_worker_stats()
+                if stats["pid"] not in (None, pid) and client._prompts is not None:
+                    break
+                await asyncio.sleep(0.05)
+            assert client.restarts == 1
+            seq, _ = await roundtrip(client, 8)
+            assert seq == 8
+        finally:
+            await client.cleanup()
+        assert client.get_worker_stats()["pid"] is None
+
+    asyncio.run(run())
+
+
+def test_frames_larger_than_the_rings_are_dropped():
+    async def run():
+        client = ProcessComfyStreamClient(max_frame_size=8, worker_target=echo_worker)
+        await client.set_prompts([{"prompt": 1}])
+        try:
+            client.put_video_input(make_frame(1, size=16))
+            seq, _ = await roundtrip(client, 2)
+            assert seq == 2
+        finally:
+            await client.cleanup()
+
+    asyncio.run(run())
+
+
+def test_conditioning_images_are_rejected():
+    client = ProcessComfyStreamClient(max_frame_size=8, worker_target=echo_worker)
+
+    client.run_input = None
+    with pytest.raises(ValueError):
+        client.run_input = SimpleNamespace()
@@ -0,0 +1,65 @@
+from prometheus_client import REGISTRY
+
+from comfystream.server.metrics import MetricsManager
+
+# Gauges register in the global registry, so the manager is created once
+metrics = MetricsManager(include_stream_id=True)
+metrics.enable()
+
+
+def node_stats(class_type):
+    return {
+        "class_type": class_type,
+        "wall_ms_p50": 1.0,
+        "wall_ms_p95": 2.0,
+        "cpu_ms_p50": 0.5,
+        "cpu_ms_p95": 1.0,
+    }
+
+
+def wall_time(stream_id, node_id, class_type):
+    return REGISTRY.get_sample_value(
+        "stream_node_wall_time_ms",
+        {
+            "stream_id": stream_id,
+            "prompt": "0",
+            "node_id": node_id,
+            "class_type": class_type,
+            "quantile": "p50",
+        },
+    )
+
+
+def test_audio_input_counters_are_exported():
+    metrics.update_audio_input_metrics(
+        {"queued_ms": 40.0, "dropped_samples": 960, "stretched_samples": 480}, "c"
+    )
+
+    assert REGISTRY.get_sample_value("stream_audio_dropped_samples", {"stream_id": "c"}) == 960
+    assert REGISTRY.get_sample_value("stream_audio_stretched_samples", {"stream_id": "c"}) == 480
+    metrics.remove_stream_metrics("c")
+    assert REGISTRY.get_sample_value("stream_audio_queued_ms", {"stream_id": "c"}) is None
+
+
+def test_prompt_update_counters_are_exported():
+    metrics.update_prompt_update_metrics({"incremental": 3, "full": 1, "superseded": 0}, "d")
+
+    assert REGISTRY.get_sample_value("stream_prompt_updates", {"stream_id": "d", "kind": "incremental"}) == 3
+    metrics.remove_stream_metrics("d")
+    assert REGISTRY.get_sample_value("stream_prompt_updates", {"stream_id": "d", "kind": "full"}) is None
+
+
+def test_node_series_are_removed_with_their_node_and_stream():
+    metrics.update_node_timing_metrics({0: {"1": node_stats("KSampler"), "2": node_stats("VAEDecode")}}, "a")
+    metrics.update_node_timing_metrics({0: {"1": node_stats("KSampler")}}, "b")
+    assert wall_time("a", "2", "VAEDecode") == 1.0
+
+    metrics.update_node_timing_metrics({0: {"1": node_stats("KSampler")}}, "a")
+    assert wall_time("a", "2", "VAEDecode") is None
+    assert wall_time("a", "1", "KSampler") == 1.0
+
+    metrics.update_fps_metrics(30.0, "a")
+    metrics.remove_stream_metrics("a")
+    assert wall_time("a", "1", "KSampler") is None
+    assert REGISTRY.get_sample_value("stream_fps", {"stream_id": "a"}) is None
+    assert wall_time("b", "1", "KSampler") == 1.0
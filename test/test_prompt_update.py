@@ -0,0 +1,95 @@
+import pytest
+
+from comfystream import prompt_update
+from comfystream.prompt_update import apply_input_changes, copy_changed_nodes, diff_prompt_inputs
+
+
+def make_prompt(steps=20, cfg=1.5, image_link=("1", 0)):
+    return {
+        "1": {"class_type": "LoadImage", "inputs": {"image": "example.png"}},
+        "2": {"class_type": "KSampler", "inputs": {"steps": steps, "cfg": cfg, "image": list(image_link)}},
+        "3": {"class_type": "SaveImage", "inputs": {"images": ["2", 0]}},
+    }
+
+
+def make_converted(prompt):
+    return {
+        "1": {"class_type": "LoadTensor", "inputs": {"session_id": "s"}},
+        "2": prompt["2"],
+        "3": {"class_type": "SaveTensor", "inputs": {"images": ["2", 0], "session_id": "s"}},
+    }
+
+
+def test_changed_literal_inputs_are_reported_per_node():
+    assert diff_prompt_inputs(make_prompt(), make_prompt()) == {}
+    assert diff_prompt_inputs(make_prompt(), make_prompt(steps=4, cfg=2.0)) == {
+        "2": {"steps": 4, "cfg": 2.0}
+    }
+
+
+def test_structural_changes_need_a_full_conversion():
+    old = make_prompt()
+
+    relinked = make_prompt(image_link=("3", 0))
+    assert diff_prompt_inputs(old, relinked) is None
+
+    added = make_prompt()
+    added["4"] = {"class_type": "PreviewImage", "inputs": {"images": ["2", 0]}}
+    assert diff_prompt_inputs(old, added) is None
+
+    retyped = make_prompt()
+    retyped["2"]["class_type"] = "KSamplerAdvanced"
+    assert diff_prompt_inputs(old, retyped) is None
+
+
+def test_changes_are_applied_to_a_copy_sharing_untouched_nodes():
+    old = make_prompt()
+    converted = make_converted(old)
+    new = make_prompt(steps=4)
+
+    updated = apply_input_changes(converted, new, diff_prompt_inputs(old, new))
+
+    assert updated["2"]["inputs"]["steps"] == 4
+    assert converted["2"]["inputs"]["steps"] == 20
+    assert updated["3"] is converted["3"]
+
+
+def test_only_changed_nodes_are_copied():
+    old = make_prompt()
+    new = make_prompt(steps=4)
+
+    copied = copy_changed_nodes(old, new, diff_prompt_inputs(old, new))
+
+    assert copied == new
+    assert copied["1"] is old["1"]
+    assert copied["2"] is not new["2"]
+
+
+def test_changes_to_replaced_nodes_need_a_full_conversion():
+    old = make_prompt()
+    new = make_prompt()
+    new["1"]["inputs"]["image"] = "other.png"
+
+    assert apply_input_changes(make_converted(old), new, diff_prompt_inputs(old, new)) is None
+
+
+def test_changed_nodes_are_validated(monkeypatch):
+    validated = []
+
+    def validate(prompt):
+        validated.append(set(prompt))
+        if any(node["inputs"].get("steps", 0) < 0 for node in prompt.values()):
+            raise ValueError("invalid steps")
+        return prompt
+
+    monkeypatch.setattr(prompt_update.Prompt, "validate", validate)
+    old = make_prompt()
+    converted = make_converted(old)
+
+    valid = make_prompt(steps=4)
+    apply_input_changes(converted, valid, diff_prompt_inputs(old, valid))
+    invalid = make_prompt(steps=-1)
+    with pytest.raises(ValueError):
+        apply_input_changes(converted, invalid, diff_prompt_inputs(old, invalid))
+
+    assert validated == [{"2"}, {"2"}]
@@ -0,0 +1,34 @@
+from comfystream.reorder_buffer import ReorderBuffer
+
+
+def test_outputs_leave_in_ticket_order():
+    reorder = ReorderBuffer()
+    first, second, third = (reorder.next_ticket() for _ in range(3))
+
+    assert reorder.push(second, ["b"]) == []
+    assert reorder.push(third, ["c"]) == []
+    assert reorder.push(first, ["a1", "a2"]) == ["a1", "a2", "b", "c"]
+    assert reorder.stats()["reordered_runs"] == 2
+
+
+def test_missing_run_is_skipped_once_the_window_is_full():
+    reorder = ReorderBuffer(window=2)
+    failed, *tickets = (reorder.next_ticket() for _ in range(4))
+
+    assert reorder.push(tickets[0], ["b"]) == []
+    assert reorder.push(tickets[1], ["c"]) == []
+    assert reorder.push(tickets[2], ["d"]) == ["b", "c", "d"]
+    assert reorder.push(failed, ["a"]) == []
+    assert reorder.stats()["skipped_tickets"] == 1
+    assert reorder.stats()["late_runs"] == 1
+
+
+def test_skipped_run_releases_the_held_outputs():
+    reorder = ReorderBuffer(window=4)
+    dropped, second, third = (reorder.next_ticket() for _ in range(3))
+
+    assert reorder.push(second, ["b"]) == []
+    assert reorder.skip(dropped) == ["b"]
+    assert reorder.push(third, ["c"]) == ["c"]
+    assert reorder.skip(dropped) == []
+    assert reorder.stats()["skipped_tickets"] == 1
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from fractions import Fraction
+
+from comfystream.shm_ring import SharedFrameRing
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing.create(slot_count=2, height=4, width=4)
+    yield ring
+    ring.close()
+
+
+def test_write_and_acquire_across_attachments(ring):
+    frame = np.arange(4 * 4 * 3, dtype=np.uint8).reshape(4, 4, 3)
+    assert ring.write(frame, pts=3000, time_base=Fraction(1, 90000), session_id="s1") == 0
+
+    reader = SharedFrameRing.attach(ring.name)
+    slot = reader.acquire()
+    assert slot.seq == 0
+    assert slot.pts == 3000
+    assert slot.time_base == Fraction(1, 90000)
+    assert slot.session_id == "s1"
+    np.testing.assert_array_equal(slot.frame, frame)
+
+    reader.release(slot)
+    assert len(ring) == 0
+    del slot
+    reader.close()
+
+
+def test_full_ring_drops_until_released(ring):
+    frame = np.zeros((2, 2, 3), dtype=np.uint8)
+    assert ring.write(frame) == 0
+    assert ring.write(frame) == 1
+    assert ring.write(frame) is None
+    assert ring.stats()["dropped_frames"] == 1
+
+    slot = ring.acquire(latest=True)
+    assert slot.seq == 1
+    assert slot.frame.shape == (2, 2, 3)
+    ring.release(slot)
+    assert ring.acquire() is None
+    del slot
+
+
+def test_rejects_oversized_frames(ring):
+    with pytest.raises(ValueError):
+        ring.write(np.zeros((8, 8, 3), dtype=np.uint8))
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+from comfystream import tracing
+from comfystream.tracing import FrameTracer
+
+
+def make_frame(pts: int):
+    return SimpleNamespace(pts=pts, side_data=SimpleNamespace())
+
+
+def test_disabled_tracer_does_not_attach_traces():
+    tracer = FrameTracer()
+    frame = make_frame(0)
+
+    assert tracer.start(frame, "session") is None
+    assert tracing.get_trace(frame) is None
+    tracing.mark(frame, "video_preprocess")
+
+
+def test_chrome_trace_has_a_span_per_stage():
+    tracer = FrameTracer(capacity=1)
+    tracer.enable()
+    for pts in range(2):
+        frame = make_frame(pts)
+        tracer.start(frame, "session")
+        for stage in ["video_preprocess", "enqueue", "recv"]:
+            tracing.mark(frame, stage)
+        tracer.finish(tracing.get_trace(frame))
+
+    events = tracer.to_chrome_trace()["traceEvents"]
+
+    # Only the newest trace is kept
+    assert {event["args"]["pts"] for event in events if "args" in event} == {1}
+    names = [event["name"] for event in events if event["ph"] == "b"]
+    assert names == ["frame", "video_preprocess", "enqueue", "recv"]
+    assert all(event["ts"] >= events[0]["ts"] for event in events)
@@ -105,6 +105,21 @@ def test_convert_prompt_invalid_no_input(prompt_invalid_no_input):
     assert "missing input" in str(e)
 
 
+def test_convert_prompt_without_input_when_not_required(prompt_invalid_no_input):
+    prompt = convert_prompt(prompt_invalid_no_input, session_id="session-1", require_input=False)
+
+    exp = Prompt.validate(
+        {
+            "1": {
+                "inputs": {"session_id": "session-1"},
+                "class_type": "SaveTensor",
+                "_meta": {"title": "SaveTensor"},
+            },
+        }
+    )
+    assert prompt == exp
+
+
 def test_convert_prompt_invalid_no_output(prompt_invalid_no_output):
     with pytest.raises(Exception) as exc_info:
         convert_prompt(prompt_invalid_no_output)
@@ -156,3 +171,48 @@ def test_convert_prompt_primary_input(prompt_primary_input):
         }
     )
     assert prompt == exp
+
+
+def test_convert_prompt_session_id(prompt_basic):
+    prompt = convert_prompt(prompt_basic, session_id="session-1")
+
+    exp = Prompt.validate(
+        {
+            "12": {
+                "inputs": {"session_id": "session-1"},
+                "class_type": "LoadTensor",
+                "_meta": {"title": "LoadTensor"},
+            },
+            "13": {
+                "inputs": {"images": ["12", 0], "session_id": "session-1"},
+                "class_type": "SaveTensor",
+                "_meta": {"title": "SaveTensor"},
+            },
+        }
+    )
+    assert prompt == exp
+
+
+def test_convert_prompt_stage_session_ids(prompt_basic):
+    prompt = convert_prompt(
+        prompt_basic,
+        session_id="session-1",
+        input_session_id="session-1:stage1",
+        output_session_id="session-1",
+    )
+
+    exp = Prompt.validate(
+        {
+            "12": {
+                "inputs": {"session_id": "session-1:stage1"},
+                "class_type": "LoadTensor",
+                "_meta": {"title": "LoadTensor"},
+            },
+            "13": {
+                "inputs": {"images": ["12", 0], "session_id": "session-1"},
+                "class_type": "SaveTensor",
+                "_meta": {"title": "SaveTensor"},
+            },
+        }
+    )
+    assert prompt == exp
@@ -0,0 +1,43 @@
+from comfystream.warmup_cache import WarmupCache, hash_prompts
+
+
+def test_prompt_hash_ignores_key_order():
+    prompt = {"1": {"class_type": "LoadTensor", "inputs": {}}, "2": {"class_type": "SaveTensor", "inputs": {"images": ["1", 0]}}}
+    reordered = {"2": prompt["2"], "1": prompt["1"]}
+
+    assert hash_prompts([prompt]) == hash_prompts([reordered])
+    assert hash_prompts([prompt]) != hash_prompts([prompt, prompt])
+
+
+def test_warm_keys_are_remembered_per_shape():
+    cache = WarmupCache()
+    key = WarmupCache.key("abc", "video", (1, 512, 512, 3), "torch.float32")
+
+    assert not cache.is_warm(key)
+    cache.mark_warm(key)
+
+    assert cache.is_warm(key)
+    assert not cache.is_warm(WarmupCache.key("abc", "video", (1, 384, 512, 3), "torch.float32"))
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
+
+
+def test_least_recently_used_keys_are_evicted():
+    cache = WarmupCache(max_entries=2)
+    keys = [WarmupCache.key("abc", "video", (1, size, size, 3), "torch.float32") for size in (256, 512, 768)]
+    cache.mark_warm(keys[0])
+    cache.mark_warm(keys[1])
+    cache.is_warm(keys[0])
+    cache.mark_warm(keys[2])
+
+    assert cache.is_warm(keys[0])
+    assert not cache.is_warm(keys[1])
+
+
+def test_invalidate_prompt():
+    cache = WarmupCache()
+    cache.mark_warm(WarmupCache.key("abc", "audio", (1, 24000), "int16"))
+    cache.mark_warm(WarmupCache.key("def", "audio", (1, 24000), "int16"))
+
+    cache.invalidate("abc")
+
+    assert len(cache) == 1